@@ -12,22 +12,37 @@ from pymongo import MongoClient
 from pymongo.database import Database
 from ynab.models.account import Account
 
+from bunq_ynab_connect.clients.async_bunq_client import AsyncBunqClient
 from bunq_ynab_connect.clients.bunq.base_client import BunqEnvironment
 from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.clients.cassette import Cassette, CassetteMode
+from bunq_ynab_connect.data.metadata import Metadata
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.cached_storage import CachedStorage
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
 from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
+from bunq_ynab_connect.data.storage.sqlite_storage import SqliteStorage
 from bunq_ynab_connect.helpers.config import (
     BUNQ_CALLBACK_INDEX,
+    BUNQ_CASSETTE_INDEX,
     BUNQ_CONFIG_DIR,
     BUNQ_CONFIG_INDEX,
+    BUNQ_RATE_LIMITER_INDEX,
     CACHE_DIR,
+    CASSETTE_DIR,
     CONFIG_DIR,
+    DATA_DIR,
     LOGS_DIR,
     MLSERVER_CONFIG_DIR,
     MLSERVER_PREDICTION_URL_INDEX,
     MLSERVER_REPOSITORY_URL_INDEX,
+    SQLITE_PATH_INDEX,
+    YNAB_CASSETTE_INDEX,
+    YNAB_RATE_LIMITER_INDEX,
 )
 from bunq_ynab_connect.helpers.json_dict import JsonDict
+from bunq_ynab_connect.helpers.rate_limiter import RateLimiter
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
 
 
 def _load_env() -> None:
@@ -50,7 +65,15 @@ def _get_logger(name: str) -> logging.LoggerAdapter:
 
 def bootstrap_di() -> None:
     """Inject dependencies into the dependency injection container."""
-    for dir_ in [LOGS_DIR, CACHE_DIR, CONFIG_DIR, MLSERVER_CONFIG_DIR, BUNQ_CONFIG_DIR]:
+    for dir_ in [
+        LOGS_DIR,
+        CACHE_DIR,
+        CASSETTE_DIR,
+        DATA_DIR,
+        CONFIG_DIR,
+        MLSERVER_CONFIG_DIR,
+        BUNQ_CONFIG_DIR,
+    ]:
         Path.mkdir(dir_, exist_ok=True, parents=True)
     # Env
     _load_env()
@@ -69,16 +92,64 @@ def bootstrap_di() -> None:
     )
     di[Database] = lambda _di: _di[MongoClient][os.getenv("MONGO_DB", "MYDB")]
 
-    # Set the MongoStorage as the default storage
-    di[AbstractStorage] = lambda _di: MongoStorage()
+    # SQLite
+    di[SQLITE_PATH_INDEX] = Path(
+        os.getenv("SQLITE_PATH", str(DATA_DIR / "bunq_ynab_connect.sqlite"))
+    )
+
+    # Use MongoStorage by default, or the storage selected with STORAGE_BACKEND.
+    # Cache reads of dimension tables, only if STORAGE_CACHE_TTL_SECONDS is set: each
+    # process has its own cache, which does not see the writes of other processes.
+    storages = {"mongo": MongoStorage, "sqlite": SqliteStorage, "memory": MemoryStorage}
+    storage_class = storages[os.getenv("STORAGE_BACKEND", "mongo").lower()]
+    cache_ttl = int(os.getenv("STORAGE_CACHE_TTL_SECONDS") or 0)
+    if cache_ttl > 0:
+        di[AbstractStorage] = lambda _di: CachedStorage(
+            storage=storage_class(),
+            metadata=_di[Metadata],
+            logger=_di[logging.LoggerAdapter],
+            ttl_seconds=cache_ttl,
+        )
+    else:
+        di[AbstractStorage] = lambda _di: storage_class()
     # Bunq config
     di[BunqClient] = lambda _: BunqClient()
+    di[AsyncBunqClient] = lambda _: AsyncBunqClient()
     di[BUNQ_CALLBACK_INDEX] = os.getenv("BUNQ_CALLBACK_HOST")
     bunq_environment = BunqEnvironment(os.getenv("BUNQ_ENVIRONMENT", "SANDBOX"))
     di[BunqEnvironment] = bunq_environment
     di[BUNQ_CONFIG_INDEX] = JsonDict(
         path=Path(BUNQ_CONFIG_DIR / f"bunq_{bunq_environment.name}.cfg")
     )
+    # Rate limits, shared by all threads that call the APIs. Bunq allows 3 GET, 5 POST
+    # and 2 PUT requests per 3 seconds, and 1 session per 30 seconds. The buckets
+    # spread the requests evenly, such that no window exceeds these limits. Share them
+    # with other processes through the storage, if BUNQ_RATE_LIMIT_SHARED is set.
+    # YNAB allows 200 requests per hour.
+    share_bunq_limits = os.getenv("BUNQ_RATE_LIMIT_SHARED", "false").lower() == "true"
+    di[BUNQ_RATE_LIMITER_INDEX] = lambda _di: TokenBucketLimiter(
+        limits={
+            "GET": TokenBucketLimiter.per_window(3, 3),
+            "POST": TokenBucketLimiter.per_window(5, 3),
+            "PUT": TokenBucketLimiter.per_window(2, 3),
+            "POST session-server": TokenBucketLimiter.per_window(1, 30),
+        },
+        storage=_di[AbstractStorage] if share_bunq_limits else None,
+    )
+    di[YNAB_RATE_LIMITER_INDEX] = lambda _di: RateLimiter(
+        max_calls=200, period=3600, logger=_di[logging.LoggerAdapter]
+    )
+    # Record the API responses, or replay them offline (eg for benchmarks)
+    cassette_mode = CassetteMode(os.getenv("API_CASSETTE_MODE", "off").lower())
+    cassette_latency = float(os.getenv("API_CASSETTE_LATENCY_SECONDS", "0"))
+    di[BUNQ_CASSETTE_INDEX] = lambda _: Cassette(
+        CASSETTE_DIR / f"bunq_{bunq_environment.name}.jsonl.gz",
+        cassette_mode,
+        cassette_latency,
+    )
+    di[YNAB_CASSETTE_INDEX] = lambda _: Cassette(
+        CASSETTE_DIR / "ynab.jsonl.gz", cassette_mode, cassette_latency
+    )
     # Model serving config
     di[MLSERVER_PREDICTION_URL_INDEX] = (
         "{server_url}/v2/models/{{budget_id}}/infer".format(
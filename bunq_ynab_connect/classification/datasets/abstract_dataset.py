@@ -48,6 +48,13 @@ class AbstractDataset:
         new_data = self.load_new_data()
         if len(new_data) > 0:
             self.logger.info("Upserting %s rows in %s", len(new_data), self.NAME)
-            self.storage.upsert(self.NAME, new_data)
+            result = self.storage.upsert(self.NAME, new_data)
+            self.logger.info(
+                "Upserted %s: %s new, %s changed, %s unchanged",
+                self.NAME,
+                result.upserted,
+                result.modified,
+                result.unchanged,
+            )
         self.storage.set_last_runmoment(self.NAME, new_last_runmoment)
         self.logger.info("Updated dataset %s", self.NAME)
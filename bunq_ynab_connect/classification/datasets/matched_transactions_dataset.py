@@ -92,25 +92,29 @@ class MatchedTransactionsDataset(AbstractDataset):
 
         - Load all bunq payments for account with created date after the last runmoment
         - Load all ynab transactions for account with date after the last runmoment
+        Rows are streamed from storage, and only the fields of the models are loaded.
 
         Returns
         -------
             A tuple with the bunq payments and ynab transactions
 
         """
-        bunq_payments = self.storage.find(
+        bunq_payments = self.storage.iter_find(
             "bunq_payments",
             [
                 ("monetary_account_id", "eq", bunq_account_id),
                 ("created", "gte", self.last_runmoment.isoformat()),
             ],
+            projection=list(BunqPayment.model_fields),
         )
-        ynab_transactions = self.storage.find(
+        ynab_transactions = self.storage.iter_find(
             "ynab_transactions",
             [
                 ("account_id", "eq", ynab_account_id),
                 ("date", "gte", self.last_runmoment),
+                ("deleted", "ne", True),
             ],
+            projection=list(YnabTransaction.model_fields),
         )
         bunq_payments = self.storage.rows_to_entities(bunq_payments, BunqPayment)
         ynab_transactions = self.storage.rows_to_entities(
@@ -92,7 +92,8 @@ class BasePaymentClassificationExperiment:
     def load_data(self) -> list[MatchedTransaction]:
         """Load the dataset.
 
-        - Load all matched transactions for the given budget
+        - Stream all matched transactions for the given budget
+            Only load the fields of the MatchedTransaction model
         - Convert them to MatchedTransaction entities
 
         Returns
@@ -100,9 +101,10 @@ class BasePaymentClassificationExperiment:
             List of MatchedTransaction entities
 
         """
-        transactions = self.storage.find(
+        transactions = self.storage.iter_find(
             "matched_transactions",
             [("ynab_transaction.budget_id", "eq", self.budget_id)],
+            projection=list(MatchedTransaction.model_fields),
         )
         return self.storage.rows_to_entities(transactions, MatchedTransaction)
 
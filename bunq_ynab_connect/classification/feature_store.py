@@ -29,10 +29,21 @@ class FeatureStore:
         self.logger = logger
         self.metadata = metadata
 
-    def dataset_by_ids(self, dataset: str, ids: list) -> list:
+    def dataset_by_ids(
+        self, dataset: str, ids: list, projection: list[str] | None = None
+    ) -> list:
+        """Load the rows of a dataset by their keys.
+
+        Parameters
+        ----------
+            dataset: The name of the dataset.
+            ids: The keys of the rows to load.
+            projection: The columns to load. Defaults to all columns.
+
+        """
         metadata = self.metadata.get_table(dataset)
         query = [(metadata.key_col, "in", ids)]
-        return self.storage.find(metadata.name, query)
+        return list(self.storage.iter_find(metadata.name, query, projection=projection))
 
     def update(self) -> None:
         """Update the feature store.
@@ -0,0 +1,165 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime
+from logging import LoggerAdapter
+
+from kink import inject
+
+from bunq_ynab_connect.clients.bunq.async_base_client import AsyncBaseClient
+from bunq_ynab_connect.clients.bunq_client import BunqClient, Callback, payments_after
+from bunq_ynab_connect.models.bunq_account import BunqAccount
+
+
+class AsyncBunqClient:
+    """Async client to expose specific bunq API calls, eg for the callback server.
+
+    Uses the AsyncBaseClient to make requests. The user id is read from the
+    BunqClient, which may create a session first.
+
+    Attributes
+    ----------
+        logger (LoggerAdapter): The logger.
+        base_client (AsyncBaseClient): The base client, used to make requests.
+        bunq_client (BunqClient): The blocking client, for the user id.
+        ITEMS_PER_PAGE (int): The amount of items to load per page
+            for paginated requests.
+        MAX_CONCURRENT_ACCOUNTS (int): The maximum amount of accounts of which the
+            payments are loaded at the same time.
+
+    """
+
+    logger: LoggerAdapter
+    base_client: AsyncBaseClient
+    bunq_client: BunqClient
+    ITEMS_PER_PAGE: int = BunqClient.ITEMS_PER_PAGE
+    MAX_CONCURRENT_ACCOUNTS: int = 4
+
+    @inject
+    def __init__(
+        self,
+        logger: LoggerAdapter,
+        base_client: AsyncBaseClient,
+        bunq_client: BunqClient,
+    ) -> None:
+        self.logger = logger
+        self.base_client = base_client
+        self.bunq_client = bunq_client
+
+    async def aclose(self) -> None:
+        """Close the connections of the base client."""
+        await self.base_client.aclose()
+
+    async def user_id(self) -> int:
+        """Get the user id, without blocking the event loop."""
+        return await asyncio.to_thread(lambda: self.bunq_client.user_id)
+
+    async def iter_payment_pages_for_account(
+        self,
+        account: BunqAccount,
+        last_runmoment: datetime | None = None,
+        newer_id: int | None = None,
+    ) -> AsyncIterator[list[dict]]:
+        """Yield the payments of an account, one page at a time.
+
+        See BunqClient.iter_payment_pages_for_account for the parameters.
+        """
+        pages = self.base_client.iter_pages(
+            endpoint="user/{user_id}/monetary-account/{account_id}/payment",
+            user_id=await self.user_id(),
+            account_id=account.id,
+            params=None if newer_id is None else {"newer_id": newer_id},
+            page_size=self.ITEMS_PER_PAGE,
+            newer=newer_id is not None,
+        )
+        async for page in pages:
+            payments = [p["Payment"] for p in page]
+            if newer_id is not None or not last_runmoment:
+                yield payments
+                continue
+            new_payments = payments_after(payments, last_runmoment)
+            yield new_payments
+            if len(new_payments) < len(payments):
+                return
+
+    async def get_payments_for_accounts(
+        self,
+        accounts: list[BunqAccount],
+        last_runmoment: datetime | None = None,
+        newer_ids: dict[int, int] | None = None,
+    ) -> dict[int, list[dict]]:
+        """Get the payments of several accounts concurrently, per account id.
+
+        At most MAX_CONCURRENT_ACCOUNTS accounts are loaded at the same time. Accounts
+        that fail are logged and left out, such that the caller can retry them.
+
+        Parameters
+        ----------
+            accounts: The accounts to load the payments of.
+            last_runmoment: Only load the payments created after this moment.
+            newer_ids: Per account id, only load the payments after this payment.
+
+        """
+        newer_ids = newer_ids or {}
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_ACCOUNTS)
+
+        async def load(account: BunqAccount) -> list[dict]:
+            async with semaphore:
+                return [
+                    payment
+                    async for page in self.iter_payment_pages_for_account(
+                        account, last_runmoment, newer_ids.get(account.id)
+                    )
+                    for payment in page
+                ]
+
+        results = await asyncio.gather(
+            *(load(account) for account in accounts), return_exceptions=True
+        )
+        payments = {}
+        for account, result in zip(accounts, results, strict=True):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    "Could not load payments of account %s",
+                    account.id,
+                    exc_info=result,
+                )
+            else:
+                payments[account.id] = result
+        return payments
+
+    async def get_accounts(self) -> list[dict]:
+        """Get all bunq accounts for the user."""
+        try:
+            accounts = await self.base_client.get_paginated(
+                endpoint="user/{user_id}/monetary-account",
+                user_id=await self.user_id(),
+                page_size=self.ITEMS_PER_PAGE,
+            )
+            accounts = [v for account in accounts for v in account.values()]
+            self.logger.info("Loaded %s bunq accounts", len(accounts))
+        except Exception as e:
+            msg = "Could not load bunq accounts"
+            self.logger.exception(msg)
+            raise ValueError(msg) from e
+        else:
+            return accounts
+
+    async def add_callback(self, url: str) -> None:
+        """Add a callback to the bunq API."""
+        callbacks = await self._get_callbacks()
+        if any(c.notification_target == url for c in callbacks):
+            return
+        self.logger.info("Adding callback for %s", url)
+        callbacks.append(Callback(notification_target=url, category="MUTATION"))
+        await self.base_client.post(
+            endpoint="/user/{user_id}/notification-filter-url",
+            user_id=await self.user_id(),
+            data={"notification_filters": [c.dict() for c in callbacks]},
+        )
+
+    async def _get_callbacks(self) -> list[Callback]:
+        response = await self.base_client.get(
+            endpoint="/user/{user_id}/notification-filter-url",
+            user_id=await self.user_id(),
+        )
+        return [Callback.from_api_response(c) for c in response["Response"]]
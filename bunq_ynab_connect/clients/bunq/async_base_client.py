@@ -0,0 +1,225 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Callable
+from logging import LoggerAdapter
+from typing import Any
+from urllib.parse import urlencode
+
+import httpx
+from kink import inject
+
+from bunq_ynab_connect.clients.bunq.base_client import BaseClient, parse_retry_after
+
+
+@inject
+class AsyncBaseClient:
+    """Async bunq base client. Exposes get and post requests to the bunq API.
+
+    Wraps the BaseClient, such that both share the signer, the session, the rate
+    limiter and the cassette. Requests are sent with an httpx AsyncClient. The
+    blocking parts run in a thread: building the headers (which may renew the
+    session) and signing.
+
+    Attributes
+    ----------
+        base_client (BaseClient): The blocking client, whose session, signer, rate
+            limiter and cassette are used.
+        logger (LoggerAdapter): The logger
+        client (httpx.AsyncClient): The HTTP client. Keeps the connections to bunq
+            alive, such that concurrent requests reuse them.
+        MAX_RETRIES (int): How often to retry a request upon a 429 status, and a GET
+            upon a connection error or a 5xx status.
+        RETRY_BACKOFF (float): The backoff factor between retries of a GET, in
+            seconds. A 429 is retried with the backoff of the rate limiter instead.
+
+    """
+
+    base_client: BaseClient
+    logger: LoggerAdapter
+    client: httpx.AsyncClient
+    MAX_RETRIES = BaseClient.MAX_RETRIES
+    RETRY_BACKOFF = BaseClient.RETRY_BACKOFF
+
+    @inject
+    def __init__(self, base_client: BaseClient, logger: LoggerAdapter) -> None:
+        self.base_client = base_client
+        self.logger = logger
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=BaseClient.POOL_SIZE,
+                max_keepalive_connections=BaseClient.POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(
+                BaseClient.READ_TIMEOUT, connect=BaseClient.CONNECT_TIMEOUT
+            ),
+        )
+
+    async def aclose(self) -> None:
+        """Close the connections of the client."""
+        await self.client.aclose()
+
+    async def post(
+        self,
+        *,
+        endpoint: str,
+        data: dict | None = None,
+        headers: dict | None = None,
+        **endpoint_variables: Any,
+    ) -> dict:
+        """Make a POST request to the bunq API. See BaseClient.post."""
+        url = self.base_client._format_endpoint(endpoint, **endpoint_variables)  # noqa: SLF001
+        data = data or {}
+
+        def all_headers() -> dict:
+            return {
+                **self.base_client._default_headers(endpoint),  # noqa: SLF001
+                "X-Bunq-Client-Signature": self.base_client.signer.sign(data),
+                **(headers or {}),
+            }
+
+        async def request() -> dict:
+            response = await self._send(
+                "POST",
+                endpoint,
+                url,
+                content=json.dumps(data).encode(),
+                headers=await asyncio.to_thread(all_headers),
+            )
+            return self._handle_response(response)
+
+        if endpoint in self.base_client.AUTHENTICATION_ENDPOINTS:
+            return await request()
+        return await self.base_client.cassette.play_async(f"POST {url}", request)
+
+    async def get(
+        self,
+        *,
+        endpoint: str,
+        params: dict | None = None,
+        **endpoint_variables: Any,
+    ) -> dict:
+        """Make a GET request to the bunq API. See BaseClient.get."""
+        url = self.base_client._format_endpoint(endpoint, **endpoint_variables)  # noqa: SLF001
+        params = params or {}
+
+        async def request() -> dict:
+            headers = await asyncio.to_thread(
+                self.base_client._default_headers,  # noqa: SLF001
+                endpoint,
+            )
+            response = await self._send(
+                "GET", endpoint, url, params=params, headers=headers
+            )
+            return self._handle_response(response)
+
+        query = urlencode(sorted(params.items()))
+        return await self.base_client.cassette.play_async(
+            f"GET {url}?{query}" if query else f"GET {url}", request
+        )
+
+    async def get_paginated(
+        self,
+        *,
+        endpoint: str,
+        params: dict | None = None,
+        continue_loading_pages: Callable[[list], bool] | None = None,
+        page_size: int = 200,
+        **endpoint_variables: Any,
+    ) -> list:
+        """Perform a GET request in a paginated way, and return all items at once.
+
+        See BaseClient.iter_pages for the parameters.
+        """
+        return [
+            item
+            async for page in self.iter_pages(
+                endpoint=endpoint,
+                params=params,
+                continue_loading_pages=continue_loading_pages,
+                page_size=page_size,
+                **endpoint_variables,
+            )
+            for item in page
+        ]
+
+    async def iter_pages(
+        self,
+        *,
+        endpoint: str,
+        params: dict | None = None,
+        continue_loading_pages: Callable[[list], bool] | None = None,
+        page_size: int = 200,
+        newer: bool = False,
+        **endpoint_variables: Any,
+    ) -> AsyncIterator[list]:
+        """Perform a GET request in a paginated way, and yield one page at a time.
+
+        See BaseClient.iter_pages for the parameters.
+        """
+        params = {**(params or {}), "count": page_size}
+        next_url = "newer_url" if newer else "older_url"
+        done = False
+        while not done:
+            response = await self.get(
+                endpoint=endpoint, params=params, **endpoint_variables
+            )
+            last_page = response["Response"]
+            yield last_page
+            pagination = response.get("Pagination") or {}
+            done = not pagination.get(next_url) or (
+                continue_loading_pages is not None
+                and not continue_loading_pages(last_page)
+            )
+            if not done:
+                # The next url contains all parameters, including the count
+                endpoint = pagination[next_url]
+                params = {}
+
+    async def _send(
+        self, method: str, endpoint: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request within the rate limit, and retry it if it failed.
+
+        A 429 is retried for any method, since bunq did not process it. Connection
+        errors and 5xx statuses are only retried for a GET.
+        """
+        rate_limiter = self.base_client.rate_limiter
+        bucket = self.base_client._bucket(method, endpoint)  # noqa: SLF001
+        for attempt in range(self.MAX_RETRIES + 1):
+            await rate_limiter.acquire_async(bucket)
+            last_attempt = attempt == self.MAX_RETRIES
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if method != "GET" or last_attempt:
+                    raise
+                await asyncio.sleep(self.RETRY_BACKOFF * 2**attempt)
+                continue
+            if last_attempt:
+                break
+            if response.status_code == 429:  # noqa: PLR2004
+                self.logger.warning("Bunq throttled %s %s, backing off", method, url)
+                await rate_limiter.backoff_async(
+                    bucket,
+                    attempt,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            elif method == "GET" and response.is_server_error:
+                await asyncio.sleep(self.RETRY_BACKOFF * 2**attempt)
+            else:
+                break
+        return response
+
+    def _handle_response(self, response: httpx.Response) -> dict:
+        """Handle a response, by raising if error, else verifying the signature."""
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            msg = f"Error in API request: {response.text}"
+            self.logger.exception(msg)
+            raise
+        else:
+            self.base_client.signer.verify(
+                response.text, response.headers["X-Bunq-Server-Signature"]
+            )
+            return response.json()
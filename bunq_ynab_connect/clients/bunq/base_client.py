@@ -1,17 +1,22 @@
 import json
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from enum import Enum
 from logging import LoggerAdapter
 from typing import Any
+from urllib.parse import urlencode
 
 from kink import inject
-from requests import HTTPError, Response, get, post
+from requests import HTTPError, Response, Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from bunq_ynab_connect.clients.bunq.session_activator import (
     SessionActivator,
 )
 from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.clients.cassette import Cassette
 from bunq_ynab_connect.helpers.json_dict import JsonDict
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
 
 
 class BunqEnvironment(Enum):  # noqa: D101
@@ -31,6 +36,23 @@ class BaseClient:
         signer (Signer): Sings and verifies requests.
         bunq_config (JsonDict): Bunq config filem, stored as json.
         logger (LoggerAdapter): The logger
+        rate_limiter (TokenBucketLimiter): Limits the requests of all threads
+            together, with a bucket per method or endpoint.
+        cassette (Cassette): Records the responses, or replays them without
+            sending the requests. Replayed requests skip the session and the rate
+            limiter.
+        session (Session): The HTTP session. Keeps the connections to bunq alive,
+            such that consecutive requests (eg pages) reuse them.
+        POOL_SIZE (int): The maximum amount of connections to keep alive. Should be
+            at least the amount of threads that call the API at the same time.
+        CONNECT_TIMEOUT (float): Seconds to wait for a connection.
+        READ_TIMEOUT (float): Seconds to wait for a response.
+        MAX_RETRIES (int): How often to retry a GET request upon a connection error
+            or a 5xx status, and any request upon a 429 status.
+        RETRY_BACKOFF (float): The backoff factor between retries of a GET, in
+            seconds. A 429 is retried with the backoff of the rate limiter instead.
+        AUTHENTICATION_ENDPOINTS (tuple[str, ...]): The endpoints that return keys
+            and tokens. Their responses are never recorded by the cassette.
 
     """
 
@@ -39,20 +61,119 @@ class BaseClient:
     signer: Signer
     bunq_config: JsonDict
     logger: LoggerAdapter
+    rate_limiter: TokenBucketLimiter
+    cassette: Cassette
+    session: Session
+    POOL_SIZE = 10
+    CONNECT_TIMEOUT = 5.0
+    READ_TIMEOUT = 10.0
+    MAX_RETRIES = 3
+    RETRY_BACKOFF = 0.5
+    AUTHENTICATION_ENDPOINTS = ("installation", "device-server", "session-server")
 
     @inject
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         environment: BunqEnvironment,
         signer: Signer,
         bunq_config: JsonDict,
         logger: LoggerAdapter,
+        bunq_rate_limiter: TokenBucketLimiter,
+        bunq_cassette: Cassette,
     ) -> None:
         self.environment = environment
-        self.session_activator = SessionActivator(bunq_client=self, logger=logger)
+        self.session_activator = SessionActivator(
+            bunq_client=self, bunq_config=bunq_config, logger=logger
+        )
         self.signer = signer
         self.bunq_config = bunq_config
         self.logger = logger
+        self.rate_limiter = bunq_rate_limiter
+        self.cassette = bunq_cassette
+        self.session = self._create_session()
+
+    def _create_session(self) -> Session:
+        """Create a session with a connection pool, that retries failed GETs.
+
+        POSTs are not retried, since bunq might have processed them already. A 429 is
+        not retried here, but by _send, since the rate limiter should know about it.
+        """
+        retry = Retry(
+            total=self.MAX_RETRIES,
+            backoff_factor=self.RETRY_BACKOFF,
+            status_forcelist=[500, 502, 503, 504],
+            respect_retry_after_header=False,
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=retry
+        )
+        session = Session()
+        session.mount("https://", adapter)
+        return session
+
+    def connection_stats(self) -> dict[str, int]:
+        """Count the requests and new connections of the session.
+
+        The requests that did not need a new connection reused a kept-alive one.
+        """
+        requests = connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():  # noqa: SIM118
+                pool = pools[key]
+                requests += pool.num_requests
+                connections += pool.num_connections
+        return {
+            "requests": requests,
+            "connections": connections,
+            "reused": requests - connections,
+        }
+
+    def close(self) -> None:
+        """Close the connections of the session, and log their reuse and throttling."""
+        stats = self.connection_stats()
+        self.logger.info(
+            "Sent %s bunq requests over %s connections, %s reused a connection",
+            stats["requests"],
+            stats["connections"],
+            stats["reused"],
+        )
+        limiter_stats = self.rate_limiter.stats()
+        self.logger.info(
+            "Throttled bunq requests for %.1f s, retried %s after a 429",
+            limiter_stats["throttled_seconds"],
+            limiter_stats["retries"],
+        )
+        self.session.close()
+
+    def _send(self, method: str, endpoint: str, url: str, **kwargs: Any) -> Response:
+        """Send a request within the rate limit, and retry it if bunq returns 429.
+
+        Bunq did not process a throttled request, hence POSTs are retried as well.
+        """
+        bucket = self._bucket(method, endpoint)
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.rate_limiter.acquire(bucket)
+            response = self.session.request(
+                method,
+                url,
+                timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT),
+                **kwargs,
+            )
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:  # noqa: PLR2004
+                break
+            self.logger.warning("Bunq throttled %s %s, backing off", method, url)
+            self.rate_limiter.backoff(
+                bucket, attempt, parse_retry_after(response.headers.get("Retry-After"))
+            )
+        return response
+
+    def _bucket(self, method: str, endpoint: str) -> str:
+        """Use the bucket of the endpoint if it has a limit, else of the method."""
+        bucket = f"{method} {endpoint}"
+        return bucket if bucket in self.rate_limiter.limits else method
 
     def post(
         self,
@@ -77,20 +198,28 @@ class BaseClient:
             The variables to format the endpoint url with.
 
         """
+        url = self._format_endpoint(endpoint, **endpoint_variables)
         headers = headers or {}
         data = data or {}
-        headers = {
-            **self._default_headers(endpoint),
-            "X-Bunq-Client-Signature": self.signer.sign(data),
-            **headers,
-        }
-        response = post(
-            self._format_endpoint(endpoint, **endpoint_variables),
-            data=json.dumps(data).encode(),
-            headers=headers,
-            timeout=5,
-        )
-        return self._handle_response(response)
+
+        def request() -> dict:
+            all_headers = {
+                **self._default_headers(endpoint),
+                "X-Bunq-Client-Signature": self.signer.sign(data),
+                **headers,
+            }
+            response = self._send(
+                "POST",
+                endpoint,
+                url,
+                data=json.dumps(data).encode(),
+                headers=all_headers,
+            )
+            return self._handle_response(response)
+
+        if endpoint in self.AUTHENTICATION_ENDPOINTS:
+            return request()
+        return self.cassette.play(f"POST {url}", request)
 
     def get(
         self,
@@ -112,14 +241,18 @@ class BaseClient:
             The variables to format the endpoint url with.
 
         """
-        headers = self._default_headers(endpoint)
-        response = get(
-            self._format_endpoint(endpoint, **endpoint_variables),
-            params=params or {},
-            headers=headers,
-            timeout=5,
+        url = self._format_endpoint(endpoint, **endpoint_variables)
+        params = params or {}
+
+        def request() -> dict:
+            headers = self._default_headers(endpoint)
+            response = self._send("GET", endpoint, url, params=params, headers=headers)
+            return self._handle_response(response)
+
+        query = urlencode(sorted(params.items()))
+        return self.cassette.play(
+            f"GET {url}?{query}" if query else f"GET {url}", request
         )
-        return self._handle_response(response)
 
     def get_paginated(
         self,
@@ -130,12 +263,39 @@ class BaseClient:
         page_size: int = 200,
         **endpoint_variables: Any,
     ) -> list:
-        """Perform a GET request in a paginated way.
+        """Perform a GET request in a paginated way, and return all items at once.
+
+        See iter_pages for the parameters.
+        """
+        return [
+            item
+            for page in self.iter_pages(
+                endpoint=endpoint,
+                params=params,
+                continue_loading_pages=continue_loading_pages,
+                page_size=page_size,
+                **endpoint_variables,
+            )
+            for item in page
+        ]
+
+    def iter_pages(
+        self,
+        *,
+        endpoint: str,
+        params: dict | None = None,
+        continue_loading_pages: Callable[[list], bool] | None = None,
+        page_size: int = 200,
+        newer: bool = False,
+        **endpoint_variables: Any,
+    ) -> Iterator[list]:
+        """Perform a GET request in a paginated way, and yield one page at a time.
 
         List endpoints support pagination. Add the count paramter to the request,
-        and continue loading pages until done. Assumption is we load newer pages first.
-        Therefor done is when there is no older url, and the provided callback returns
-        False.
+        and continue loading pages until done. By default, we load newer pages first.
+        Therefor done is when there is no older url, or the provided callback returns
+        False. If newer, the newer url is followed instead, eg to load the items after
+        a newer_id param. The next page is only requested once the caller asks for it.
 
         Parameters
         ----------
@@ -148,34 +308,28 @@ class BaseClient:
             Should consume the last page, and return True if more pages should be loaded
         page_size : int, optional
             The amount of items to load per page, by default 200
+        newer : bool, optional
+            Whether to follow the newer url instead of the older url, by default False
         endpoint_variables : Any
             The variables to format the endpoint with.
 
         """
-        params = params or {}
+        params = {**(params or {}), "count": page_size}
+        next_url = "newer_url" if newer else "older_url"
         done = False
-        result = []
         while not done:
-            response = self.get(
-                endpoint=endpoint,
-                data={**params, "count": page_size},
-                **endpoint_variables,
-            )
+            response = self.get(endpoint=endpoint, params=params, **endpoint_variables)
             last_page = response["Response"]
-            result.extend(last_page)
-            pagination = response["Pagination"]
-            done = (
-                "Pagination" not in response
-                or "older_url" not in pagination
-                or not pagination["older_url"]
-            ) or (
+            yield last_page
+            pagination = response.get("Pagination") or {}
+            done = not pagination.get(next_url) or (
                 continue_loading_pages is not None
                 and not continue_loading_pages(last_page)
             )
             if not done:
-                endpoint = pagination["older_url"]
-                page_size = None
-        return result
+                # The next url contains all parameters, including the count
+                endpoint = pagination[next_url]
+                params = {}
 
     def _default_headers(self, endpoint: str) -> dict:
         """All required headers. Authentication is based on the endpoint."""
@@ -233,3 +387,11 @@ class BaseClient:
             return "https://api.bunq.com/v1"
         msg = f"Invalid bunq environment: {self.environment}"
         raise ValueError(msg)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header in seconds. Dates are ignored."""
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -1,6 +1,7 @@
 import platform
 from datetime import datetime, timedelta
 from logging import LoggerAdapter
+from threading import Event, Lock, Thread
 from typing import TYPE_CHECKING
 
 from cryptography.hazmat.primitives import serialization
@@ -31,6 +32,11 @@ class SessionActivator:
     This way, we do not need to call an initial setup() method, but can call
     any endpoint directly after initializing the class.
 
+    Renewals are single-flight: one thread renews the session, while holding the
+    lock of the bunq config file. Other threads and processes wait for it, and then
+    use the new session from the config. Optionally, a background thread renews the
+    session before it expires, such that requests do not wait for a renewal.
+
     Attributes
     ----------
         logger (LoggerAdapter): The logger
@@ -40,6 +46,10 @@ class SessionActivator:
         SAFETY_MARGIN_SESSION_EXPIRATION_SECONDS (int): The safety margin for session
         expiration. If the session expires in less than this amount of seconds, a new
         session is created.
+        REFRESH_MARGIN_SECONDS (int): The background refresher renews the session this
+        amount of seconds before it expires (after the safety margin).
+        REFRESH_RETRY_SECONDS (int): The minimum seconds between two renewals of the
+        background refresher, eg to retry a failed renewal.
 
     """
 
@@ -47,6 +57,8 @@ class SessionActivator:
     bunq_client: "BaseClient"
     bunq_config: JsonDict
     SAFETY_MARGIN_SESSION_EXPIRATION_SECONDS = 60
+    REFRESH_MARGIN_SECONDS = 300
+    REFRESH_RETRY_SECONDS = 60
 
     @inject
     def __init__(
@@ -58,11 +70,62 @@ class SessionActivator:
         self.bunq_client = bunq_client
         self.bunq_config = bunq_config
         self.logger = logger
+        self._lock = Lock()
+        self._refresher: Thread | None = None
+        self._stop_refresher = Event()
+
+    def ensure_session_active(self, margin_seconds: float = 0) -> None:
+        """Create a new session if there is none, or it expires within the margin.
 
-    def ensure_session_active(self) -> None:
-        if self.session_token is None:
-            self.logger.info("Session expired;")
-            self._create_session()
+        Waits if another thread or process is renewing the session already, and only
+        renews if the session is still expiring once it is done.
+        """
+        if not self._session_expires_within(margin_seconds):
+            return
+        with self._lock, self.bunq_config.locked():
+            if self._session_expires_within(margin_seconds):
+                self.logger.info("Session expired;")
+                self._create_session()
+
+    def start_refresher(self) -> None:
+        """Renew the session in a background thread, before it expires."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop_refresher.clear()
+        self._refresher = Thread(
+            target=self._refresh, name="bunq-session-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop_refresher(self) -> None:
+        """Stop the background refresher, and wait for it to finish."""
+        self._stop_refresher.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def _refresh(self) -> None:
+        """Renew the session REFRESH_MARGIN_SECONDS before it expires, until stopped."""
+        while not self._stop_refresher.is_set():
+            try:
+                self.ensure_session_active(self.REFRESH_MARGIN_SECONDS)
+                expires_at = datetime.fromisoformat(
+                    self.bunq_config["session_context.expires_at"]
+                )
+                refresh_at = expires_at - timedelta(seconds=self.REFRESH_MARGIN_SECONDS)
+                wait = (refresh_at - now()).total_seconds()
+            except Exception:
+                self.logger.exception("Could not refresh the bunq session")
+                wait = 0
+            self._stop_refresher.wait(max(wait, self.REFRESH_RETRY_SECONDS))
+
+    def _session_expires_within(self, seconds: float) -> bool:
+        expires_at = self.bunq_config["session_context.expires_at"]
+        return (
+            self.bunq_config["session_context.token"] is None
+            or expires_at is None
+            or datetime.fromisoformat(expires_at) - now() < timedelta(seconds=seconds)
+        )
 
     @property
     def installation_token(self) -> str | None:
@@ -80,10 +143,9 @@ class SessionActivator:
         """(Re)create a session. Activate API token if not done yet.
 
         Third and last step in the bunq authentication flow.
-        Stores the session token and expiration in the config.
+        Stores the session token and expiration in the config. Called by
+        ensure_session_active, within the lock of the config.
         """
-        if self.session_token is not None:
-            return
         if not self._api_token_activated:
             self.activate_api_token()
 
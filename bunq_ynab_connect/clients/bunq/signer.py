@@ -16,7 +16,8 @@ from bunq_ynab_connect.helpers.json_dict import JsonDict
 class Signer:
     """Signs and verifies Bunq API requests.
 
-    Loads its keys from the bunq config file.
+    Loads its keys from the bunq config file. The parsed keys are cached, and a key
+    is only parsed again if its PEM in the installation context changed.
 
     Attributes
     ----------
@@ -37,6 +38,13 @@ class Signer:
     ) -> None:
         self.logger = logger
         self.bunq_config = bunq_config
+        self._pems: tuple[str | None, str | None] = (None, None)
+        self._keys: tuple[RSAPrivateKey | None, RSAPublicKey | None] = (None, None)
+
+    def invalidate(self) -> None:
+        """Parse the keys from the config again upon next use."""
+        self._pems = (None, None)
+        self._keys = (None, None)
 
     def sign(self, data: dict) -> str:
         return b64encode(
@@ -65,13 +73,25 @@ class Signer:
 
     @property
     def _private_key(self) -> RSAPrivateKey:
-        return serialization.load_pem_private_key(
-            self.bunq_config["installation_context.private_key_client"].encode(),
-            password=None,
-        )
+        return self._load_keys()[0]
 
     @property
     def _server_public_key(self) -> RSAPublicKey | None:
-        if key := self.bunq_config["installation_context.public_key_server"]:
-            return serialization.load_pem_public_key(key.encode())
-        return None
+        return self._load_keys()[1]
+
+    def _load_keys(self) -> tuple[RSAPrivateKey | None, RSAPublicKey | None]:
+        """Get the cached keys, or parse them if they changed in the config."""
+        context = self.bunq_config["installation_context"] or {}
+        pems = (context.get("private_key_client"), context.get("public_key_server"))
+        if pems != self._pems:
+            private_pem, public_pem = pems
+            self._keys = (
+                serialization.load_pem_private_key(private_pem.encode(), password=None)
+                if private_pem
+                else None,
+                serialization.load_pem_public_key(public_pem.encode())
+                if public_pem
+                else None,
+            )
+            self._pems = pems
+        return self._keys
@@ -1,5 +1,6 @@
+from collections.abc import Iterator
 from datetime import datetime
-from functools import partial
+from itertools import takewhile
 from logging import LoggerAdapter
 
 import pytz
@@ -29,6 +30,16 @@ class Callback(BaseModel):
         )
 
 
+def payments_after(payments: list[dict], last_runmoment: datetime) -> list[dict]:
+    """Get the leading payments of a page (newest first) created after the moment."""
+    return list(
+        takewhile(
+            lambda p: parse(p["created"]).replace(tzinfo=pytz.UTC) > last_runmoment,
+            payments,
+        )
+    )
+
+
 class BunqClient:
     """Client to expose specific bunq API calls.
 
@@ -64,55 +75,60 @@ class BunqClient:
         self.base_client = base_client
         self.bunq_config = bunq_config
 
-    def _should_continue_loading_payments(
+    def get_payments_for_account(
         self,
-        last_page: list,
+        account: BunqAccount,
         last_runmoment: datetime | None = None,
-    ) -> bool:
-        """Check if should load more payments.
-
-        If the oldest payment of the last page is newer than the last runmoment,
-        we should continue loading payments older payments.
-        """
-        if not last_runmoment:
-            return True
-        earliest_payment = last_page[-1]
-        created_at = parse(earliest_payment["Payment"]["created"]).replace(
-            tzinfo=pytz.UTC
-        )
-        return created_at > last_runmoment
-
-    def get_payments_for_account(
-        self, account: BunqAccount, last_runmoment: datetime | None = None
+        newer_id: int | None = None,
     ) -> list[dict]:
         """Get the payments of an account.
 
-        If the last runmoment is provided, only payments after that moment are loaded.
+        See iter_payment_pages_for_account for the parameters.
         """
-        user_id = self.user_id
-        payments: list[dict] = self.base_client.get_paginated(
-            endpoint="user/{user_id}/monetary-account/{account_id}/payment",
-            user_id=user_id,
-            account_id=account.id,
-            page_size=self.ITEMS_PER_PAGE,
-            continue_loading_pages=partial(
-                self._should_continue_loading_payments, last_runmoment=last_runmoment
-            ),
-        )
-        # Remove payments after last runmoment, and flatten
-        if last_runmoment:
-            payments = [
-                p["Payment"]
-                for p in payments
-                if parse(p["Payment"]["created"]).replace(tzinfo=pytz.UTC)
-                > last_runmoment
-            ]
+        payments = [
+            payment
+            for page in self.iter_payment_pages_for_account(
+                account, last_runmoment, newer_id
+            )
+            for payment in page
+        ]
         if len(payments) > 0:
             self.logger.info(
                 "Loaded %s payments for account %s", len(payments), account.id
             )
         return payments
 
+    def iter_payment_pages_for_account(
+        self,
+        account: BunqAccount,
+        last_runmoment: datetime | None = None,
+        newer_id: int | None = None,
+    ) -> Iterator[list[dict]]:
+        """Yield the payments of an account, one page at a time.
+
+        If the newer id is provided, only payments after that payment are loaded,
+        oldest page first. Without new payments, this is a single request. Otherwise
+        the pages are loaded newest first. If the last runmoment is provided, loading
+        stops at the first payment that was created before it.
+        """
+        pages = self.base_client.iter_pages(
+            endpoint="user/{user_id}/monetary-account/{account_id}/payment",
+            user_id=self.user_id,
+            account_id=account.id,
+            params=None if newer_id is None else {"newer_id": newer_id},
+            page_size=self.ITEMS_PER_PAGE,
+            newer=newer_id is not None,
+        )
+        for page in pages:
+            payments = [p["Payment"] for p in page]
+            if newer_id is not None or not last_runmoment:
+                yield payments
+                continue
+            new_payments = payments_after(payments, last_runmoment)
+            yield new_payments
+            if len(new_payments) < len(payments):
+                return
+
     def get_accounts(
         self,
     ) -> list[dict]:
@@ -153,10 +169,12 @@ class BunqClient:
         if "session_context" in config:
             del config["session_context"]
         self.bunq_config.save(config)
+        self.base_client.signer.invalidate()
         try:
             self.base_client.session_activator.activate_api_token(name)
         except Exception as e:
             self.bunq_config.save(old_config)
+            self.base_client.signer.invalidate()
             msg = "Could not trade PAT for new bunq config"
             self.logger.exception(msg)
             raise ValueError(msg) from e
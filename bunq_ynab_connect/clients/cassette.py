@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+import json
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from time import sleep
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class CassetteMode(Enum):  # noqa: D101
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class Cassette:
+    """Record the responses of an API to a compressed file, or replay them.
+
+    A client passes each request through play, with a key that identifies the
+    request (eg the method and url). When recording, the request is sent and its
+    response is appended to the file. When replaying, no request is sent: the
+    recorded responses of a key are served in the order they were recorded. Once
+    they are used up, the last response of the key is repeated. Replays are thus
+    deterministic, and do not need the network.
+
+    The file stores one gzipped JSON line per response, such that recording only
+    appends, and an interrupted recording is still readable. The responses contain
+    financial data, hence only the owner may read the file.
+
+    Attributes
+    ----------
+        path: The file with the recorded responses.
+        mode: Whether to record, replay, or just send the requests.
+        latency: The seconds to wait before serving a replayed response, to mimic
+            the latency of the API.
+        FILE_MODE: The permissions of a recorded file.
+
+    """
+
+    path: Path
+    mode: CassetteMode
+    latency: float
+    FILE_MODE = 0o600
+
+    def __init__(
+        self, path: Path, mode: CassetteMode = CassetteMode.OFF, latency: float = 0.0
+    ) -> None:
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._responses: dict[str, list[Any]] = {}
+        self._positions = Counter()
+        self._lock = Lock()
+        if mode == CassetteMode.REPLAY:
+            self._load()
+        elif mode == CassetteMode.RECORD:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch(mode=self.FILE_MODE)
+            path.chmod(self.FILE_MODE)
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            msg = f"No recorded responses at {self.path}; record them first"
+            raise FileNotFoundError(msg)
+        with gzip.open(self.path, "rt") as f:
+            for line in f:
+                record = json.loads(line)
+                self._responses.setdefault(record["key"], []).append(record["response"])
+
+    def play(
+        self,
+        key: str,
+        request: Callable[[], T],
+        encode: Callable[[T], Any] | None = None,
+        decode: Callable[[Any], T] | None = None,
+    ) -> T:
+        """Send a request, record its response, or replay the recorded response.
+
+        Parameters
+        ----------
+            key: Identifies the request, eg "GET <url>".
+            request: Sends the request, and returns the response.
+            encode: Converts the response to JSON serializable data, to record it.
+            decode: Converts the recorded data back to a response.
+
+        Raises
+        ------
+            LookupError: If replaying, and no response of the key was recorded.
+
+        """
+        if self.mode == CassetteMode.REPLAY:
+            response = self._next(key)
+            if self.latency:
+                sleep(self.latency)
+            return decode(response) if decode else response
+        response = request()
+        if self.mode == CassetteMode.RECORD:
+            self._record(key, encode(response) if encode else response)
+        return response
+
+    async def play_async(
+        self,
+        key: str,
+        request: Callable[[], Awaitable[T]],
+        encode: Callable[[T], Any] | None = None,
+        decode: Callable[[Any], T] | None = None,
+    ) -> T:
+        """Like play, for a request that is awaited. See play for the parameters."""
+        if self.mode == CassetteMode.REPLAY:
+            response = self._next(key)
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return decode(response) if decode else response
+        response = await request()
+        if self.mode == CassetteMode.RECORD:
+            self._record(key, encode(response) if encode else response)
+        return response
+
+    def _next(self, key: str) -> Any:
+        """Get the next recorded response of a key, or repeat the last one."""
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                msg = f"No recorded response for {key} in {self.path}"
+                raise LookupError(msg)
+            position = min(self._positions[key], len(responses) - 1)
+            self._positions[key] += 1
+            return responses[position]
+
+    def _record(self, key: str, response: Any) -> None:
+        line = json.dumps({"key": key, "response": response}, default=str)
+        with self._lock, gzip.open(self.path, "at") as f:
+            f.write(line + "\n")
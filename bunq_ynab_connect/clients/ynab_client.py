@@ -1,16 +1,98 @@
 import os
 from datetime import datetime
 from logging import LoggerAdapter
+from types import SimpleNamespace
+from typing import Any
 
 import ynab
 from kink import inject
-from ynab import ApiClient, NewTransaction, TransactionDetail
+from ynab import (
+    ApiClient,
+    NewTransaction,
+    SaveTransactionsResponseData,
+    TransactionDetail,
+)
 from ynab.models.account import Account
 from ynab.models.budget_summary import BudgetSummary
+from ynab.rest import RESTResponse
 
+from bunq_ynab_connect.clients.cassette import Cassette, CassetteMode
+from bunq_ynab_connect.helpers.rate_limiter import RateLimiter
 from bunq_ynab_connect.models.ynab_account import YnabAccount
 
 
+class CassetteApiClient(ApiClient):
+    """YNAB API client that passes each request through a rate limiter and cassette.
+
+    All requests of the YNAB SDK go through call_api. A replayed request skips the
+    rate limiter, and is deserialized by the SDK like a sent one.
+
+    Attributes
+    ----------
+        rate_limiter: Limits the requests of all threads together
+        cassette: Records the responses, or replays them without sending requests
+
+    """
+
+    rate_limiter: RateLimiter
+    cassette: Cassette
+
+    def __init__(
+        self,
+        configuration: ynab.Configuration,
+        rate_limiter: RateLimiter,
+        cassette: Cassette,
+    ) -> None:
+        super().__init__(configuration)
+        self.rate_limiter = rate_limiter
+        self.cassette = cassette
+
+    def call_api(
+        self,
+        method: str,
+        url: str,
+        header_params: dict | None = None,
+        body: Any = None,
+        post_params: list | None = None,
+        _request_timeout: Any = None,
+    ) -> RESTResponse:
+        send = super().call_api
+
+        def request() -> RESTResponse:
+            self.rate_limiter.acquire()
+            response = send(
+                method, url, header_params, body, post_params, _request_timeout
+            )
+            response.read()
+            return response
+
+        return self.cassette.play(
+            f"{method} {url}", request, encode=_encode_response, decode=_decode_response
+        )
+
+
+def _encode_response(response: RESTResponse) -> dict:
+    return {
+        "status": response.status,
+        "reason": response.reason,
+        "headers": {"content-type": response.getheader("content-type")},
+        "data": response.data.decode(),
+    }
+
+
+def _decode_response(recorded: dict) -> RESTResponse:
+    response = RESTResponse(
+        SimpleNamespace(
+            status=recorded["status"],
+            reason=recorded["reason"],
+            headers=recorded["headers"],
+            data=recorded["data"].encode(),
+        )
+    )
+    response.read()
+    return response
+
+
 @inject
 class YnabClient:
     """Client for the YNAB API.
@@ -18,30 +100,44 @@ class YnabClient:
     Attributes
     ----------
         logger: The logger to use
-        client: The YNAB API client
+        client: The YNAB API client. Passes each request through the rate limiter,
+            and records or replays it with the cassette
+        rate_limiter: Limits the requests of all threads together
+        cassette: Records the responses, or replays them without sending requests
 
     """
 
     logger: LoggerAdapter
     client: ApiClient
+    rate_limiter: RateLimiter
+    cassette: Cassette
 
-    def __init__(self, logger: LoggerAdapter):
+    def __init__(
+        self,
+        logger: LoggerAdapter,
+        ynab_rate_limiter: RateLimiter,
+        ynab_cassette: Cassette,
+    ):
         self.logger = logger
+        self.rate_limiter = ynab_rate_limiter
+        self.cassette = ynab_cassette
         self.client = self._load_api_client()
 
     def _load_api_client(self) -> ApiClient:
         """Load the YNAB API client.
 
-        If no token is found in the environment variables, raise an exception.
-        Initialize a Configuration object with the token.
+        If no token is found in the environment variables, raise an exception, unless
+        the responses are replayed. Initialize a Configuration object with the token.
         """
         token = os.getenv("YNAB_TOKEN")
-        if not token:
+        if not token and self.cassette.mode != CassetteMode.REPLAY:
             msg = "Please set your your ynab token as YNAB_TOKEN"
             self.logger.error(msg)
             raise ValueError(msg)
 
-        return ApiClient(ynab.Configuration(access_token=token))
+        return CassetteApiClient(
+            ynab.Configuration(access_token=token), self.rate_limiter, self.cassette
+        )
 
     def get_account_for_budget(self, budget_id: str) -> list[Account]:
         """Load the accounts for a budget."""
@@ -89,6 +185,40 @@ class YnabClient:
             )
         return result
 
+    def get_transactions_for_budget(
+        self,
+        budget_id: str,
+        last_knowledge_of_server: int | None = None,
+        since_date: datetime | None = None,
+    ) -> tuple[list[TransactionDetail], int]:
+        """Load the transactions of a budget that changed since the server knowledge.
+
+        Uses a single request per budget. The changes include edits and deletions of
+        transactions of any date. Without server knowledge, load the transactions
+        since since_date instead.
+
+        Returns
+        -------
+            The changed transactions, and the server knowledge to pass next time.
+
+        """
+        api = ynab.TransactionsApi(self.client)
+        try:
+            response = api.get_transactions(
+                budget_id,
+                since_date=since_date.date() if since_date else None,
+                last_knowledge_of_server=last_knowledge_of_server,
+            )
+        except Exception as e:
+            msg = f"Could not get transactions for budget {budget_id}"
+            self.logger.exception(msg)
+            raise OSError(msg) from e
+        transactions = response.data.transactions
+        self.logger.info(
+            "Loaded %s changed transactions for budget %s", len(transactions), budget_id
+        )
+        return transactions, response.data.server_knowledge
+
     def create_transaction(self, transaction: NewTransaction, budget_id: str) -> None:
         """Add a transaction to a budget."""
         api = ynab.TransactionsApi(self.client)
@@ -101,3 +231,32 @@ class YnabClient:
             msg = f"Could not add transaction {transaction} to budget {budget_id}"
             self.logger.exception(msg)
             raise OSError(msg) from e
+
+    def create_transactions(
+        self, transactions: list[NewTransaction], budget_id: str
+    ) -> SaveTransactionsResponseData:
+        """Add several transactions to a budget with a single request.
+
+        Returns
+        -------
+            The response data. It contains the created transactions, and the import
+            ids of the transactions that YNAB refused since they already exist.
+
+        """
+        api = ynab.TransactionsApi(self.client)
+        try:
+            response = api.create_transaction(
+                budget_id, data={"transactions": transactions}
+            )
+        except Exception as e:
+            msg = (
+                f"Could not add {len(transactions)} transactions to budget {budget_id}"
+            )
+            self.logger.exception(msg)
+            raise OSError(msg) from e
+        self.logger.info(
+            "Added %s transactions to budget %s",
+            len(response.data.transactions or []),
+            budget_id,
+        )
+        return response.data
@@ -1,12 +1,19 @@
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from logging import LoggerAdapter
+from queue import Full, Queue
+from threading import Event
+from typing import Any, ClassVar
 
 import pandas as pd
 from kink import inject
 
+from bunq_ynab_connect.data.data_extractors.checkpoint import Checkpoint
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
 from bunq_ynab_connect.helpers.general import now
 
 
@@ -20,7 +27,17 @@ class AbstractExtractor(ABC):
         logger: The logger to log to
         last_runmoment: The last runmoment of the extractor
         runmoment: The current runmoment of the extractor
+        result: The counts of the last incremental extract, eg to detect that
+            nothing changed
+        is_complete: Whether all items were loaded. If not, the last runmoment is
+            not updated, such that the next run loads the missed window again
         IS_FULL_LOAD: Whether the extractor is a full load extractor
+        OVERWRITE_DIFF: For a full load, only write the rows that changed, instead
+            of replacing all rows
+        DEPENDS_ON: The destinations that should be extracted before this one,
+            because load reads them. Used by the ExtractorGraph
+        MAX_WORKERS: The maximum amount of items to load at the same time
+        PAGE_SIZE: The amount of rows to upsert at once
 
     """
 
@@ -29,8 +46,14 @@ class AbstractExtractor(ABC):
     logger: LoggerAdapter
     last_runmoment: datetime
     runmoment: datetime
+    result: UpsertResult
+    is_complete: bool
 
     IS_FULL_LOAD = False
+    OVERWRITE_DIFF = False
+    DEPENDS_ON: ClassVar[list[str]] = []
+    MAX_WORKERS = 4
+    PAGE_SIZE = 1000
 
     @inject
     def __init__(
@@ -42,25 +65,161 @@ class AbstractExtractor(ABC):
 
     @abstractmethod
     def load(self) -> Iterable:
-        """Load the data from the source."""
+        """Load the data from the source.
+
+        May be a generator, that yields rows while loading them. Such an extractor
+        can also yield a Checkpoint, to save its progress once the rows before it
+        are stored.
+        """
         raise NotImplementedError
 
     def extract(self) -> None:
-        """Extract the data from the bunq API, and save it in self.data.
+        """Extract the data from the source, and save it in the storage.
 
         - Set current runmoment and load last runmoment
-        - Load data from bunq API
-        - Save data to storage. Upsert or ovewrite depending on IS_FULL_LOAD
-        - Set last runmoment
+        - Load data from the source
+        - Save data to storage. Overwrite at once if IS_FULL_LOAD, and only the
+            changed rows if OVERWRITE_DIFF. Otherwise, upsert PAGE_SIZE rows at a
+            time while loading, and save each checkpoint once the rows before it
+            are stored. Log the new, changed and unchanged counts of the storage
+        - Set last runmoment, if all items were loaded. Extractors that load per
+            account also yield a watermark_checkpoint per account, such that each
+            account advances on its own
         """
+        self.is_complete = True
+        self.result = UpsertResult()
         self.runmoment = now()
         self.logger.info("Extracting %s", self.destination)
         self.last_runmoment = self.storage.get_last_runmoment(self.destination)
-        data = self.load()
+        rows = self.load()
         if self.IS_FULL_LOAD:
+            data = [row for row in rows if not isinstance(row, Checkpoint)]
             data_pd = pd.DataFrame.from_records(data)
-            self.storage.overwrite(self.destination, data_pd)
+            self.storage.overwrite(self.destination, data_pd, diff=self.OVERWRITE_DIFF)
+            count = len(data)
         else:
-            self.storage.upsert(self.destination, data)
-        self.logger.info("Extracted %s items from %s", len(data), self.destination)
+            self.result = self._upsert_pages(rows)
+            self.logger.info(
+                "Upserted %s: %s new, %s changed, %s unchanged, %s skipped",
+                self.destination,
+                self.result.upserted,
+                self.result.modified,
+                self.result.unchanged,
+                self.result.skipped,
+            )
+            count = (
+                self.result.matched
+                + self.result.upserted
+                + self.result.skipped
+                + self.result.unchanged
+            )
+        self.logger.info("Extracted %s items from %s", count, self.destination)
+        if not self.is_complete:
+            self.logger.warning(
+                "Not all items of %s were loaded. Keep the last runmoment, to retry",
+                self.destination,
+            )
+            return
         self.storage.set_last_runmoment(self.destination, self.runmoment)
+
+    def _upsert_pages(self, rows: Iterable) -> UpsertResult:
+        """Upsert the rows per PAGE_SIZE, and save the checkpoints in between."""
+        result = UpsertResult()
+        page = []
+        for row in rows:
+            if isinstance(row, Checkpoint):
+                result += self.storage.upsert(self.destination, page)
+                page = []
+                row.save()
+                self.logger.info("Saved checkpoint of %s", row.description)
+                continue
+            page.append(row)
+            if len(page) >= self.PAGE_SIZE:
+                result += self.storage.upsert(self.destination, page)
+                page = []
+        return result + self.storage.upsert(self.destination, page)
+
+    def get_watermark(self, account: int | str) -> datetime:
+        """Get the last runmoment of one account (or budget) of the destination.
+
+        Each account advances its own watermark, such that a failed or slow account
+        does not hold back the others. Accounts without a watermark, eg since they
+        were added after the last run, start from the last runmoment.
+        """
+        return max(
+            self.last_runmoment,
+            self.storage.get_last_runmoment(self.destination, account=account),
+        )
+
+    def watermark_checkpoint(self, account: int | str) -> Checkpoint:
+        """Get a checkpoint, that sets the watermark of an account to the runmoment."""
+        return Checkpoint(
+            self.storage.runmoment_source(self.destination, account),
+            partial(
+                self.storage.set_last_runmoment,
+                self.destination,
+                self.runmoment,
+                account=account,
+            ),
+        )
+
+    def load_concurrently(
+        self, items: list[Any], load_item: Callable[[Any], Iterable]
+    ) -> Iterator:
+        """Call load_item for each item (eg account) in a bounded thread pool.
+
+        Yields the rows in the order of the items, regardless of which item finished
+        first. Each item buffers at most PAGE_SIZE rows ahead of the consumer, such
+        that memory stays bounded if load_item is a generator. If loading an item
+        fails, the error is logged, the rest of the item is skipped and is_complete
+        is set to False. The other items are still loaded.
+        """
+        stop = Event()
+        queues = [Queue(maxsize=self.PAGE_SIZE) for _ in items]
+        executor = ThreadPoolExecutor(
+            self.MAX_WORKERS, thread_name_prefix=self.destination
+        )
+        try:
+            for item, queue in zip(items, queues, strict=True):
+                executor.submit(self._produce, item, load_item, queue, stop)
+            for queue in queues:
+                while (row := queue.get()) is not _DONE:
+                    yield row
+        finally:
+            # Stop the producers if the consumer stops early, eg on an error
+            stop.set()
+            executor.shutdown(cancel_futures=True)
+
+    def _produce(
+        self,
+        item: Any,
+        load_item: Callable[[Any], Iterable],
+        queue: Queue,
+        stop: Event,
+    ) -> None:
+        """Put the rows of one item on its queue, followed by _DONE."""
+        try:
+            for row in load_item(item):
+                if not _put(queue, row, stop):
+                    return
+        except Exception:
+            self.logger.exception(
+                "Could not load %s of %s", self.destination, getattr(item, "id", item)
+            )
+            self.is_complete = False
+        _put(queue, _DONE, stop)
+
+
+# Marks the end of the rows of an item in load_concurrently
+_DONE = object()
+
+
+def _put(queue: Queue, row: Any, stop: Event) -> bool:
+    """Put a row on a queue. Give up if stop is set while the queue is full."""
+    while not stop.is_set():
+        try:
+            queue.put(row, timeout=0.1)
+        except Full:
+            continue
+        return True
+    return False
@@ -14,11 +14,13 @@ class BunqAccountExtractor(AbstractExtractor):
     ----------
         client: The bunq client to use to get the payments
         IS_FULL_LOAD: Always load all accounts
+        OVERWRITE_DIFF: Accounts rarely change, hence only write the changed ones
 
     """
 
     client: BunqClient
     IS_FULL_LOAD = True
+    OVERWRITE_DIFF = True
 
     @inject
     def __init__(
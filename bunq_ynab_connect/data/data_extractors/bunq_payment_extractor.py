@@ -1,9 +1,13 @@
+from collections.abc import Iterator
+from functools import partial
 from logging import LoggerAdapter
+from typing import ClassVar
 
 from kink import inject
 
 from bunq_ynab_connect.clients.bunq_client import BunqClient
 from bunq_ynab_connect.data.data_extractors.abstract_extractor import AbstractExtractor
+from bunq_ynab_connect.data.data_extractors.checkpoint import Checkpoint
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
 from bunq_ynab_connect.models.bunq_account import BunqAccount
 from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
@@ -12,18 +16,23 @@ from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
 class BunqPaymentExtractor(AbstractExtractor):
     """Extractor for bunq payments.
 
-    Loads all payments from all accounts.
+    Loads all payments from all accounts. Each account keeps its own cursor, ie the
+    id of its newest stored payment, such that only newer payments are loaded. Each
+    account also keeps its own watermark, for accounts without a cursor.
 
     Attributes
     ----------
         client: The bunq client to use to get the payments
         payment_queue: The payment queue to use to queue payments
-            All loaded payments are added to the queue, such that they can be processed
+            All loaded payments are added to the queue, such that they can be processed.
+            A page is queued in a checkpoint, once its payments are stored.
+        DEPENDS_ON: The payments are loaded per account
 
     """
 
     client: BunqClient
     payment_queue: PaymentQueue
+    DEPENDS_ON: ClassVar[list[str]] = ["bunq_accounts"]
 
     @inject
     def __init__(
@@ -37,19 +46,51 @@ class BunqPaymentExtractor(AbstractExtractor):
         self.client = client
         self.payment_queue = payment_queue
 
-    def load(self) -> list:
+    def load(self) -> Iterator[dict | Checkpoint]:
         """Load the data from the source.
 
-        Loads all payments from all accounts
+        Loads the payments of all accounts concurrently, page by page
         """
         accounts = self.storage.get_as_entity(
             "bunq_accounts", BunqAccount, provide_kwargs_as_json=False
         )
-        payments = []
-        for account in accounts:
-            payments.extend(
-                self.client.get_payments_for_account(account, self.last_runmoment)
+        return self.load_concurrently(accounts, self._load_account)
+
+    def _load_account(self, account: BunqAccount) -> Iterator[dict | Checkpoint]:
+        """Yield the new payments of an account, with checkpoints of its progress.
+
+        The cursor is the id of the newest payment that was stored. If the account
+        has one, only the payments after it are loaded, oldest page first, and the
+        cursor is stored after each page. Otherwise, the payments since the
+        watermark of the account are loaded newest first, and the cursor is stored
+        at the end. The watermark of the account is set once it is loaded.
+
+        The payments of a page are queued once they are stored, such that the syncer
+        finds each queued payment.
+        """
+        cursor = self.storage.get_cursor(self.destination, account=account.id)
+        incremental = cursor is not None
+        for page in self.client.iter_payment_pages_for_account(
+            account, self.get_watermark(account.id), newer_id=cursor
+        ):
+            ids = [payment["id"] for payment in page]
+            if not ids:
+                continue
+            yield from page
+            yield Checkpoint(
+                f"queue of {len(ids)} payments of account {account.id}",
+                partial(self.payment_queue.add_many, ids),
             )
-        for payment in payments:
-            self.payment_queue.add(payment["id"])
-        return payments
+            cursor = max(cursor or 0, *ids)
+            if incremental:
+                yield self._cursor_checkpoint(account.id, cursor)
+        if not incremental and cursor is not None:
+            yield self._cursor_checkpoint(account.id, cursor)
+        yield self.watermark_checkpoint(account.id)
+
+    def _cursor_checkpoint(self, account_id: int, cursor: int) -> Checkpoint:
+        source = self.storage.runmoment_source(self.destination, account_id)
+        return Checkpoint(
+            f"{source} at {cursor}",
+            partial(self.storage.set_cursor, self.destination, cursor, account_id),
+        )
@@ -0,0 +1,20 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+@dataclass
+class Checkpoint:
+    """A marker that an extractor yields between its rows, to persist its progress.
+
+    The rows before the checkpoint are stored first, and then save is called. If
+    the run is interrupted later on, the next run resumes from the checkpoint.
+
+    Attributes
+    ----------
+        description: What progress is saved, for logging. Eg the account.
+        save: Persists the progress, eg by setting the runmoment of the account.
+
+    """
+
+    description: str
+    save: Callable[[], None]
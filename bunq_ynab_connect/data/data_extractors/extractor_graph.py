@@ -0,0 +1,157 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
+from logging import LoggerAdapter
+from time import perf_counter
+from typing import ClassVar
+
+from kink import inject
+
+from bunq_ynab_connect.data.data_extractors.abstract_extractor import AbstractExtractor
+from bunq_ynab_connect.data.data_extractors.bunq_account_extractor import (
+    BunqAccountExtractor,
+)
+from bunq_ynab_connect.data.data_extractors.bunq_payment_extractor import (
+    BunqPaymentExtractor,
+)
+from bunq_ynab_connect.data.data_extractors.ynab_account_extractor import (
+    YnabAccountExtractor,
+)
+from bunq_ynab_connect.data.data_extractors.ynab_budget_extractor import (
+    YnabBudgetExtractor,
+)
+from bunq_ynab_connect.data.data_extractors.ynab_transaction_extractor import (
+    YnabTransactionExtractor,
+)
+
+
+class ExtractorGraph:
+    """Run extractors concurrently, in the order of their dependencies.
+
+    An extractor starts as soon as the extractors in its DEPENDS_ON have finished.
+    Independent chains, such as the bunq and the YNAB chain, therefor overlap.
+    Dependencies on extractors that are not in the graph are ignored.
+
+    If an extractor fails, the extractors that depend on it are skipped. The other
+    extractors still run, after which the first error is raised.
+
+    Attributes
+    ----------
+        extractors: The extractors to run, by destination.
+        logger: The logger to log the progress and timing report to.
+        max_workers: The maximum amount of extractors that run at the same time.
+        durations: The duration in seconds of each finished extractor.
+        EXTRACTORS: The extractors that run if none are given, ie all of them.
+
+    """
+
+    extractors: dict[str, AbstractExtractor]
+    logger: LoggerAdapter
+    max_workers: int
+    durations: dict[str, float]
+    EXTRACTORS: ClassVar[list[type[AbstractExtractor]]] = [
+        BunqAccountExtractor,
+        BunqPaymentExtractor,
+        YnabBudgetExtractor,
+        YnabAccountExtractor,
+        YnabTransactionExtractor,
+    ]
+
+    @inject
+    def __init__(
+        self,
+        logger: LoggerAdapter,
+        extractors: list[AbstractExtractor] | None = None,
+        max_workers: int = 4,
+    ) -> None:
+        if extractors is None:
+            extractors = [extractor() for extractor in self.EXTRACTORS]
+        self.extractors = {e.destination: e for e in extractors}
+        self.logger = logger
+        self.max_workers = max_workers
+        self.durations = {}
+
+    def run(self) -> dict[str, float]:
+        """Run all extractors, and log how long each one took.
+
+        Returns
+        -------
+            The duration in seconds of each extractor, by destination.
+
+        Raises
+        ------
+            graphlib.CycleError: If the dependencies are circular.
+
+        """
+        self.durations = {}
+        failed: dict[str, Exception] = {}
+        skipped: list[str] = []
+        sorter = TopologicalSorter(
+            {
+                destination: self._dependencies(destination)
+                for destination in self.extractors
+            }
+        )
+        sorter.prepare()
+        start = perf_counter()
+        with ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="extractor"
+        ) as executor:
+            running: dict[Future, str] = {}
+            while sorter.is_active():
+                for destination in sorter.get_ready():
+                    if set(self._dependencies(destination)) & {*failed, *skipped}:
+                        self.logger.warning(
+                            "Skipping %s, since a dependency failed", destination
+                        )
+                        skipped.append(destination)
+                        sorter.done(destination)
+                        continue
+                    extractor = self.extractors[destination]
+                    running[executor.submit(self._extract, extractor)] = destination
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    destination = running.pop(future)
+                    try:
+                        self.durations[destination] = future.result()
+                    except Exception as e:
+                        self.logger.exception("Extractor %s failed", destination)
+                        failed[destination] = e
+                    sorter.done(destination)
+        self._report(perf_counter() - start, failed, skipped)
+        if failed:
+            raise next(iter(failed.values()))
+        return self.durations
+
+    def _dependencies(self, destination: str) -> list[str]:
+        return [
+            dependency
+            for dependency in self.extractors[destination].DEPENDS_ON
+            if dependency in self.extractors
+        ]
+
+    def _extract(self, extractor: AbstractExtractor) -> float:
+        """Run one extractor, and return its duration in seconds."""
+        start = perf_counter()
+        extractor.extract()
+        return perf_counter() - start
+
+    def _report(
+        self, total: float, failed: dict[str, Exception], skipped: list[str]
+    ) -> None:
+        """Log the duration per extractor, and the total compared to sequential."""
+        for destination, duration in sorted(
+            self.durations.items(), key=lambda item: item[1], reverse=True
+        ):
+            self.logger.info("Extracted %-20s in %8.2f s", destination, duration)
+        for destination in failed:
+            self.logger.info("Extracting %-19s failed", destination)
+        for destination in skipped:
+            self.logger.info("Extracting %-19s skipped", destination)
+        self.logger.info(
+            "Extracted %s destinations in %.2f s, %.2f s when run sequentially",
+            len(self.durations),
+            total,
+            sum(self.durations.values()),
+        )
@@ -1,4 +1,5 @@
 from logging import LoggerAdapter
+from typing import ClassVar
 
 from kink import inject
 
@@ -18,11 +19,15 @@ class YnabAccountExtractor(AbstractExtractor):
     ----------
         client: The YNAB client to use to get the accounts
         IS_FULL_LOAD: Whether the extractor is a full load extractor
+        OVERWRITE_DIFF: Accounts rarely change, hence only write the changed ones
+        DEPENDS_ON: The accounts are loaded per budget
 
     """
 
     client: YnabClient
     IS_FULL_LOAD = True
+    OVERWRITE_DIFF = True
+    DEPENDS_ON: ClassVar[list[str]] = ["ynab_budgets"]
 
     @inject
     def __init__(
@@ -1,18 +1,41 @@
+from collections.abc import Iterator
+from functools import partial
 from logging import LoggerAdapter
+from typing import ClassVar
 
 from kink import inject
 
 from bunq_ynab_connect.clients.ynab_client import YnabClient
 from bunq_ynab_connect.data.data_extractors.abstract_extractor import AbstractExtractor
+from bunq_ynab_connect.data.data_extractors.checkpoint import Checkpoint
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
 from bunq_ynab_connect.models.ynab_account import YnabAccount
+from bunq_ynab_connect.models.ynab_budget import YnabBudget
 from bunq_ynab_connect.models.ynab_transaction import YnabTransaction
 
 
 class YnabTransactionExtractor(AbstractExtractor):
-    """Extractor for YNAB transactions."""
+    """Extractor for YNAB transactions.
+
+    In delta mode, the transactions that changed since the previous run are loaded
+    with one request per budget, using the server knowledge of YNAB. The server
+    knowledge per budget is stored as its cursor in the runmoments table. The first
+    delta run of a budget loads the transactions since its watermark. The changes
+    include deleted transactions, which are removed from the storage. Otherwise, the
+    transactions since the watermark of each account are loaded per account.
+
+    Attributes
+    ----------
+        client: The YNAB client to use to get the transactions
+        DELTA: Whether to load the changes per budget, or the transactions per
+            account since the last runmoment
+        DEPENDS_ON: The transactions are loaded per budget or per account
+
+    """
 
     client: YnabClient
+    DELTA = True
+    DEPENDS_ON: ClassVar[list[str]] = ["ynab_budgets", "ynab_accounts"]
 
     @inject
     def __init__(
@@ -21,22 +44,60 @@ class YnabTransactionExtractor(AbstractExtractor):
         super().__init__("ynab_transactions", storage, logger)
         self.client = client
 
-    def load(self) -> list[dict]:
-        """Use the YNAB client to get the transactions."""
+    def load(self) -> Iterator[dict | Checkpoint]:
+        """Use the YNAB client to get the transactions, of all budgets or accounts.
+
+        The budgets or accounts are loaded concurrently.
+        """
+        if self.DELTA:
+            budgets = self.storage.get_as_entity(
+                "ynab_budgets", YnabBudget, provide_kwargs_as_json=False
+            )
+            return self.load_concurrently(budgets, self._load_budget)
         accounts = self.storage.get_as_entity(
             "ynab_accounts", YnabAccount, provide_kwargs_as_json=False
         )
-        transactions = []
-        for a in accounts:
-            transactions_for_account = self.client.get_transactions_for_account(
-                a, self.last_runmoment
+        return self.load_concurrently(accounts, self._load_account)
+
+    def _load_budget(self, budget: YnabBudget) -> Iterator[dict | Checkpoint]:
+        """Yield the changed transactions of a budget, and then checkpoints.
+
+        Deleted transactions are not yielded, but removed from the storage by the
+        first checkpoint. The second checkpoint stores the new server knowledge, once
+        the transactions are stored, such that a failed run loads the same changes
+        again.
+        """
+        last_knowledge = self.storage.get_cursor(self.destination, account=budget.id)
+        transactions, server_knowledge = self.client.get_transactions_for_budget(
+            budget.id,
+            last_knowledge_of_server=last_knowledge,
+            since_date=None if last_knowledge else self.get_watermark(budget.id),
+        )
+        deleted = []
+        for t in transactions:
+            if t.deleted:
+                deleted.append(t.id)
+                continue
+            yield YnabTransaction(**t.to_dict(), budget_id=budget.id).model_dump()
+        if deleted:
+            yield Checkpoint(
+                f"{len(deleted)} deleted transactions of budget {budget.id}",
+                partial(self.storage.delete, self.destination, [("id", "in", deleted)]),
             )
-            transactions_for_account = [
-                YnabTransaction(
-                    **t.to_dict(),
-                    budget_id=a.budget_id,
-                ).model_dump()
-                for t in transactions_for_account
-            ]
-            transactions.extend(transactions_for_account)
-        return transactions
+        yield Checkpoint(
+            self.storage.runmoment_source(self.destination, budget.id),
+            partial(
+                self.storage.set_cursor, self.destination, server_knowledge, budget.id
+            ),
+        )
+
+    def _load_account(self, account: YnabAccount) -> Iterator[dict | Checkpoint]:
+        """Yield the transactions since the watermark, and a checkpoint of it."""
+        transactions = self.client.get_transactions_for_account(
+            account, self.get_watermark(account.id)
+        )
+        for t in transactions:
+            yield YnabTransaction(
+                **t.to_dict(), budget_id=account.budget_id
+            ).model_dump()
+        yield self.watermark_checkpoint(account.id)
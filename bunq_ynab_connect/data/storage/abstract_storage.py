@@ -1,7 +1,8 @@
 import json
 from abc import ABC, abstractmethod
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from datetime import datetime, timezone
+from hashlib import sha256
 from logging import LoggerAdapter
 from typing import Any, ClassVar
 
@@ -9,7 +10,8 @@ import pandas as pd
 from pydantic import BaseModel
 
 from bunq_ynab_connect.data.metadata import Metadata
-from bunq_ynab_connect.helpers.general import now
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
+from bunq_ynab_connect.helpers.general import chunk, now
 
 
 class AbstractStorage(ABC):
@@ -24,6 +26,9 @@ class AbstractStorage(ABC):
         RUNMOMENT_START: The default start date for the runmoments table.
         METADATA_COLUMNS: The columns that are created in this class,
             and should be excluded when converting a dict to a model.
+        IN_QUERY_CHUNK_SIZE: The maximum amount of values in a single 'in' query.
+        CONTENT_HASH_COLUMN: The column in which upsert stores the hash of the
+            content of a row, to skip writing rows that did not change.
 
     """
 
@@ -31,16 +36,28 @@ class AbstractStorage(ABC):
     logger: LoggerAdapter
     RUNMOMENT_START = datetime(2020, 1, 1, tzinfo=timezone.utc)
     METADATA_COLUMNS: ClassVar[list[str]] = ["_id", "updated_at"]
+    IN_QUERY_CHUNK_SIZE = 1000
+    CONTENT_HASH_COLUMN = "content_hash"
 
     def __init__(self, metadata: Metadata, logger: LoggerAdapter) -> None:
         self.metadata = metadata
         self.logger = logger
 
     @abstractmethod
-    def _upsert(self, table: str, data: list, key_col: str, timestamp_col: str) -> None:
+    def _upsert(
+        self,
+        table: str,
+        data: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,
+    ) -> UpsertResult:
         """Upsert a list of rows into a table.
 
         Use the key_col to identify the row and the timestamp_col to determine order.
+        Rows that are older than the stored row (based on timestamp_col) are skipped.
+        If given, stored holds the key_col and timestamp_col of the stored rows per
+        key, as read by upsert, such that implementations need not read them again.
         """
         raise NotImplementedError
 
@@ -58,13 +75,16 @@ class AbstractStorage(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def find(
+    def find(  # noqa: PLR0913
         self,
         table: str,
         query: list[tuple] | None = None,
         sort: list[str] | None = None,
         *,
         asc: bool = True,
+        projection: list[str] | None = None,
+        limit: int | None = None,
+        skip: int | None = None,
     ) -> list:
         """Find rows in a table that match the query.
 
@@ -77,6 +97,61 @@ class AbstractStorage(ABC):
                 appropriate query.
             sort: A list of columns to sort by.
             asc: Whether to sort ascending or descending.
+            projection: The columns to return. Defaults to all columns.
+            limit: The maximum amount of rows to return. Defaults to all rows.
+            skip: The amount of rows to skip, before returning rows.
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        projection: list[str] | None = None,
+        batch_size: int | None = None,
+        *,
+        asc: bool = True,
+    ) -> Iterator[dict]:
+        """Lazily iterate over the rows in a table that match the query.
+
+        Unlike find, the rows are not loaded into memory at once. Implementations
+        should fetch the rows in batches of batch_size while iterating.
+
+        Parameters
+        ----------
+            table: The name of the table to query.
+            query: A list of queries, see find.
+            sort: A list of columns to sort by.
+            projection: The columns to return. Defaults to all columns.
+            batch_size: The amount of rows to fetch per round-trip.
+            asc: Whether to sort ascending or descending.
+
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_one(
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+    ) -> dict | None:
+        """Find the first row in a table that matches the query.
+
+        Implementations should sort and limit server-side, such that only the
+        one row is transferred.
+
+        Parameters
+        ----------
+            table: The name of the table to query.
+            query: A list of queries, see find.
+            sort: A list of columns to sort by, to decide which row is first.
+            asc: Whether to sort ascending or descending.
 
         """
         raise NotImplementedError
@@ -122,26 +197,139 @@ class AbstractStorage(ABC):
             result = pd.DataFrame(result)
         return result
 
-    def overwrite(self, table: str, data: pd.DataFrame) -> None:
-        """Overwrite the full contents of a table with a dataframe."""
-        self._overwrite(table, data)
+    def overwrite(self, table: str, data: pd.DataFrame, *, diff: bool = False) -> None:
+        """Overwrite the full contents of a table with a dataframe.
 
-    def upsert(self, table_name: str, data: list) -> None:
-        """Add updated_at, and then call _upsert."""
-        updated_at = now().isoformat()
-        data = [{**x, "updated_at": updated_at} for x in data]
-        table = self.metadata.get_table(table_name)
-        self._upsert(table_name, data, table.key_col, table.timestamp_col)
+        Parameters
+        ----------
+            table: The name of the table to overwrite.
+            data: The new contents of the table.
+            diff: If True, only write the rows of which the content changed, and
+                delete the rows that are not in the data anymore. Otherwise, replace
+                all rows at once with _overwrite.
 
-    def insert_if_not_exists(self, table_name: str, data: list) -> None:
-        """Check if the data already exists in the table. If not, insert it."""
+        """
+        if diff:
+            self._overwrite_diff(table, data)
+        else:
+            self._overwrite(table, data)
+
+    def _overwrite_diff(self, table_name: str, data: pd.DataFrame) -> None:
+        """Overwrite a table by writing only the changes.
+
+        - Upsert the rows. This only writes the rows of which the content hash
+            differs from the stored one
+        - Delete the stored rows of which the key is not in the data
+        Missing values (NaN) of the dataframe are stored as null.
+        """
+        key_col = self.metadata.get_table(table_name).key_col
+        rows = data.astype(object).where(data.notna(), None).to_dict("records")
+        stored_keys = {
+            row[key_col] for row in self.iter_find(table_name, projection=[key_col])
+        }
+        removed = list(stored_keys - {row[key_col] for row in rows})
+        result = self.upsert(table_name, rows)
+        for keys in chunk(removed, self.IN_QUERY_CHUNK_SIZE):
+            self.delete(table_name, [(key_col, "in", keys)])
+        self.logger.info(
+            "Overwrote %s: %s changed, %s unchanged, %s removed",
+            table_name,
+            len(rows) - result.unchanged,
+            result.unchanged,
+            len(removed),
+        )
+
+    @classmethod
+    def content_hash(cls, row: dict) -> str:
+        """Hash the content of a row, excluding the columns added by the storage."""
+        excluded = [*cls.METADATA_COLUMNS, "inserted_at", cls.CONTENT_HASH_COLUMN]
+        content = {k: v for k, v in row.items() if k not in excluded}
+        serialized = json.dumps(content, sort_keys=True, default=str)
+        return sha256(serialized.encode()).hexdigest()
+
+    def upsert(self, table_name: str, data: list) -> UpsertResult:
+        """Add the content hash, skip the unchanged rows, and then call _upsert.
+
+        A row is unchanged if the stored row with the same key has the same content
+        hash. Unchanged rows are not written, such that their updated_at is kept and
+        readers of the changes since a runmoment do not see them again. The other
+        rows get a new updated_at.
+
+        Returns
+        -------
+            The matched, modified, upserted, skipped and unchanged counts.
+
+        """
+        if not data:
+            return UpsertResult()
         table = self.metadata.get_table(table_name)
-        data = [
-            d
-            for d in data
-            if not self.find_one(table_name, [(table.key_col, "eq", d[table.key_col])])
+        data = [{**x, self.CONTENT_HASH_COLUMN: self.content_hash(x)} for x in data]
+        stored = self._stored_rows(table_name, table.key_col, table.timestamp_col, data)
+        changed = [
+            row
+            for row in data
+            if stored.get(row.get(table.key_col), {}).get(self.CONTENT_HASH_COLUMN)
+            != row[self.CONTENT_HASH_COLUMN]
         ]
-        self.insert(table_name, data)
+        result = UpsertResult(unchanged=len(data) - len(changed))
+        if not changed:
+            return result
+        updated_at = now().isoformat()
+        changed = [{**x, "updated_at": updated_at} for x in changed]
+        return result + self._upsert(
+            table_name, changed, table.key_col, table.timestamp_col, stored
+        )
+
+    def _stored_rows(
+        self, table_name: str, key_col: str, timestamp_col: str, data: list
+    ) -> dict:
+        """Get the key, timestamp and content hash of the stored rows, per key.
+
+        One query per IN_QUERY_CHUNK_SIZE keys of the data.
+        """
+        keys = list({row[key_col] for row in data if row.get(key_col) is not None})
+        projection = [c for c in [key_col, timestamp_col] if c]
+        return {
+            row[key_col]: row
+            for keys_chunk in chunk(keys, self.IN_QUERY_CHUNK_SIZE)
+            for row in self.find(
+                table_name,
+                [(key_col, "in", keys_chunk)],
+                projection=[*projection, self.CONTENT_HASH_COLUMN],
+            )
+        }
+
+    @staticmethod
+    def is_outdated(timestamp: Any, stored_timestamp: Any) -> bool:
+        """Check if a timestamp is older than the timestamp of the stored row.
+
+        If the timestamps cannot be compared (eg missing or of different types), the
+        row is not considered outdated.
+        """
+        if timestamp is None or stored_timestamp is None:
+            return False
+        try:
+            return stored_timestamp > timestamp
+        except TypeError:
+            return False
+
+    def insert_if_not_exists(self, table_name: str, data: list) -> None:
+        """Check if the data already exists in the table. If not, insert it.
+
+        The existing keys are loaded with one 'in' query per IN_QUERY_CHUNK_SIZE rows.
+        Rows with a duplicate key within data are only inserted once.
+        """
+        key_col = self.metadata.get_table(table_name).key_col
+        new_rows = {}
+        for rows in chunk(data, self.IN_QUERY_CHUNK_SIZE):
+            keys = [row[key_col] for row in rows]
+            existing_keys = {
+                row[key_col] for row in self.find(table_name, [(key_col, "in", keys)])
+            }
+            for row in rows:
+                if row[key_col] not in existing_keys:
+                    new_rows.setdefault(row[key_col], row)
+        self.insert(table_name, list(new_rows.values()))
 
     def insert(self, table: str, data: list) -> None:
         """Add inserted_at, and then call _insert.
@@ -159,39 +347,66 @@ class AbstractStorage(ABC):
         data = [{**x, "inserted_at": inserted_at} for x in data]
         self._insert(table, data)
 
-    def find_one(
-        self,
-        table: str,
-        query: dict,
-        sort: list[str] | None = None,
-        *,
-        asc: bool = True,
-    ) -> dict | None:
-        """Find one row in a table that matches the query."""
-        sort = sort or []
-        result = self.find(table, query, sort, asc=asc)
-        return result[0] if result else None
-
-    def get_last_runmoment(self, source: str) -> datetime:
+    @staticmethod
+    def runmoment_source(source: str, account: int | str | None = None) -> str:
+        """Get the key in the runmoments table of a source, or of its account."""
+        return source if account is None else f"{source}/{account}"
+
+    def _runmoment_row(self, source: str, account: int | str | None) -> dict:
+        """Get the key of a runmoment row, with the account it belongs to if any."""
+        row = {"source": self.runmoment_source(source, account)}
+        if account is not None:
+            row.update(destination=source, account=str(account))
+        return row
+
+    def get_last_runmoment(
+        self, source: str, account: int | str | None = None
+    ) -> datetime:
         """Get the last timestamp from the runmoments table.
 
-        This is used to determine the window of data
-        to load. Return 2020-01-01 if there is no timestamp in the runmoments table.
+        This is used to determine the window of data to load. If an account is given,
+        the watermark of that account of the source is returned. Return 2020-01-01 if
+        there is no timestamp in the runmoments table.
         """
-        last_runmoment = self.find_one("runmoments", [("source", "eq", source)])
+        key = self.runmoment_source(source, account)
+        last_runmoment = self.find_one("runmoments", [("source", "eq", key)])
+        timestamp = last_runmoment.get("timestamp") if last_runmoment else None
         result = (
-            datetime.fromisoformat(last_runmoment["timestamp"])
-            if last_runmoment
-            else self.RUNMOMENT_START
+            datetime.fromisoformat(timestamp) if timestamp else self.RUNMOMENT_START
         )
-        self.logger.info("Retrieved last runmoment of %s as %s", source, result)
+        self.logger.info("Retrieved last runmoment of %s as %s", key, result)
         return result
 
-    def set_last_runmoment(self, source: str, timestamp: datetime) -> None:
-        """Set the last timestamp in the runmoments table. Use the upsert method."""
-        data = [{"source": source, "timestamp": timestamp.isoformat()}]
-        self.upsert("runmoments", data)
-        self.logger.info("Updated runmoment of %s to %s", source, timestamp)
+    def set_last_runmoment(
+        self, source: str, timestamp: datetime, account: int | str | None = None
+    ) -> None:
+        """Set the last timestamp in the runmoments table. Use the upsert method.
+
+        If an account is given, only the watermark of that account is set.
+        """
+        row = self._runmoment_row(source, account)
+        self.upsert("runmoments", [{**row, "timestamp": timestamp.isoformat()}])
+        self.logger.info("Updated runmoment of %s to %s", row["source"], timestamp)
+
+    def get_cursor(self, source: str, account: int | str | None = None) -> int | None:
+        """Get the cursor of a source, or of one of its accounts.
+
+        A cursor marks up to where a source was loaded, eg the server knowledge of a
+        YNAB budget, or the id of the newest payment of a bunq account. It is stored
+        in the runmoments table, next to the timestamp. Return None if there is none,
+        ie if the source was never loaded from a cursor.
+        """
+        key = self.runmoment_source(source, account)
+        runmoment = self.find_one("runmoments", [("source", "eq", key)])
+        return runmoment.get("cursor") if runmoment else None
+
+    def set_cursor(
+        self, source: str, cursor: int, account: int | str | None = None
+    ) -> None:
+        """Set the cursor of a source in the runmoments table. Keep its timestamp."""
+        row = self._runmoment_row(source, account)
+        self.upsert("runmoments", [{**row, "cursor": cursor}])
+        self.logger.info("Updated cursor of %s to %s", row["source"], cursor)
 
     def get_window(self, source: str) -> tuple[datetime, datetime]:
         """Get the window of data to load.
@@ -205,7 +420,7 @@ class AbstractStorage(ABC):
 
     def rows_to_entities(
         self,
-        rows: list[dict],
+        rows: Iterable[dict],
         fn: Callable,
         *,
         provide_kwargs_as_json: bool = False,
@@ -242,7 +457,7 @@ class AbstractStorage(ABC):
                 Else the dict is provided as kwargs.
 
         """
-        rows = self.get(table)
+        rows = self.iter_find(table)
         return self.rows_to_entities(
             rows, fn, provide_kwargs_as_json=provide_kwargs_as_json
         )
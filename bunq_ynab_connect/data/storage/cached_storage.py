@@ -0,0 +1,250 @@
+from collections import Counter
+from collections.abc import Callable, Iterator
+from copy import deepcopy
+from datetime import datetime
+from logging import LoggerAdapter
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+import pandas as pd
+from kink import inject
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
+
+
+class CachedStorage(AbstractStorage):
+    """Read-through cache around another storage, for dimension tables.
+
+    Dimension tables (flagged with 'dimension' in the metadata) are small and change
+    rarely, but are read many times per run. Reads of these tables are served from
+    memory. Every write to a dimension table invalidates its cached reads. All other
+    tables, such as runmoments and payment_queue, are passed through to the wrapped
+    storage directly. Methods that read and write in one go, such as upsert and the
+    runmoments and cursors, are delegated as a whole, such that the wrapped storage
+    reads uncached rows and its own implementations are used.
+
+    Attributes
+    ----------
+        storage: The wrapped storage, that actually stores the data.
+        ttl_seconds: If set, cached reads expire after this many seconds.
+        hits: The amount of reads served from memory, per table.
+        misses: The amount of reads passed to the wrapped storage, per table.
+
+    """
+
+    storage: AbstractStorage
+    ttl_seconds: int | None
+    hits: Counter
+    misses: Counter
+
+    @inject
+    def __init__(
+        self,
+        storage: AbstractStorage,
+        metadata: Metadata,
+        logger: LoggerAdapter,
+        ttl_seconds: int | None = None,
+    ) -> None:
+        super().__init__(metadata, logger)
+        self.storage = storage
+        self.ttl_seconds = ttl_seconds
+        self.hits = Counter()
+        self.misses = Counter()
+        self._dimensions = {t.name for t in metadata.tables if t.dimension}
+        self._cache: dict[str, dict[str, tuple[float | None, Any]]] = {}
+        self._generations = Counter()
+        self._lock = Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        """Expose storage-specific attributes of the wrapped storage."""
+        if name == "storage":
+            raise AttributeError(name)
+        return getattr(self.storage, name)
+
+    def _read(self, table: str, key: tuple, read: Callable[[], Any]) -> Any:
+        """Serve a read of a dimension table from memory, or read and cache it.
+
+        A copy is returned, such that callers cannot modify the cached rows. If the
+        table is written while reading, the result is not cached.
+        """
+        if table not in self._dimensions:
+            return read()
+        cache_key = repr(key)
+        with self._lock:
+            expires_at, value = self._cache.get(table, {}).get(cache_key, (0, None))
+            if expires_at is None or expires_at > monotonic():
+                self.hits[table] += 1
+                return deepcopy(value)
+            self.misses[table] += 1
+            generation = self._generations[table]
+        value = read()
+        expires_at = (
+            None if self.ttl_seconds is None else self.ttl_seconds + monotonic()
+        )
+        with self._lock:
+            if self._generations[table] == generation:
+                self._cache.setdefault(table, {})[cache_key] = (expires_at, value)
+        return deepcopy(value)
+
+    def invalidate(self, table: str | None = None) -> None:
+        """Drop the cached reads of a table, or of all tables if no table is given."""
+        with self._lock:
+            for t in self._dimensions if table is None else [table]:
+                self._cache.pop(t, None)
+                self._generations[t] += 1
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        """Get the hits and misses per dimension table."""
+        return {
+            table: {"hits": self.hits[table], "misses": self.misses[table]}
+            for table in sorted(self._dimensions)
+        }
+
+    def convert_query(self, query: list[tuple] | None = None) -> Any:
+        return self.storage.convert_query(query)
+
+    def find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+        projection: list[str] | None = None,
+        limit: int | None = None,
+        skip: int | None = None,
+    ) -> list:
+        return self._read(
+            table,
+            ("find", query, sort, asc, projection, limit, skip),
+            lambda: self.storage.find(
+                table,
+                query,
+                sort,
+                asc=asc,
+                projection=projection,
+                limit=limit,
+                skip=skip,
+            ),
+        )
+
+    def iter_find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        projection: list[str] | None = None,
+        batch_size: int | None = None,
+        *,
+        asc: bool = True,
+    ) -> Iterator[dict]:
+        """Iterate over the rows. Dimension tables are small, hence cached as list."""
+        if table not in self._dimensions:
+            yield from self.storage.iter_find(
+                table, query, sort, projection, batch_size, asc=asc
+            )
+            return
+        yield from self._read(
+            table,
+            ("find", query, sort, asc, projection, None, None),
+            lambda: self.storage.find(
+                table, query, sort, asc=asc, projection=projection
+            ),
+        )
+
+    def find_one(
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+    ) -> dict | None:
+        return self._read(
+            table,
+            ("find_one", query, sort, asc),
+            lambda: self.storage.find_one(table, query, sort, asc=asc),
+        )
+
+    def count(self, table: str, query: list[tuple] | None = None) -> int:
+        return self._read(
+            table, ("count", query), lambda: self.storage.count(table, query)
+        )
+
+    def upsert(self, table_name: str, data: list) -> UpsertResult:
+        """Let the wrapped storage upsert, such that stored hashes are read uncached."""
+        try:
+            return self.storage.upsert(table_name, data)
+        finally:
+            self.invalidate(table_name)
+
+    def _upsert(
+        self,
+        table: str,
+        data: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,
+    ) -> UpsertResult:
+        try:
+            return self.storage._upsert(table, data, key_col, timestamp_col, stored)  # noqa: SLF001
+        finally:
+            self.invalidate(table)
+
+    def _insert(self, table: str, data: list) -> None:
+        try:
+            self.storage._insert(table, data)  # noqa: SLF001
+        finally:
+            self.invalidate(table)
+
+    def insert_if_not_exists(self, table_name: str, data: list) -> None:
+        try:
+            self.storage.insert_if_not_exists(table_name, data)
+        finally:
+            self.invalidate(table_name)
+
+    def insert(self, table: str, data: list) -> None:
+        try:
+            self.storage.insert(table, data)
+        finally:
+            self.invalidate(table)
+
+    def get_last_runmoment(
+        self, source: str, account: int | str | None = None
+    ) -> datetime:
+        return self.storage.get_last_runmoment(source, account)
+
+    def set_last_runmoment(
+        self, source: str, timestamp: datetime, account: int | str | None = None
+    ) -> None:
+        self.storage.set_last_runmoment(source, timestamp, account)
+
+    def get_cursor(self, source: str, account: int | str | None = None) -> int | None:
+        return self.storage.get_cursor(source, account)
+
+    def set_cursor(
+        self, source: str, cursor: int, account: int | str | None = None
+    ) -> None:
+        self.storage.set_cursor(source, cursor, account)
+
+    def overwrite(self, table: str, data: pd.DataFrame, *, diff: bool = False) -> None:
+        """Let the wrapped storage overwrite, such that a diff reads uncached rows."""
+        try:
+            self.storage.overwrite(table, data, diff=diff)
+        finally:
+            self.invalidate(table)
+
+    def _overwrite(self, table: str, data: pd.DataFrame) -> None:
+        try:
+            self.storage._overwrite(table, data)  # noqa: SLF001
+        finally:
+            self.invalidate(table)
+
+    def delete(self, table: str, query: list[tuple] | None = None) -> None:
+        try:
+            self.storage.delete(table, query)
+        finally:
+            self.invalidate(table)
@@ -0,0 +1,387 @@
+import json
+from bisect import bisect_left, insort
+from collections.abc import Hashable, Iterable, Iterator
+from datetime import datetime, timezone
+from itertools import count, islice
+from logging import LoggerAdapter
+from threading import RLock
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from kink import inject
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
+
+
+class MemoryStorage(AbstractStorage):
+    """The MemoryStorage class keeps all data in dictionaries, in memory.
+
+    Used to run the pipeline in-process, eg in tests and benchmarks, without the
+    I/O of a database. Queries follow MongoDB semantics: missing values equal null,
+    and values of different types never match a comparison.
+
+    Per table, rows are found by key_col with a hash index. Each index in the
+    metadata is kept as a sorted list, which serves queries that filter on a prefix
+    of its columns with 'eq', and sorts on the columns that follow. All other
+    queries scan the table.
+
+    Attributes
+    ----------
+        tables: The rows per table, by row id.
+
+    """
+
+    tables: dict[str, dict[int, dict]]
+
+    @inject
+    def __init__(self, metadata: Metadata, logger: LoggerAdapter) -> None:
+        super().__init__(metadata, logger)
+        self.tables = {}
+        self._key_cols: dict[str, str] = {}
+        self._key_indexes: dict[str, dict[Hashable, set[int]]] = {}
+        self._sorted_indexes: dict[str, dict[tuple[str, ...], list[tuple]]] = {}
+        self._ids = count()
+        self._lock = RLock()
+
+    def convert_query(self, query: list[tuple] | None = None) -> Any:
+        """Return the query as is. It is evaluated on the rows directly."""
+        return query or []
+
+    def find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+        projection: list[str] | None = None,
+        limit: int | None = None,
+        skip: int | None = None,
+    ) -> list:
+        start = skip or 0
+        with self._lock:
+            rows = islice(
+                self._select(table, query, sort, asc=asc),
+                start,
+                start + limit if limit else None,
+            )
+            return [_project(row, projection) for row in rows]
+
+    def iter_find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        projection: list[str] | None = None,
+        batch_size: int | None = None,  # noqa: ARG002
+        *,
+        asc: bool = True,
+    ) -> Iterator[dict]:
+        """Iterate over the matching rows. There are no round-trips to batch."""
+        yield from self.find(table, query, sort, asc=asc, projection=projection)
+
+    def find_one(
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+    ) -> dict | None:
+        with self._lock:
+            row = next(iter(self._select(table, query, sort, asc=asc)), None)
+        return None if row is None else _project(row)
+
+    def delete(self, table: str, query: list[tuple] | None = None) -> None:
+        with self._lock:
+            for row_id in list(self._matching_ids(table, query)):
+                self._remove(table, row_id)
+
+    def count(self, table: str, query: list[tuple] | None = None) -> int:
+        with self._lock:
+            if not query:
+                return len(self._table(table))
+            return sum(1 for _ in self._matching_ids(table, query))
+
+    def _upsert(
+        self,
+        table: str,
+        data: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,  # noqa: ARG002
+    ) -> UpsertResult:
+        """Merge each row into the stored row with the same key (like a $set).
+
+        Rows older than the stored row are skipped. Rows without a stored row are
+        inserted. The stored rows are looked up in memory, under the lock.
+        """
+        result = UpsertResult()
+        with self._lock:
+            rows = self._table(table)
+            key_index = self._key_indexes[table]
+            for row in data:
+                row_ids = key_index.get(_sort_key(row.get(key_col)))
+                if not row_ids:
+                    self._add(table, row)
+                    result.upserted += 1
+                    continue
+                row_id = min(row_ids)
+                stored_row = rows[row_id]
+                if timestamp_col and self.is_outdated(
+                    _normalize(row.get(timestamp_col)), stored_row.get(timestamp_col)
+                ):
+                    result.skipped += 1
+                    continue
+                merged = {**stored_row, **_normalize(row)}
+                result.matched += 1
+                if merged != stored_row:
+                    result.modified += 1
+                    self._unindex(table, row_id, stored_row)
+                    rows[row_id] = merged
+                    self._index(table, row_id, merged)
+        return result
+
+    def _insert(self, table: str, data: list) -> None:
+        with self._lock:
+            self._table(table)
+            for row in data:
+                self._add(table, row)
+
+    def _overwrite(self, table: str, data: pd.DataFrame) -> None:
+        """Replace the rows of the table. Missing values (NaN) are stored as null."""
+        data = data.astype(object).where(data.notna(), None)
+        with self._lock:
+            self.tables.pop(table, None)
+            self._table(table)
+            for row in data.to_dict("records"):
+                self._add(table, row)
+
+    def _table(self, table: str) -> dict[int, dict]:
+        """Get the rows of a table. Create the table and its indexes upon first use."""
+        if table not in self.tables:
+            metadata = self.metadata.get_table(table)
+            self.tables[table] = {}
+            self._key_cols[table] = metadata.key_col
+            self._key_indexes[table] = {}
+            self._sorted_indexes[table] = {
+                tuple(column for column, _ in index.keys): []
+                for index in metadata.indexes
+            }
+        return self.tables[table]
+
+    def _add(self, table: str, row: dict) -> None:
+        """Store a copy of the row, and add it to the indexes of the table."""
+        row_id = next(self._ids)
+        row = _normalize(row)
+        self.tables[table][row_id] = row
+        self._index(table, row_id, row)
+
+    def _remove(self, table: str, row_id: int) -> None:
+        """Remove a row from the table and its indexes."""
+        self._unindex(table, row_id, self.tables[table].pop(row_id))
+
+    def _index(self, table: str, row_id: int, row: dict) -> None:
+        key = _sort_key(row.get(self._key_cols[table]))
+        self._key_indexes[table].setdefault(key, set()).add(row_id)
+        for columns, entries in self._sorted_indexes[table].items():
+            insort(entries, (_index_key(row, columns), row_id))
+
+    def _unindex(self, table: str, row_id: int, row: dict) -> None:
+        key = _sort_key(row.get(self._key_cols[table]))
+        self._key_indexes[table][key].discard(row_id)
+        if not self._key_indexes[table][key]:
+            del self._key_indexes[table][key]
+        for columns, entries in self._sorted_indexes[table].items():
+            del entries[bisect_left(entries, (_index_key(row, columns), row_id))]
+
+    def _select(
+        self,
+        table: str,
+        query: list[tuple] | None,
+        sort: list[str] | None,
+        *,
+        asc: bool,
+    ) -> Iterator[dict]:
+        """Lazily yield the matching rows in order. Use an index if one applies."""
+        rows = self._table(table)
+        query = query or []
+        sort = sort or []
+        row_ids, is_sorted = self._plan(table, query, sort, asc=asc)
+        matches = (rows[i] for i in row_ids if _matches(rows[i], query))
+        if is_sorted:
+            return matches
+        return iter(
+            sorted(
+                matches,
+                key=lambda row: tuple(_sort_key(_get(row, c)) for c in sort),
+                reverse=not asc,
+            )
+        )
+
+    def _matching_ids(self, table: str, query: list[tuple] | None) -> Iterator[int]:
+        rows = self._table(table)
+        row_ids, _ = self._plan(table, query or [], [], asc=True)
+        return (i for i in row_ids if _matches(rows[i], query or []))
+
+    def _plan(
+        self, table: str, query: list[tuple], sort: list[str], *, asc: bool
+    ) -> tuple[Iterable[int], bool]:
+        """Get the candidate row ids, and whether they are in the order of sort.
+
+        - An 'eq' or 'in' on key_col looks up the rows in the hash index
+        - A sorted index is used if 'eq' filters a prefix of its columns, or if
+            the columns after that prefix start with the sort columns. The index
+            is walked lazily, such that eg find_one stops at the first match.
+        - Otherwise, all rows are candidates
+        """
+        equals = {c: v for c, operator, v in query if operator == "eq"}
+        key_col = self._key_cols[table]
+        key_index = self._key_indexes[table]
+        if key_col in equals:
+            return sorted(key_index.get(_sort_key(equals[key_col]), [])), not sort
+        for column, operator, values in query:
+            if column == key_col and operator == "in":
+                keys = {_sort_key(v) for v in values}
+                return sorted(i for k in keys for i in key_index.get(k, [])), not sort
+        best = None
+        for columns, entries in self._sorted_indexes[table].items():
+            prefix = 0
+            while prefix < len(columns) and columns[prefix] in equals:
+                prefix += 1
+            serves_sort = list(columns[prefix : prefix + len(sort)]) == sort
+            if (prefix or (sort and serves_sort)) and (
+                best is None or (serves_sort, prefix) > best[:2]
+            ):
+                best = (serves_sort, prefix, columns, entries)
+        if best is None:
+            return iter(self.tables[table]), not sort
+        serves_sort, prefix, columns, entries = best
+        key = tuple(_sort_key(equals[c]) for c in columns[:prefix])
+        positions = range(
+            bisect_left(entries, (key,)), bisect_left(entries, ((*key, _MAX_KEY),))
+        )
+        if sort and serves_sort and not asc:
+            positions = reversed(positions)
+        return (entries[i][1] for i in positions), serves_sort or not sort
+
+
+# The rank of each type in the sort order of MongoDB
+_NULL, _NUMBER, _STRING, _OBJECT, _ARRAY, _BOOL, _DATE = range(7)
+_MAX_KEY = (_DATE + 1,)
+
+
+def _sort_key(value: Any) -> tuple:  # noqa: PLR0911
+    """Get a hashable key that orders values of mixed types like MongoDB does."""
+    if value is None:
+        return (_NULL,)
+    if isinstance(value, bool):
+        return (_BOOL, value)
+    if isinstance(value, int | float):
+        return (_NUMBER, value)
+    if isinstance(value, str):
+        return (_STRING, value)
+    if isinstance(value, datetime):
+        return (_DATE, _normalize(value))
+    if isinstance(value, dict):
+        return (_OBJECT, json.dumps(value, sort_keys=True, default=str))
+    return (_ARRAY, json.dumps(value, default=str))
+
+
+def _index_key(row: dict, columns: tuple[str, ...]) -> tuple:
+    return tuple(_sort_key(_get(row, column)) for column in columns)
+
+
+def _get(row: dict, column: str) -> Any:
+    """Get the value of a (dotted) column. Missing values are None."""
+    if "." not in column:
+        return row.get(column)
+    value = row
+    for part in column.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _matches(row: dict, query: list[tuple]) -> bool:
+    """Check if a row matches all queries."""
+    for column, operator, value in query:
+        key = _sort_key(_get(row, column))
+        if operator in ["in", "nin"]:
+            matched = key in {_sort_key(v) for v in value}
+            if matched != (operator == "in"):
+                return False
+            continue
+        other = _sort_key(value)
+        if operator == "eq":
+            matched = key == other
+        elif operator == "ne":
+            matched = key != other
+        elif operator not in _COMPARISONS:
+            msg = f"Unsupported operator {operator}"
+            raise ValueError(msg)
+        else:
+            # Like MongoDB, only values of the same type are compared
+            matched = key[0] == other[0] and _COMPARISONS[operator](key, other)
+        if not matched:
+            return False
+    return True
+
+
+_COMPARISONS = {
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+_SCALARS = {str, int, float, bool}
+
+
+def _normalize(value: Any) -> Any:
+    """Copy a value, like it would be stored and loaded by pymongo.
+
+    Datetimes become naive in UTC, and numpy scalars become python scalars.
+    """
+    if value is None or type(value) in _SCALARS:
+        return value
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [_normalize(v) for v in value]
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _project(row: dict, projection: list[str] | None = None) -> dict:
+    """Copy a row. If a projection is given, only keep those (dotted) columns."""
+    if not projection:
+        return _normalize(row)
+    result = {}
+    for column in projection:
+        if not _has(row, column):
+            continue
+        *parents, leaf = column.split(".")
+        target = result
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = _normalize(_get(row, column))
+    return result
+
+
+def _has(row: dict, column: str) -> bool:
+    """Check if a (dotted) column is present in the row."""
+    value = row
+    for part in column.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
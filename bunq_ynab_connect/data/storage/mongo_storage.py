@@ -1,13 +1,18 @@
+from collections.abc import Iterator
 from logging import LoggerAdapter
 from typing import Any
 
 import pandas as pd
 from kink import inject
-from pymongo import MongoClient
+from pymongo import IndexModel, MongoClient, UpdateOne
+from pymongo.cursor import Cursor
 from pymongo.database import Database
 
 from bunq_ynab_connect.data.metadata import Metadata
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
+from bunq_ynab_connect.data.table_metadata import IndexMetadata
+from bunq_ynab_connect.helpers.general import chunk
 
 
 class MongoStorage(AbstractStorage):
@@ -17,11 +22,15 @@ class MongoStorage(AbstractStorage):
     ----------
         client: The MongoDB client.
         database: The MongoDB database.
+        UPSERT_CHUNK_SIZE: The amount of rows to send to MongoDB in one bulk write.
+        STAGING_SUFFIX: The suffix of the collection in which an overwrite is built.
 
     """
 
     client: MongoClient
     database: Database
+    UPSERT_CHUNK_SIZE: int = 1000
+    STAGING_SUFFIX = "__staging"
 
     @inject
     def __init__(
@@ -43,37 +52,175 @@ class MongoStorage(AbstractStorage):
         query = query or []
         return {q[0]: {f"${q[1]}": q[2]} for q in query}
 
-    def find(
+    def find(  # noqa: PLR0913
         self,
         table: str,
         query: list[tuple] | None = None,
         sort: list[str] | None = None,
         *,
         asc: bool = True,
+        projection: list[str] | None = None,
+        limit: int | None = None,
+        skip: int | None = None,
     ) -> list:
         """Find rows in a table that match the query.
 
         A query is a dictionary of key-equals-value pairs.
         """
-        sort = sort or []
-        query = self.convert_query(query)
-        sort = [(key, 1 if asc else -1) for key in sort]
-        result = self.database[table].find(query)
+        result = self._cursor(table, query, sort, projection, asc=asc)
+        if skip:
+            result = result.skip(skip)
+        if limit:
+            result = result.limit(limit)
+        return list(result)
+
+    def find_one(
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+    ) -> dict | None:
+        """Use the native find_one, which sorts server-side and limits to one row."""
+        sort = [(key, 1 if asc else -1) for key in sort or []]
+        return self.database[table].find_one(
+            self.convert_query(query), sort=sort or None
+        )
+
+    def iter_find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        projection: list[str] | None = None,
+        batch_size: int | None = None,
+        *,
+        asc: bool = True,
+    ) -> Iterator[dict]:
+        """Iterate over the cursor, which fetches batch_size documents per getMore."""
+        result = self._cursor(table, query, sort, projection, asc=asc)
+        if batch_size:
+            result = result.batch_size(batch_size)
+        yield from result
+
+    def _cursor(
+        self,
+        table: str,
+        query: list[tuple] | None,
+        sort: list[str] | None,
+        projection: list[str] | None,
+        *,
+        asc: bool,
+    ) -> Cursor:
+        """Create a (lazy) cursor for the query, sort and projection."""
+        sort = [(key, 1 if asc else -1) for key in sort or []]
+        projection = dict.fromkeys(projection, 1) if projection else None
+        result = self.database[table].find(self.convert_query(query), projection)
         if sort:
             result = result.sort(sort)
-        return list(result)
+        return result
 
-    def _upsert(self, table: str, data: list, key_col: str, _: str) -> None:
-        """Upsert each item.
+    def _upsert(
+        self,
+        table: str,
+        data: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,
+    ) -> UpsertResult:
+        """Upsert all rows, in chunks of UPSERT_CHUNK_SIZE.
 
-        For now, simply loop over them and insert each one separately.
-        Also add an updated_at column.
+        Each chunk is written with a single unordered bulk_write. If the table has a
+        timestamp_col, rows that are older than the stored row are skipped. Since an
+        unordered write applies the rows of a key in any order, only one row per key
+        is written; the others are skipped.
+        """
+        rows = self._drop_duplicate_keys(data, key_col, timestamp_col)
+        result = UpsertResult(skipped=len(data) - len(rows))
+        for rows_chunk in chunk(rows, self.UPSERT_CHUNK_SIZE):
+            result += self._upsert_chunk(
+                table, rows_chunk, key_col, timestamp_col, stored
+            )
+        return result
 
-        Todo: Speed up
+    def _drop_duplicate_keys(
+        self, rows: list, key_col: str, timestamp_col: str
+    ) -> list:
+        """Keep one row per key: the newest by timestamp_col, else the last one."""
+        newest = {}
+        for row in rows:
+            kept = newest.get(row[key_col])
+            if kept is None or not (
+                timestamp_col
+                and self.is_outdated(row.get(timestamp_col), kept.get(timestamp_col))
+            ):
+                newest[row[key_col]] = row
+        return list(newest.values())
+
+    def _upsert_chunk(
+        self,
+        table: str,
+        rows: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,
+    ) -> UpsertResult:
+        """Upsert one chunk of rows with a single bulk_write.
+
+        - Drop rows that are older than the stored row
+        - Write the remaining rows unordered, so one round-trip covers the chunk
+        """
+        fresh_rows = self._drop_outdated_rows(
+            table, rows, key_col, timestamp_col, stored
+        )
+        skipped = len(rows) - len(fresh_rows)
+        if not fresh_rows:
+            return UpsertResult(skipped=skipped)
+        operations = [
+            UpdateOne({key_col: row[key_col]}, {"$set": row}, upsert=True)
+            for row in fresh_rows
+        ]
+        response = self.database[table].bulk_write(operations, ordered=False)
+        return UpsertResult(
+            matched=response.matched_count,
+            modified=response.modified_count,
+            upserted=response.upserted_count,
+            skipped=skipped,
+        )
+
+    def _drop_outdated_rows(
+        self,
+        table: str,
+        rows: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,
+    ) -> list:
+        """Remove the rows of which the stored row has a newer timestamp.
+
+        Uses the stored rows read by upsert if given, else loads the stored
+        timestamps of the chunk with a single $in query. If the timestamps cannot be
+        compared (eg missing or of different types), the row is kept.
         """
-        table = self.database[table]
-        for row in data:
-            table.update_one({key_col: row[key_col]}, {"$set": row}, upsert=True)
+        if not timestamp_col:
+            return rows
+        if stored is None:
+            stored = {
+                row[key_col]: row
+                for row in self.database[table].find(
+                    {key_col: {"$in": [row[key_col] for row in rows]}},
+                    {key_col: 1, timestamp_col: 1},
+                )
+            }
+        return [
+            row
+            for row in rows
+            if not self.is_outdated(
+                row.get(timestamp_col),
+                stored.get(row[key_col], {}).get(timestamp_col),
+            )
+        ]
 
     def _insert(self, table: str, data: list) -> None:
         """Insert all items in the data list. Also add an inserted_at column."""
@@ -82,10 +229,22 @@ class MongoStorage(AbstractStorage):
             table.insert_many(data)
 
     def _overwrite(self, table: str, data: pd.DataFrame) -> None:
-        """Overwrite the full contents of a table with the data."""
-        with self.client.start_session() as session, session.start_transaction():
-            self.database[table].drop()
-            self._insert(table, data.to_dict("records"))
+        """Overwrite the full contents of a table by swapping in a staging collection.
+
+        - Write the data into an empty staging collection
+        - Create the indexes of the table on the staging collection
+        - Rename the staging collection over the table, which drops the old rows
+        The rename is atomic, such that readers never see an empty or unindexed
+        table. Unlike a transaction, this does not require a replica set.
+        """
+        staging = self.database[f"{table}{self.STAGING_SUFFIX}"]
+        staging.drop()
+        self.database.create_collection(staging.name)
+        self._insert(staging.name, data.to_dict("records"))
+        indexes = self.metadata.get_table(table).indexes
+        if indexes:
+            staging.create_indexes(list(map(self._to_index_model, indexes)))
+        staging.rename(table, dropTarget=True)
 
     def delete(self, table: str, query: list[tuple] | None = None) -> None:
         """Delete rows in a table that match the query.
@@ -125,16 +284,78 @@ class MongoStorage(AbstractStorage):
             raise RuntimeError(msg) from e
 
     def set_indexes(self) -> None:
-        """Set indexes on the tables."""
-        unique_indices = {
-            "bunq_accounts": ["id"],
-            "bunq_payments": ["id"],
-            "payment_queue": ["payment_id"],
-            "ynab_accounts": ["id"],
-            "ynab_budgets": ["id"],
-            "ynab_transactions": ["id"],
-            "matched_transactions": ["match_id"],
-        }
-
-        for table, columns in unique_indices.items():
-            self.database[table].create_index(columns, unique=True)
+        """Reconcile the indexes of each table with the indexes in its metadata.
+
+        - Drop indexes that are not declared, or of which the definition changed
+        - Create declared indexes that do not exist yet
+        Is idempotent: if the indexes are up to date, nothing is changed.
+        """
+        for table in self.metadata.tables:
+            collection = self.database[table.name]
+            declared = {
+                index.document["name"]: index
+                for index in map(self._to_index_model, table.indexes)
+            }
+            existing = collection.index_information()
+            for name, info in existing.items():
+                if name == "_id_":
+                    continue
+                if name not in declared or not _is_same_index(
+                    info, declared[name].document
+                ):
+                    self.logger.info("Dropping index %s on %s", name, table.name)
+                    collection.drop_index(name)
+                    existing[name] = None
+            missing = [
+                index for name, index in declared.items() if not existing.get(name)
+            ]
+            if missing:
+                self.logger.info("Creating %s indexes on %s", len(missing), table.name)
+                collection.create_indexes(missing)
+
+    def _to_index_model(self, index: IndexMetadata) -> IndexModel:
+        """Convert the metadata of an index to a pymongo IndexModel."""
+        options = {"unique": index.unique}
+        if index.partial_filter:
+            options["partialFilterExpression"] = self.convert_query(
+                index.partial_filter
+            )
+        if index.ttl_seconds is not None:
+            options["expireAfterSeconds"] = index.ttl_seconds
+        keys = [(column, 1 if asc else -1) for column, asc in index.keys]
+        return IndexModel(keys, **options)
+
+    def index_usage(self) -> list[dict]:
+        """Get the usage statistics of all indexes of the tables in the metadata.
+
+        Returns
+        -------
+            A row per index, with the table, index name, the amount of times the
+            index was used, and since when the usage was counted.
+
+        """
+        return [
+            {
+                "table": table.name,
+                "index": stats["name"],
+                "accesses": stats["accesses"]["ops"],
+                "since": stats["accesses"]["since"],
+            }
+            for table in self.metadata.tables
+            for stats in self.database[table.name].aggregate([{"$indexStats": {}}])
+        ]
+
+    def collection_scans(self) -> int:
+        """Get the amount of collection scans the server performed since startup."""
+        status = self.database.command("serverStatus")
+        return status["metrics"]["queryExecutor"]["collectionScans"]["total"]
+
+
+def _is_same_index(info: dict, document: dict) -> bool:
+    """Check if an existing index (from index_information) matches a declaration."""
+    options = ["unique", "partialFilterExpression", "expireAfterSeconds"]
+    return [tuple(k) for k in info["key"]] == list(document["key"].items()) and all(
+        info.get(option) == document.get(option)
+        for option in options
+        if info.get(option) or document.get(option)
+    )
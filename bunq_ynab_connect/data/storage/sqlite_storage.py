@@ -0,0 +1,479 @@
+import json
+import sqlite3
+from collections.abc import Iterator
+from datetime import date, datetime, timezone
+from hashlib import sha1
+from logging import LoggerAdapter
+from pathlib import Path
+from threading import Lock, local
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from kink import inject
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.upsert_result import UpsertResult
+from bunq_ynab_connect.data.table_metadata import IndexMetadata, TableMetadata
+from bunq_ynab_connect.helpers.general import chunk
+
+
+class SqliteStorage(AbstractStorage):
+    """The SqliteStorage class stores data in an embedded SQLite database.
+
+    Each table stores its rows as JSON documents, in a 'doc' column. Datetimes are
+    stored as {"$date": <iso in UTC>}, such that they are loaded as datetimes again.
+    Dates are stored as iso strings.
+    The key_col, timestamp_col and all indexed columns of a table are exposed as
+    generated columns, on which the indexes of the metadata are created.
+
+    Each thread uses its own connection. The database runs in WAL mode, such that
+    readers do not block the writer.
+
+    Attributes
+    ----------
+        path: The path of the SQLite database file.
+        UPSERT_CHUNK_SIZE: The amount of rows to write in one executemany.
+        FETCH_SIZE: The default amount of rows to fetch per batch in iter_find.
+
+    """
+
+    path: Path
+    UPSERT_CHUNK_SIZE: int = 1000
+    FETCH_SIZE: int = 1000
+
+    @inject
+    def __init__(
+        self, metadata: Metadata, logger: LoggerAdapter, sqlite_path: Path
+    ) -> None:
+        """Open the database, and create the tables in the metadata."""
+        super().__init__(metadata, logger)
+        self.path = sqlite_path
+        self._local = local()
+        self._table_lock = Lock()
+        self._generated_columns: dict[str, dict[str, str]] = {}
+        self.set_indexes()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """The connection of the current thread. Created upon first use."""
+        if not hasattr(self._local, "connection"):
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return self._local.connection
+
+    def convert_query(self, query: list[tuple] | None = None) -> Any:
+        """Convert the query to a WHERE clause and its parameters."""
+        return self._where(None, query)
+
+    def find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+        projection: list[str] | None = None,
+        limit: int | None = None,
+        skip: int | None = None,
+    ) -> list:
+        sql, params = self._select(table, query, sort, asc=asc)
+        if limit or skip:
+            sql += " LIMIT ? OFFSET ?"
+            params = [*params, limit or -1, skip or 0]
+        rows = self._connection.execute(sql, params).fetchall()
+        return [self._decode(doc, projection) for (doc,) in rows]
+
+    def iter_find(  # noqa: PLR0913
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        projection: list[str] | None = None,
+        batch_size: int | None = None,
+        *,
+        asc: bool = True,
+    ) -> Iterator[dict]:
+        """Fetch batch_size rows at a time from the cursor."""
+        sql, params = self._select(table, query, sort, asc=asc)
+        cursor = self._connection.execute(sql, params)
+        while rows := cursor.fetchmany(batch_size or self.FETCH_SIZE):
+            for (doc,) in rows:
+                yield self._decode(doc, projection)
+
+    def find_one(
+        self,
+        table: str,
+        query: list[tuple] | None = None,
+        sort: list[str] | None = None,
+        *,
+        asc: bool = True,
+    ) -> dict | None:
+        sql, params = self._select(table, query, sort, asc=asc)
+        row = self._connection.execute(f"{sql} LIMIT 1", params).fetchone()
+        return self._decode(row[0]) if row else None
+
+    def delete(self, table: str, query: list[tuple] | None = None) -> None:
+        self._ensure_table(table)
+        where, params = self._where(table, query)
+        with self._connection as connection:
+            sql = f"DELETE FROM {_quote(table)} WHERE {where}"  # noqa: S608
+            connection.execute(sql, params)
+
+    def count(self, table: str, query: list[tuple] | None = None) -> int:
+        self._ensure_table(table)
+        where, params = self._where(table, query)
+        sql = f"SELECT COUNT(*) FROM {_quote(table)} WHERE {where}"  # noqa: S608
+        return self._connection.execute(sql, params).fetchone()[0]
+
+    def _upsert(
+        self,
+        table: str,
+        data: list,
+        key_col: str,
+        timestamp_col: str,
+        stored: dict | None = None,  # noqa: ARG002
+    ) -> UpsertResult:
+        """Upsert all rows, in chunks of UPSERT_CHUNK_SIZE.
+
+        Per chunk, the stored rows are loaded with one query. Rows are merged into
+        the stored rows (like a $set), and written with one executemany for updates
+        and one for inserts. Rows older than the stored row are skipped. The read and
+        the writes of a chunk share one immediate transaction, such that no other
+        connection writes the same keys in between. Hence the stored rows read by
+        upsert are not used.
+        """
+        self._ensure_table(table)
+        result = UpsertResult()
+        for rows in chunk(data, self.UPSERT_CHUNK_SIZE):
+            result += self._upsert_chunk(table, rows, key_col, timestamp_col)
+        return result
+
+    def _upsert_chunk(
+        self, table: str, rows: list, key_col: str, timestamp_col: str
+    ) -> UpsertResult:
+        with self._connection as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            updates, inserts, result = self._merge_chunk(
+                table, rows, key_col, timestamp_col
+            )
+            connection.executemany(
+                f"UPDATE {_quote(table)} SET doc = ? WHERE pk = ?",  # noqa: S608
+                [(_encode(doc), rowid) for rowid, doc in updates.items()],
+            )
+            connection.executemany(
+                f"INSERT INTO {_quote(table)} (doc) VALUES (?)",  # noqa: S608
+                [(_encode(doc),) for doc in inserts.values()],
+            )
+        return result
+
+    def _merge_chunk(
+        self, table: str, rows: list, key_col: str, timestamp_col: str
+    ) -> tuple[dict[int, dict], dict[Any, dict], UpsertResult]:
+        """Merge the rows into the stored rows, to get the updates and inserts."""
+        stored = {
+            row[key_col]: (rowid, row)
+            for rowid, row in self._find_with_rowid(
+                table, [(key_col, "in", [row[key_col] for row in rows])]
+            )
+        }
+        result = UpsertResult()
+        updates: dict[int, dict] = {}
+        inserts: dict[Any, dict] = {}
+        for row in rows:
+            key = row[key_col]
+            if key in inserts:
+                inserts[key] = {**inserts[key], **row}
+                result.matched += 1
+                continue
+            if key not in stored:
+                inserts[key] = row
+                result.upserted += 1
+                continue
+            rowid, stored_row = stored[key]
+            if timestamp_col and self.is_outdated(
+                row.get(timestamp_col), stored_row.get(timestamp_col)
+            ):
+                result.skipped += 1
+                continue
+            merged = {**stored_row, **row}
+            result.matched += 1
+            if merged != stored_row:
+                result.modified += 1
+                updates[rowid] = merged
+                stored[key] = (rowid, merged)
+        return updates, inserts, result
+
+    def _insert(self, table: str, data: list) -> None:
+        self._ensure_table(table)
+        with self._connection as connection:
+            connection.executemany(
+                f"INSERT INTO {_quote(table)} (doc) VALUES (?)",  # noqa: S608
+                [(_encode(row),) for row in data],
+            )
+
+    def _overwrite(self, table: str, data: pd.DataFrame) -> None:
+        """Replace the rows of the table within one transaction.
+
+        Missing values (NaN) of the dataframe are stored as null.
+        """
+        self._ensure_table(table)
+        data = data.astype(object).where(data.notna(), None)
+        with self._connection as connection:
+            connection.execute(f"DELETE FROM {_quote(table)}")  # noqa: S608
+            connection.executemany(
+                f"INSERT INTO {_quote(table)} (doc) VALUES (?)",  # noqa: S608
+                [(_encode(row),) for row in data.to_dict("records")],
+            )
+
+    def set_indexes(self) -> None:
+        """Create the tables in the metadata, and reconcile their indexes."""
+        for table in self.metadata.tables:
+            self._create_table(table)
+
+    def _ensure_table(self, table: str) -> None:
+        """Create the table, if it was not created yet by set_indexes.
+
+        Other threads wait until the table is created, rather than creating it too.
+        """
+        with self._table_lock:
+            if table not in self._generated_columns:
+                self._create_table(self.metadata.get_table(table))
+
+    def _create_table(self, table: TableMetadata) -> None:
+        """Create the table, its generated columns and its indexes.
+
+        - Generate a column for the key, timestamp and each indexed column
+        - Drop indexes that are not declared (anymore)
+        - Create the declared indexes. The name contains a hash of the definition,
+            such that a changed definition results in a new index.
+        - Remove rows of which the TTL has expired
+
+        All within one immediate transaction, such that other processes do not
+        alter the table at the same time.
+        """
+        name = _quote(table.name)
+        connection = self._connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._alter_table(connection, table, name)
+        except Exception:
+            connection.rollback()
+            self._generated_columns.pop(table.name, None)
+            raise
+        connection.commit()
+
+    def _alter_table(
+        self, connection: sqlite3.Connection, table: TableMetadata, name: str
+    ) -> None:
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} (pk INTEGER PRIMARY KEY, doc TEXT)"
+        )
+        columns = [table.key_col, table.timestamp_col]
+        columns += [c for index in table.indexes for c, _ in index.keys]
+        existing_columns = {
+            row[1] for row in connection.execute(f"PRAGMA table_xinfo({name})")
+        }
+        generated = {}
+        for column in filter(None, dict.fromkeys(columns)):
+            generated[column] = f"_c_{column.replace('.', '__')}"
+            if generated[column] not in existing_columns:
+                connection.execute(
+                    f"ALTER TABLE {name} ADD COLUMN {_quote(generated[column])} "
+                    f"GENERATED ALWAYS AS ({_json_path(column)}) VIRTUAL"
+                )
+        self._generated_columns[table.name] = generated
+
+        declared = {self._index_name(table.name, i): i for i in table.indexes}
+        existing = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? "
+            "AND name LIKE 'ix_%'",
+            [table.name],
+        ).fetchall()
+        for (index_name,) in existing:
+            if index_name not in declared:
+                self.logger.info("Dropping index %s on %s", index_name, table.name)
+                connection.execute(f"DROP INDEX {_quote(index_name)}")
+        for index_name, index in declared.items():
+            connection.execute(self._create_index_sql(table.name, index_name, index))
+            if index.ttl_seconds is not None:
+                self._expire(table.name, index)
+
+    def _index_name(self, table: str, index: IndexMetadata) -> str:
+        definition = repr((index.columns, index.unique, index.partial_filter))
+        return f"ix_{table}_{sha1(definition.encode()).hexdigest()[:10]}"  # noqa: S324
+
+    def _create_index_sql(self, table: str, name: str, index: IndexMetadata) -> str:
+        columns = ", ".join(
+            f"{self._column(table, column)} {'ASC' if asc else 'DESC'}"
+            for column, asc in index.keys
+        )
+        sql = (
+            f"CREATE {'UNIQUE ' if index.unique else ''}INDEX IF NOT EXISTS "
+            f"{_quote(name)} ON {_quote(table)} ({columns})"
+        )
+        if index.partial_filter:
+            # Partial indexes cannot have parameters, hence inline the values
+            where, params = self._where(table, index.partial_filter)
+            for param in params:
+                where = where.replace("?", _literal(param), 1)
+            sql += f" WHERE {where}"
+        return sql
+
+    def _expire(self, table: str, index: IndexMetadata) -> None:
+        """Emulate a TTL index: delete the rows of which the TTL has passed."""
+        column, _ = index.keys[0]
+        cutoff = datetime.now(tz=timezone.utc).timestamp() - index.ttl_seconds
+        self._connection.execute(
+            f"DELETE FROM {_quote(table)} WHERE {self._column(table, column)} < ?",  # noqa: S608
+            [_format_datetime(datetime.fromtimestamp(cutoff, tz=timezone.utc))],
+        )
+
+    def _column(self, table: str | None, column: str) -> str:
+        """Get the SQL expression of a column. Use the generated column if any."""
+        if generated := self._generated_columns.get(table, {}).get(column):
+            return _quote(generated)
+        return _json_path(column)
+
+    def _where(self, table: str | None, query: list[tuple] | None) -> tuple[str, list]:
+        """Convert a query to a WHERE clause, following MongoDB semantics.
+
+        Missing values equal null, and ne/nin also match missing values.
+        """
+        clauses, params = ["1"], []
+        for column, operator, value in query or []:
+            expression = self._column(table, column)
+            if operator in ["in", "nin"]:
+                values = [_param(v) for v in value if v is not None]
+                clause = f"{expression} IN ({', '.join('?' * len(values))})"
+                if None in value:
+                    clause = f"({clause} OR {expression} IS NULL)"
+                if operator == "nin":
+                    clause = f"NOT {clause}"
+                    if None not in value:
+                        clause = f"({clause} OR {expression} IS NULL)"
+                params.extend(values)
+            elif operator in ["eq", "ne"] and value is None:
+                clause = f"{expression} IS {'' if operator == 'eq' else 'NOT '}NULL"
+            elif operator == "ne":
+                clause = f"({expression} != ? OR {expression} IS NULL)"
+                params.append(_param(value))
+            elif operator in _OPERATORS:
+                clause = f"{expression} {_OPERATORS[operator]} ?"
+                params.append(_param(value))
+            else:
+                msg = f"Unsupported operator {operator}"
+                raise ValueError(msg)
+            clauses.append(clause)
+        return " AND ".join(clauses), params
+
+    def _select(
+        self,
+        table: str,
+        query: list[tuple] | None,
+        sort: list[str] | None,
+        *,
+        asc: bool,
+    ) -> tuple[str, list]:
+        self._ensure_table(table)
+        where, params = self._where(table, query)
+        sql = f"SELECT doc FROM {_quote(table)} WHERE {where}"  # noqa: S608
+        if sort:
+            direction = "ASC" if asc else "DESC"
+            sql += " ORDER BY " + ", ".join(
+                f"{self._column(table, column)} {direction}" for column in sort
+            )
+        return sql, params
+
+    def _find_with_rowid(self, table: str, query: list[tuple]) -> Iterator[tuple]:
+        where, params = self._where(table, query)
+        sql = f"SELECT pk, doc FROM {_quote(table)} WHERE {where}"  # noqa: S608
+        for rowid, doc in self._connection.execute(sql, params):
+            yield rowid, self._decode(doc)
+
+    def _decode(self, doc: str, projection: list[str] | None = None) -> dict:
+        """Load a document. If a projection is given, only keep those columns."""
+        row = json.loads(doc, object_hook=_decode_object)
+        if not projection:
+            return row
+        result = {}
+        for column in projection:
+            source, target = row, result
+            *parents, leaf = column.split(".")
+            for part in parents:
+                if not isinstance(source.get(part), dict):
+                    break
+                source = source[part]
+                target = target.setdefault(part, {})
+            else:
+                if leaf in source:
+                    target[leaf] = source[leaf]
+        return result
+
+
+_OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _quote(identifier: str) -> str:
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def _json_path(column: str) -> str:
+    """Get the value of a (dotted) column from the document. Unwrap datetimes."""
+    path = "$" + "".join(f'."{part}"' for part in column.split("."))
+    path = path.replace("'", "''")
+    return (
+        f"COALESCE(json_extract(doc, '{path}.\"$date\"'), json_extract(doc, '{path}'))"
+    )
+
+
+def _format_datetime(value: datetime) -> str:
+    """Format a datetime as iso string in UTC, such that they sort correctly."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def _param(value: Any) -> Any:
+    """Convert a query value to a value that SQLite can compare to the documents."""
+    if isinstance(value, datetime):
+        return _format_datetime(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _literal(value: Any) -> str:
+    """Render a value as SQL literal, for statements that cannot have parameters."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, int | float):
+        return str(value)
+    return "'{}'".format(str(value).replace("'", "''"))
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": _format_datetime(value)}
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    msg = f"Object of type {type(value).__name__} is not JSON serializable"
+    raise TypeError(msg)
+
+
+def _encode(row: dict) -> str:
+    return json.dumps(row, default=_encode_value)
+
+
+def _decode_object(value: dict) -> Any:
+    """Convert {"$date": ...} back to a (naive, UTC) datetime, like pymongo does."""
+    if value.keys() == {"$date"}:
+        return datetime.fromisoformat(value["$date"])
+    return value
@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class UpsertResult:
+    """The outcome of an upsert, as reported by the storage.
+
+    Attributes
+    ----------
+        matched: The amount of rows that matched an existing row.
+        modified: The amount of existing rows that were changed.
+        upserted: The amount of rows that were newly inserted.
+        skipped: The amount of rows that were not written, because the stored row
+            has a newer timestamp.
+        unchanged: The amount of rows that were not written, because the stored row
+            has the same content hash.
+
+    """
+
+    matched: int = 0
+    modified: int = 0
+    upserted: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        """Sum the counts of two results, eg of two chunks."""
+        return UpsertResult(
+            matched=self.matched + other.matched,
+            modified=self.modified + other.modified,
+            upserted=self.upserted + other.upserted,
+            skipped=self.skipped + other.skipped,
+            unchanged=self.unchanged + other.unchanged,
+        )
@@ -1,9 +1,45 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+
+@dataclass
+class IndexMetadata:
+    """A class that contains metadata about an index on a table.
+
+    Attributes
+    ----------
+        columns: The columns of the index, in order. Prefix a column with a '-' to
+            index it descending.
+        unique: Whether the index enforces unique values.
+        partial_filter: Only index rows that match this query. A list of queries,
+            in the same format as the query of AbstractStorage.find.
+        ttl_seconds: Remove rows this many seconds after the (datetime) value in the
+            column. Only allowed on single-column indexes.
+
+    """
+
+    columns: list[str]
+    unique: bool = False
+    partial_filter: list[tuple] | None = None
+    ttl_seconds: int | None = None
+
+    def __post_init__(self) -> None:
+        """Validate that a TTL index has a single column."""
+        if self.ttl_seconds is not None and len(self.columns) != 1:
+            msg = f"TTL index on {self.columns} should have exactly one column."
+            raise ValueError(msg)
+
+    @property
+    def keys(self) -> list[tuple[str, bool]]:
+        """The columns of the index, as (column, ascending) tuples."""
+        return [(c.removeprefix("-"), not c.startswith("-")) for c in self.columns]
 
 
 @dataclass
 class TableMetadata:
-    """A class that contains metadata about a table."""
+    """A class that contains metadata about a table.
+
+    A dimension table is small and rarely changes. Reads may therefor be cached.
+    """
 
     name: str
     key_col: str
@@ -11,3 +47,11 @@ class TableMetadata:
     type: str
     endpoint: str = None
     json_schema: dict = None
+    indexes: list[IndexMetadata] = field(default_factory=list)
+    dimension: bool = False
+
+    def __post_init__(self) -> None:
+        """Convert the indexes to IndexMetadata, if loaded from json."""
+        self.indexes = [
+            IndexMetadata(**i) if isinstance(i, dict) else i for i in self.indexes
+        ]
@@ -1,5 +1,5 @@
+import os
 from datetime import datetime
-from typing import TYPE_CHECKING
 
 from kink import di
 from prefect import flow, serve, tags, task
@@ -9,30 +9,11 @@ from bunq_ynab_connect.classification.deployer import Deployer
 from bunq_ynab_connect.classification.feature_store import FeatureStore
 from bunq_ynab_connect.classification.trainer import Trainer
 from bunq_ynab_connect.clients.bunq_client import BunqClient
-from bunq_ynab_connect.data.data_extractors.bunq_account_extractor import (
-    BunqAccountExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.bunq_payment_extractor import (
-    BunqPaymentExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_account_extractor import (
-    YnabAccountExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_budget_extractor import (
-    YnabBudgetExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_transaction_extractor import (
-    YnabTransactionExtractor,
-)
+from bunq_ynab_connect.data.data_extractors.extractor_graph import ExtractorGraph
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
 from bunq_ynab_connect.models.ynab_budget import YnabBudget
 from bunq_ynab_connect.sync_bunq_to_ynab.payment_syncer import PaymentSyncer
 
-if TYPE_CHECKING:
-    from bunq_ynab_connect.data.data_extractors.abstract_extractor import (
-        AbstractExtractor,
-    )
-
 from bunq_ynab_connect.scripts.remove_old_mlflow_runs import run
 
 
@@ -40,24 +21,26 @@ from bunq_ynab_connect.scripts.remove_old_mlflow_runs import run
 def extract() -> None:
     """Run all extractors.
 
-    Run Bunq and YNAB extractors in parallel.
+    Run Bunq and YNAB extractors in parallel, each after its dependencies. Log how
+    often the bunq connections were reused.
     """
-    extractors: list[AbstractExtractor] = [
-        BunqAccountExtractor(),
-        BunqPaymentExtractor(),
-        YnabBudgetExtractor(),
-        YnabAccountExtractor(),
-        YnabTransactionExtractor(),
-    ]
-    for extractor in extractors:
-        extractor.extract()
+    try:
+        ExtractorGraph().run()
+    finally:
+        di[BunqClient].base_client.close()
 
 
 @flow
 def sync_payment_queue() -> None:
-    """Sync all payements in the payment queue."""
+    """Sync all payements in the payment queue.
+
+    If YNAB_SYNC_BATCHED is true, the transactions are created in chunks per budget.
+    """
     syncer = PaymentSyncer()
-    syncer.sync()
+    if os.getenv("YNAB_SYNC_BATCHED", "false").lower() == "true":
+        syncer.sync_batched()
+    else:
+        syncer.sync()
 
 
 @flow
@@ -138,7 +121,13 @@ def remove_old_mlflow_runs() -> None:
 
 
 def work() -> None:
-    """Create a deployment for each flow, and serve all of them."""
+    """Create a deployment for each flow, and serve all of them.
+
+    If BUNQ_SESSION_REFRESH is true, the bunq session is renewed in the background.
+    The flow runs then find an active session in the bunq config.
+    """
+    if os.getenv("BUNQ_SESSION_REFRESH", "false").lower() == "true":
+        di[BunqClient].base_client.session_activator.start_refresher()
     serve(
         sync.to_deployment(
             name="sync",
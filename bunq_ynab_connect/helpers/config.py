@@ -11,12 +11,20 @@ CONFIG_DIR = PROJECT_DIR / ".." / "config"
 BUNQ_CONFIG_DIR = CONFIG_DIR / "bunq"
 BUNQ_CALLBACK_INDEX = "bunq_callback"
 BUNQ_CONFIG_INDEX = "bunq_config"
+BUNQ_RATE_LIMITER_INDEX = "bunq_rate_limiter"
+YNAB_RATE_LIMITER_INDEX = "ynab_rate_limiter"
+BUNQ_CASSETTE_INDEX = "bunq_cassette"
+YNAB_CASSETTE_INDEX = "ynab_cassette"
 
 METADATA_DIR = PROJECT_DIR / "metadata"
 LOGS_DIR = PROJECT_DIR / ".." / "logs"
 CACHE_DIR = PROJECT_DIR / ".." / "cache"
+DATA_DIR = PROJECT_DIR / ".." / "data"
 LOGS_FILE = LOGS_DIR / "logs.log"
+CASSETTE_DIR = CACHE_DIR / "cassettes"
 MLSERVER_CONFIG_DIR = CONFIG_DIR / "mlserver/models"
 
+SQLITE_PATH_INDEX = "sqlite_path"
+
 MLSERVER_PREDICTION_URL_INDEX = "mlserver_model_url"
 MLSERVER_REPOSITORY_URL_INDEX = "mlserver_repository_url"
@@ -1,6 +1,6 @@
 import pickle
 import shelve
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from datetime import date, datetime
 from functools import wraps
 from logging import LoggerAdapter
@@ -64,6 +64,12 @@ def cache(logger: LoggerAdapter, ttl: int | None = None) -> Callable:
     return decorator
 
 
+def chunk(items: list, size: int) -> Iterator[list]:
+    """Split a list into consecutive chunks of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
 def date_to_datetime(_date: date) -> datetime:
     """Convert a date to a datetime."""
     return datetime(
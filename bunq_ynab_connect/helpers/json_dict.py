@@ -1,28 +1,78 @@
 import json
+import os
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from copy import deepcopy
 from logging import LoggerAdapter
 from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import RLock
+from typing import Any
 
 from kink import inject
 
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
 
 class JsonDict(dict):
-    """Helper class to real-time read and write a json file."""
+    """Helper class to real-time read and write a json file.
+
+    The parsed file is kept in memory, and only read again if the file changed (ie
+    its modification time, inode or size). Writes go to a temporary file, which then
+    replaces the file, such that readers never see a partially written file. Writes
+    take a lock on a '.lock' file next to it, such that several processes (eg
+    concurrent flows) can share the file without losing each others updates.
+
+    Attributes
+    ----------
+        logger: The logger
+        path: The path of the json file
+
+    """
 
     logger: LoggerAdapter
+    path: Path
 
     @inject
     def __init__(self, logger: LoggerAdapter, path: Path) -> None:
         self.logger = logger
         self.path = path
+        self._cache: dict = {}
+        self._version: tuple | None = None
+        self._lock = RLock()
+        self._lock_depth = 0
 
     @property
     def data(self) -> dict:
-        if not self.path.exists():
-            return {}
+        """A copy of the contents of the file."""
+        return deepcopy(self._load())
+
+    def _load(self) -> dict:
+        """Get the cached contents, or read the file again if it changed."""
+        version = self._get_version()
+        with self._lock:
+            if version != self._version:
+                self._cache = self._read() if version is not None else {}
+                self._version = version
+            return self._cache
+
+    def _read(self) -> dict:
         with self.path.open("r") as f:
             return json.load(f)
 
-    def __getitem__(self, key: str) -> str:
+    def _get_version(self) -> tuple | None:
+        """Identify the current file, or return None if it does not exist."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def __getitem__(self, key: str) -> Any:
         """Get a value from the config file.
 
         Parameters
@@ -31,23 +81,69 @@ class JsonDict(dict):
             The key to get the value for. Can contain dots
 
         """
-        config = self.data
+        config = self._load()
         for part in key.split("."):
             config = config.get(part, None)
             if config is None:
                 return None
-        return config
+        return deepcopy(config) if isinstance(config, dict | list) else config
 
     def __setitem__(self, key: str, value: str) -> None:
         """Set a value in the config file."""
         self.update({key: value})
 
     def update(self, data: dict) -> None:
-        self.save(_merge_dicts(self.data, data))
+        """Merge data into the file. Reads the file within the lock of the write."""
+        with self.locked():
+            original = self._read() if self.path.exists() else {}
+            self._write(_merge_dicts(original, data))
 
     def save(self, config: dict) -> None:
-        with self.path.open("w") as f:
+        with self.locked():
+            self._write(config)
+
+    def _write(self, config: dict) -> None:
+        """Write the file atomically, via a temporary file in the same folder."""
+        with NamedTemporaryFile(
+            "w", dir=self.path.parent, prefix=f".{self.path.name}.", delete=False
+        ) as f:
             json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        Path(f.name).replace(self.path)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the lock of this process, and the lock file shared by processes.
+
+        Callers may hold it around several reads and writes, eg to decide what to
+        write without another process writing in between. Reentrant within a thread.
+        """
+        # Only the outermost lock of a thread takes the lock file
+        with self._lock, nullcontext() if self._lock_depth else self._lock_file():
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+
+    @contextmanager
+    def _lock_file(self) -> Iterator[None]:
+        lock_path = self.path.with_name(f"{self.path.name}.lock")
+        with lock_path.open("a+") as lock_file:
+            if sys.platform == "win32":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if sys.platform == "win32":
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def _merge_dicts(original: dict, new: dict) -> dict:
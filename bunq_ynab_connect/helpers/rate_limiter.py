@@ -0,0 +1,57 @@
+from collections import deque
+from logging import LoggerAdapter
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    """Limit the amount of calls within a sliding window, shared across threads.
+
+    A client calls acquire before each request. If the window is full, acquire
+    blocks until the oldest call leaves the window. Since all threads share one
+    instance, concurrent requests together stay within the limit of the API. With a
+    window of an hour, acquire may block for a long time, hence long waits are logged.
+
+    Attributes
+    ----------
+        max_calls: The maximum amount of calls within the window.
+        period: The length of the window, in seconds.
+        logger: Logs the waits of more than WARN_AFTER_SECONDS, if given.
+        WARN_AFTER_SECONDS: The seconds of a wait that is logged as a warning.
+
+    """
+
+    max_calls: int
+    period: float
+    logger: LoggerAdapter | None
+    WARN_AFTER_SECONDS = 5.0
+
+    def __init__(
+        self, max_calls: int, period: float, logger: LoggerAdapter | None = None
+    ) -> None:
+        self.max_calls = max_calls
+        self.period = period
+        self.logger = logger
+        self._calls: deque[float] = deque()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed within the window, and register it."""
+        while True:
+            with self._lock:
+                moment = monotonic()
+                while self._calls and self._calls[0] <= moment - self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(moment)
+                    return
+                wait = self._calls[0] + self.period - moment
+            if self.logger and wait > self.WARN_AFTER_SECONDS:
+                self.logger.warning(
+                    "Rate limit of %s calls per %s seconds reached, waiting %.0f "
+                    "seconds",
+                    self.max_calls,
+                    self.period,
+                    wait,
+                )
+            sleep(wait)
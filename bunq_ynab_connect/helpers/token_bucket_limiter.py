@@ -0,0 +1,155 @@
+import asyncio
+from collections.abc import Callable
+from random import uniform
+from threading import Lock
+from time import sleep, time
+from typing import Any
+
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+
+
+class TokenBucketLimiter:
+    """Limit calls with a token bucket per bucket, eg per HTTP method or endpoint.
+
+    Each bucket holds at most capacity tokens, and refills at rate tokens per
+    second. A client calls acquire with the bucket of its request before sending it.
+    If the bucket is empty, acquire blocks until a token is refilled. All threads
+    share one instance, and hence one budget per bucket. Use per_window to get the
+    limit of a bucket from an API limit of a maximum amount of calls per window.
+
+    If a storage is given, the buckets are stored in its rate_limits table, such that
+    several processes share one budget. This is a best effort: two processes could
+    both take the last token. The request that is throttled by the API is then
+    retried with backoff.
+
+    Attributes
+    ----------
+        limits: The capacity and the refill rate (tokens per second) per bucket.
+        storage: The storage to share the buckets with other processes, if any.
+        retries: The amount of requests that were retried after backoff.
+        throttled_seconds: The total time that acquire and backoff waited.
+        TABLE_NAME: The table that stores the buckets, if shared.
+        MAX_BACKOFF: The maximum seconds to back off, without a Retry-After.
+        WINDOW_MARGIN: The seconds added to the window of an API limit in per_window,
+            since the API may receive the calls closer together than they were sent.
+
+    """
+
+    limits: dict[str, tuple[int, float]]
+    storage: AbstractStorage | None
+    retries: int
+    throttled_seconds: float
+    TABLE_NAME = "rate_limits"
+    MAX_BACKOFF = 30.0
+    WINDOW_MARGIN = 0.1
+
+    def __init__(
+        self,
+        limits: dict[str, tuple[int, float]],
+        storage: AbstractStorage | None = None,
+    ) -> None:
+        self.limits = limits
+        self.storage = storage
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = Lock()
+
+    @classmethod
+    def per_window(cls, max_calls: int, period: float) -> tuple[int, float]:
+        """Get the capacity and rate that allow at most max_calls per period seconds.
+
+        A bucket allows capacity + rate * period calls within any window of period
+        seconds, rounded down. With a capacity of 1 the calls are spread evenly, such
+        that the rate can be almost max_calls / period. A larger capacity would allow
+        a burst, but requires a lower rate.
+        """
+        return 1, max_calls / (period + cls.WINDOW_MARGIN)
+
+    def acquire(self, bucket: str) -> None:
+        """Block until the bucket has a token, and take it."""
+        while (wait := self._wait(bucket)) > 0:
+            sleep(wait)
+
+    async def acquire_async(self, bucket: str) -> None:
+        """Wait until the bucket has a token and take it, without blocking the loop.
+
+        With a storage, the bucket is read and written in a thread, since the storage
+        blocks.
+        """
+        while (wait := await self._off_loop(self._wait, bucket)) > 0:  # noqa: ASYNC110
+            await asyncio.sleep(wait)
+
+    def backoff(
+        self, bucket: str, attempt: int, retry_after: float | None = None
+    ) -> None:
+        """Wait before retrying a request that the API throttled.
+
+        The bucket is emptied, such that other threads wait as well. Waits the
+        Retry-After of the API if given, else an exponential backoff with full jitter,
+        such that throttled threads do not retry at the same moment.
+        """
+        sleep(self._throttle(bucket, attempt, retry_after))
+
+    async def backoff_async(
+        self, bucket: str, attempt: int, retry_after: float | None = None
+    ) -> None:
+        """Like backoff, without blocking the event loop."""
+        await asyncio.sleep(
+            await self._off_loop(self._throttle, bucket, attempt, retry_after)
+        )
+
+    def stats(self) -> dict[str, float]:
+        """Get the amount of retries, and the total time throttled."""
+        return {"retries": self.retries, "throttled_seconds": self.throttled_seconds}
+
+    async def _off_loop(self, func: Callable[..., float], *args: Any) -> float:
+        """Call func in a thread if it uses the storage, else on the event loop."""
+        if self.storage is None:
+            return func(*args)
+        return await asyncio.to_thread(func, *args)
+
+    def _wait(self, bucket: str) -> float:
+        """Take a token, or count and return the seconds to wait for one."""
+        with self._lock:
+            wait = self._take(bucket)
+            if wait > 0:
+                self.throttled_seconds += wait
+            return wait
+
+    def _throttle(self, bucket: str, attempt: int, retry_after: float | None) -> float:
+        """Empty the bucket, count the retry, and return the seconds to back off."""
+        if retry_after is None:
+            retry_after = uniform(0, min(self.MAX_BACKOFF, 2**attempt))  # noqa: S311
+        with self._lock:
+            self._save(bucket, 0.0, time())
+            self.retries += 1
+            self.throttled_seconds += retry_after
+        return retry_after
+
+    def _take(self, bucket: str) -> float:
+        """Take a token, or return the seconds until the bucket has one."""
+        capacity, rate = self.limits[bucket]
+        moment = time()
+        tokens, updated = self._load(bucket, capacity, moment)
+        tokens = min(capacity, tokens + (moment - updated) * rate)
+        if tokens < 1:
+            self._save(bucket, tokens, moment)
+            return (1 - tokens) / rate
+        self._save(bucket, tokens - 1, moment)
+        return 0.0
+
+    def _load(self, bucket: str, capacity: int, moment: float) -> tuple[float, float]:
+        """Get the tokens of a bucket and when they were counted. Starts full."""
+        if self.storage is None:
+            return self._buckets.get(bucket, (capacity, moment))
+        row = self.storage.find_one(self.TABLE_NAME, [("bucket", "eq", bucket)])
+        return (row["tokens"], row["updated"]) if row else (capacity, moment)
+
+    def _save(self, bucket: str, tokens: float, moment: float) -> None:
+        if self.storage is None:
+            self._buckets[bucket] = (tokens, moment)
+            return
+        self.storage.upsert(
+            self.TABLE_NAME, [{"bucket": bucket, "tokens": tokens, "updated": moment}]
+        )
@@ -1,24 +1,13 @@
 import click
-from kink import inject
+from kink import di, inject
 
 from bunq_ynab_connect.classification.deployer import Deployer
 from bunq_ynab_connect.classification.trainer import Trainer
-from bunq_ynab_connect.data.data_extractors.bunq_account_extractor import (
-    BunqAccountExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.bunq_payment_extractor import (
-    BunqPaymentExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_account_extractor import (
-    YnabAccountExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_budget_extractor import (
-    YnabBudgetExtractor,
-)
-from bunq_ynab_connect.data.data_extractors.ynab_transaction_extractor import (
-    YnabTransactionExtractor,
-)
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.data.data_extractors.extractor_graph import ExtractorGraph
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.cached_storage import CachedStorage
+from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
 from bunq_ynab_connect.sync_bunq_to_ynab.payment_syncer import PaymentSyncer
 
 
@@ -30,22 +19,21 @@ def cli() -> None:
 @cli.command()
 def extract() -> None:
     """Run all extractors."""
-    extractors = [
-        BunqAccountExtractor(),
-        BunqPaymentExtractor(),
-        YnabBudgetExtractor(),
-        YnabAccountExtractor(),
-        YnabTransactionExtractor(),
-    ]
-    for extractor in extractors:
-        extractor.extract()
+    try:
+        ExtractorGraph().run()
+    finally:
+        di[BunqClient].base_client.close()
 
 
 @cli.command()
-def sync_payments() -> None:
+@click.option("--batched", is_flag=True, help="Create the transactions in chunks.")
+def sync_payments(*, batched: bool) -> None:
     """Sync payments from bunq to YNAB."""
     syncer = PaymentSyncer()
-    syncer.sync()
+    if batched:
+        syncer.sync_batched()
+    else:
+        syncer.sync()
 
 
 @cli.command()
@@ -57,6 +45,24 @@ def sync_payment(payment_id: int, skip_if_synced: bool) -> None:  # noqa: FBT001
     syncer.sync_payment(payment_id, skip_if_synced=skip_if_synced)
 
 
+@cli.command()
+@inject
+def index_stats(storage: AbstractStorage) -> None:
+    """Print how often each index is used, and the amount of collection scans."""
+    if isinstance(storage, CachedStorage):
+        storage = storage.storage
+    if not isinstance(storage, MongoStorage):
+        msg = "Index statistics are only available for MongoStorage"
+        raise click.UsageError(msg)
+    storage.set_indexes()
+    for row in storage.index_usage():
+        click.echo(
+            f"{row['table']:<25} {row['index']:<40} {row['accesses']:>10} "
+            f"since {row['since']}"
+        )
+    click.echo(f"Collection scans since server start: {storage.collection_scans()}")
+
+
 @cli.command()
 @inject
 def test(storage: AbstractStorage) -> None:  # noqa: ARG001
@@ -0,0 +1,87 @@
+"""Benchmark the BunqClient against a local stand-in of the bunq API.
+
+Starts the stand-in with ACCOUNTS accounts of PAYMENTS payments each, LATENCY
+seconds of latency per response, and a THROTTLE_RATE share of 429s. The client
+creates its keys, installation and session with the stand-in like with bunq. It
+then loads the accounts and all their payments, with one thread per account like
+the extractors. The rate limits are raised, such that the client and the stand-in
+are measured rather than the limits of bunq. Reports the requests per second, the
+latency percentiles, and the retries after a 429.
+
+Usage: python -m bunq_ynab_connect.scripts.benchmark_bunq_client
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from logging import LoggerAdapter
+from pathlib import Path
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any
+
+from kink import di
+from requests import Response
+
+from bunq_ynab_connect.models.bunq_account import BunqAccount
+from bunq_ynab_connect.scripts.bunq_stand_in import (
+    create_app,
+    create_client,
+    free_port,
+    serve_in_thread,
+)
+
+ACCOUNTS = 5
+PAYMENTS = 2_000
+LATENCY = 0.02
+THROTTLE_RATE = 0.01
+
+
+def run() -> None:
+    """Load all accounts and payments from the stand-in, and log the throughput."""
+    logger = di[LoggerAdapter]
+    port = free_port()
+    app = create_app(ACCOUNTS, PAYMENTS, LATENCY, THROTTLE_RATE)
+    server = serve_in_thread(app, port)
+    try:
+        with TemporaryDirectory() as directory:
+            client = create_client(Path(directory), f"http://127.0.0.1:{port}/v1")
+            # Create the session first, such that only the loading is measured
+            _ = client.user_id
+            latencies = []
+
+            def measure(response: Response, *_: Any, **__: Any) -> None:
+                latencies.append(response.elapsed.total_seconds())
+
+            client.base_client.session.hooks["response"].append(measure)
+            start = perf_counter()
+            accounts = [BunqAccount(**a) for a in client.get_accounts()]
+            with ThreadPoolExecutor(len(accounts)) as executor:
+                payments = sum(
+                    len(p)
+                    for p in executor.map(client.get_payments_for_account, accounts)
+                )
+            duration = perf_counter() - start
+            client.base_client.close()
+    finally:
+        server.should_exit = True
+
+    percentiles = quantiles(latencies, n=100)
+    logger.info(
+        "Loaded %s payments of %s accounts in %.2f s",
+        payments,
+        len(accounts),
+        duration,
+    )
+    logger.info(
+        "%s requests (%.0f per second), latency p50 %.0f ms, p95 %.0f ms, "
+        "%s retried after a 429",
+        len(latencies),
+        len(latencies) / duration,
+        percentiles[49] * 1000,
+        percentiles[94] * 1000,
+        client.base_client.rate_limiter.stats()["retries"],
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""Benchmark the lookup of the head of the payment queue, for a growing queue.
+
+Runs against the configured MongoDB, in a separate benchmark database. The queue
+is filled with synced payments, plus a few unsynced payments at the end. The
+lookup time of the queue head should stay flat while the queue grows.
+
+Usage: python -m bunq_ynab_connect.scripts.benchmark_queue_head
+"""
+
+from datetime import timedelta
+from logging import LoggerAdapter
+from statistics import median
+from time import perf_counter
+
+from kink import di
+from pymongo import MongoClient
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
+from bunq_ynab_connect.helpers.general import chunk, now
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
+
+BENCHMARK_DATABASE = "bunqynab_benchmark"
+QUEUE_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+UNSYNCED_PAYMENTS = 10
+LOOKUPS_PER_SIZE = 100
+INSERT_CHUNK_SIZE = 10_000
+
+
+def _fill_queue(storage: MongoStorage, current_size: int, size: int) -> None:
+    """Grow the queue to size rows. All but the last few payments are synced."""
+    start = now() - timedelta(days=365)
+    rows = [
+        {
+            "payment_id": i,
+            "synced_at": None if i >= size - UNSYNCED_PAYMENTS else start,
+            "updated_at": (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(current_size, size)
+    ]
+    # Previously unsynced payments are now synced, to keep the head at the end
+    storage.database[PaymentQueue.TABLE_NAME].update_many(
+        {"synced_at": None}, {"$set": {"synced_at": start}}
+    )
+    for rows_chunk in chunk(rows, INSERT_CHUNK_SIZE):
+        storage.database[PaymentQueue.TABLE_NAME].insert_many(rows_chunk)
+
+
+def _time_lookups(queue: PaymentQueue) -> float:
+    """Return the median lookup time of the queue head, in milliseconds."""
+    timings = []
+    for _ in range(LOOKUPS_PER_SIZE):
+        start = perf_counter()
+        queue.get_payment_id()
+        timings.append((perf_counter() - start) * 1000)
+    return median(timings)
+
+
+def run() -> None:
+    """Time the queue head lookup for each queue size in QUEUE_SIZES."""
+    logger = di[LoggerAdapter]
+    client = di[MongoClient]
+    client.drop_database(BENCHMARK_DATABASE)
+    # Creates the indexes declared in the metadata, including the queue head index
+    storage = MongoStorage(
+        client=client,
+        database=client[BENCHMARK_DATABASE],
+        metadata=di[Metadata],
+        logger=logger,
+    )
+    queue = PaymentQueue(logger=logger, storage=storage)
+    current_size = 0
+    try:
+        for size in QUEUE_SIZES:
+            _fill_queue(storage, current_size, size)
+            current_size = size
+            logger.info(
+                "Queue size %s: median head lookup %.3f ms",
+                size,
+                _time_lookups(queue),
+            )
+    finally:
+        client.drop_database(BENCHMARK_DATABASE)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,132 @@
+"""Benchmark the extract and sync pipelines offline, on recorded API responses.
+
+A replay asks for the same requests as the recording only if it starts from the
+same storage: the extractors ask for the payments after the cursors they stored.
+Hence record the responses with this script first, which runs the extractors on
+an empty storage and records to separate files in cache/cassettes:
+
+    python -m bunq_ynab_connect.scripts.benchmark_replay record
+
+This benchmark then replays them into an empty storage, with
+API_CASSETTE_LATENCY_SECONDS of latency per request, such that each run processes
+the same history without the network. The extractors run like the extract flow,
+after which the PaymentSyncer drains the queue. The transactions are built, but
+not created in YNAB, since recording that would add the whole history to YNAB.
+Categories are not predicted, since MLServer is not part of the recording.
+
+Usage: python -m bunq_ynab_connect.scripts.benchmark_replay
+"""
+
+import os
+import sys
+from logging import LoggerAdapter
+from time import perf_counter
+
+from kink import di
+
+from bunq_ynab_connect.clients.bunq.base_client import BunqEnvironment
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.clients.cassette import Cassette, CassetteMode
+from bunq_ynab_connect.data.data_extractors.extractor_graph import ExtractorGraph
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.cached_storage import CachedStorage
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.helpers.config import (
+    BUNQ_CASSETTE_INDEX,
+    CASSETTE_DIR,
+    YNAB_CASSETTE_INDEX,
+)
+from bunq_ynab_connect.models.bunq_payment import BunqPayment
+from bunq_ynab_connect.models.ynab_account import YnabAccount
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_syncer import PaymentSyncer
+
+
+class _ReplaySyncer(PaymentSyncer):
+    """PaymentSyncer that does not call MLServer, nor create the transactions."""
+
+    def decide_category(self, payment: BunqPayment, account: YnabAccount) -> None:  # noqa: ARG002
+        return None
+
+    def create_transaction(self, payment: BunqPayment, account: YnabAccount) -> None:
+        self.payment_to_transaction(payment, account)
+        self.sanity_check_payment(payment)
+
+
+def _use_cassettes(mode: CassetteMode) -> None:
+    """Replace the cassettes of the bootstrap by the cassettes of the benchmark."""
+    latency = float(os.getenv("API_CASSETTE_LATENCY_SECONDS", "0"))
+    paths = {
+        BUNQ_CASSETTE_INDEX: f"benchmark_bunq_{di[BunqEnvironment].name}.jsonl.gz",
+        YNAB_CASSETTE_INDEX: "benchmark_ynab.jsonl.gz",
+    }
+    for index, name in paths.items():
+        if mode == CassetteMode.RECORD:
+            # Cassettes append, hence start from an empty recording
+            (CASSETTE_DIR / name).unlink(missing_ok=True)
+        di[index] = Cassette(CASSETTE_DIR / name, mode, latency)
+
+
+def _use_empty_storage() -> CachedStorage:
+    logger = di[LoggerAdapter]
+    storage = CachedStorage(
+        storage=MemoryStorage(metadata=di[Metadata], logger=logger),
+        metadata=di[Metadata],
+        logger=logger,
+    )
+    di[AbstractStorage] = storage
+    return storage
+
+
+def record() -> None:
+    """Record the responses of the extractors, run on an empty storage."""
+    # Replace the dependencies before the clients and extractors are created
+    _use_cassettes(CassetteMode.RECORD)
+    _use_empty_storage()
+    try:
+        ExtractorGraph().run()
+    finally:
+        di[BunqClient].base_client.close()
+    di[LoggerAdapter].info("Recorded the responses to %s", CASSETTE_DIR)
+
+
+def run() -> None:
+    """Replay the extract and sync pipelines, and log their throughput."""
+    logger = di[LoggerAdapter]
+    # Replace the dependencies before the clients and extractors are created
+    _use_cassettes(CassetteMode.REPLAY)
+    storage = _use_empty_storage()
+    os.environ.setdefault(
+        "START_SYNC_DATE", AbstractStorage.RUNMOMENT_START.isoformat()
+    )
+
+    durations = ExtractorGraph().run()
+    for destination, duration in durations.items():
+        rows = storage.count(destination)
+        logger.info(
+            "Extracted %s rows of %s in %.2f s (%.0f rows/s)",
+            rows,
+            destination,
+            duration,
+            rows / duration if duration else 0,
+        )
+
+    payments = storage.count(PaymentQueue.TABLE_NAME, [("synced_at", "eq", None)])
+    start = perf_counter()
+    # Like the sync flow, the syncer gets the storage and the mapped accounts
+    _ReplaySyncer().sync()
+    duration = perf_counter() - start
+    logger.info(
+        "Synced %s payments in %.2f s (%.0f payments/s)",
+        payments,
+        duration,
+        payments / duration if duration else 0,
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["record"]:
+        record()
+    else:
+        run()
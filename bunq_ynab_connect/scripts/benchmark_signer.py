@@ -0,0 +1,108 @@
+"""Benchmark signing requests and verifying responses, with and without cached keys.
+
+Uses a temporary bunq config with a new key pair. The uncached baseline reads the
+config and parses the PEM keys for each request and response, like the Signer did
+before it cached the keys. The cached run uses the Signer.
+
+Usage: python -m bunq_ynab_connect.scripts.benchmark_signer
+"""
+
+import json
+from base64 import b64decode, b64encode
+from collections.abc import Callable
+from logging import LoggerAdapter
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA256
+from kink import di
+
+from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+
+REQUESTS = 200
+REQUEST = {"count": 200, "description": "Benchmark"}
+RESPONSE = json.dumps({"Response": [{"Payment": {"id": 1}}] * 200})
+
+
+def _create_config(path: Path) -> JsonDict:
+    """Create a config with a new key pair, used as both client and server key."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    config = JsonDict(logger=di[LoggerAdapter], path=path)
+    config.save(
+        {
+            "installation_context": {
+                "private_key_client": key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption(),
+                ).decode(),
+                "public_key_server": key.public_key()
+                .public_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PublicFormat.SubjectPublicKeyInfo,
+                )
+                .decode(),
+            }
+        }
+    )
+    return config
+
+
+def _uncached(config: JsonDict) -> Callable[[], None]:
+    """Sign a request and verify a response, parsing the keys for each."""
+
+    def sign_and_verify() -> None:
+        private_key = serialization.load_pem_private_key(
+            config["installation_context.private_key_client"].encode(), password=None
+        )
+        b64encode(private_key.sign(json.dumps(REQUEST).encode(), PKCS1v15(), SHA256()))
+        public_key = serialization.load_pem_public_key(
+            config["installation_context.public_key_server"].encode()
+        )
+        public_key.verify(b64decode(signature), RESPONSE.encode(), PKCS1v15(), SHA256())
+
+    signature = Signer(logger=di[LoggerAdapter], bunq_config=config).sign(
+        json.loads(RESPONSE)
+    )
+    return sign_and_verify
+
+
+def _cached(config: JsonDict) -> Callable[[], None]:
+    """Sign a request and verify a response with the Signer."""
+    signer = Signer(logger=di[LoggerAdapter], bunq_config=config)
+    signature = signer.sign(json.loads(RESPONSE)).decode()
+
+    def sign_and_verify() -> None:
+        signer.sign(REQUEST)
+        signer.verify(RESPONSE, signature)
+
+    return sign_and_verify
+
+
+def run() -> None:
+    """Time REQUESTS signatures and verifications, without and with cached keys."""
+    logger = di[LoggerAdapter]
+    with TemporaryDirectory() as directory:
+        config = _create_config(Path(directory) / "bunq.cfg")
+        for name, create in [("uncached", _uncached), ("cached", _cached)]:
+            sign_and_verify = create(config)
+            start = perf_counter()
+            for _ in range(REQUESTS):
+                sign_and_verify()
+            duration = perf_counter() - start
+            logger.info(
+                "%s: %s requests signed and verified in %.2f s (%.0f per second)",
+                name,
+                REQUESTS,
+                duration,
+                REQUESTS / duration,
+            )
+
+
+if __name__ == "__main__":
+    run()
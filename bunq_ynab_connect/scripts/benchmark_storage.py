@@ -0,0 +1,146 @@
+"""Benchmark the storage backends side by side, on a synthetic extract and sync run.
+
+The extract workload mirrors an extraction run: overwrite the accounts, upsert a
+batch of payments, queue them, and set the runmoment. The sync workload drains
+the payment queue like the PaymentSyncer: look up the head, load the payment and
+mark it synced. MongoDB runs in a separate benchmark database on the configured
+server, and is skipped if it cannot be reached. SQLite runs in a temporary file.
+MemoryStorage is the baseline without any I/O.
+
+Usage: python -m bunq_ynab_connect.scripts.benchmark_storage
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import timedelta
+from logging import LoggerAdapter
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import pandas as pd
+from kink import di
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
+from bunq_ynab_connect.data.storage.sqlite_storage import SqliteStorage
+from bunq_ynab_connect.helpers.general import now
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
+
+BENCHMARK_DATABASE = "bunqynab_benchmark"
+ACCOUNTS = 10
+PAYMENTS = 20_000
+SYNCED_PAYMENTS = 1_000
+
+
+def _extract(storage: AbstractStorage) -> None:
+    """Store accounts and payments, and queue the payments."""
+    start = now() - timedelta(days=365)
+    accounts = pd.DataFrame.from_records(
+        [{"id": i, "description": f"Account {i}"} for i in range(ACCOUNTS)]
+    )
+    storage.overwrite("bunq_accounts", accounts)
+    payments = [
+        {
+            "id": i,
+            "monetary_account_id": i % ACCOUNTS,
+            "amount": {"value": str(i), "currency": "EUR"},
+            "description": f"Payment {i}",
+            "created": start + timedelta(minutes=i),
+            "updated": start + timedelta(minutes=i),
+        }
+        for i in range(PAYMENTS)
+    ]
+    storage.upsert("bunq_payments", payments)
+    PaymentQueue(logger=storage.logger, storage=storage).add_many(
+        [p["id"] for p in payments]
+    )
+    storage.set_last_runmoment("bunq", now())
+
+
+def _sync(storage: AbstractStorage) -> None:
+    """Drain the head of the payment queue, like the PaymentSyncer does."""
+    queue = PaymentQueue(logger=storage.logger, storage=storage)
+    for _ in range(SYNCED_PAYMENTS):
+        payment_id = queue.get_payment_id()
+        storage.find("bunq_payments", [("id", "eq", payment_id)])
+        queue.mark_synced(payment_id)
+
+
+@contextmanager
+def _mongo_storage() -> Iterator[AbstractStorage | None]:
+    """Yield a MongoStorage in the benchmark database, or None if unreachable."""
+    client = di[MongoClient]
+    try:
+        client.drop_database(BENCHMARK_DATABASE)
+    except PyMongoError:
+        di[LoggerAdapter].warning("MongoDB unreachable, skipping it")
+        yield None
+        return
+    try:
+        yield MongoStorage(
+            client=client,
+            database=client[BENCHMARK_DATABASE],
+            metadata=di[Metadata],
+            logger=di[LoggerAdapter],
+        )
+    finally:
+        client.drop_database(BENCHMARK_DATABASE)
+
+
+@contextmanager
+def _sqlite_storage() -> Iterator[AbstractStorage]:
+    """Yield a SqliteStorage in a temporary file."""
+    with TemporaryDirectory() as directory:
+        yield SqliteStorage(
+            metadata=di[Metadata],
+            logger=di[LoggerAdapter],
+            sqlite_path=Path(directory) / "benchmark.sqlite",
+        )
+
+
+@contextmanager
+def _memory_storage() -> Iterator[AbstractStorage]:
+    """Yield an empty MemoryStorage."""
+    yield MemoryStorage(metadata=di[Metadata], logger=di[LoggerAdapter])
+
+
+def _time(
+    workload: Callable[[AbstractStorage], None], storage: AbstractStorage
+) -> float:
+    """Return the duration of the workload, in seconds."""
+    start = perf_counter()
+    workload(storage)
+    return perf_counter() - start
+
+
+def run() -> None:
+    """Run the extract and sync workload against each backend."""
+    logger = di[LoggerAdapter]
+    backends = {
+        "memory": _memory_storage,
+        "mongo": _mongo_storage,
+        "sqlite": _sqlite_storage,
+    }
+    for name, create_storage in backends.items():
+        with create_storage() as storage:
+            if storage is None:
+                continue
+            extract = _time(_extract, storage)
+            sync = _time(_sync, storage)
+            logger.info(
+                "%s: extract of %s payments %.2f s, sync of %s payments %.2f s",
+                name,
+                PAYMENTS,
+                extract,
+                SYNCED_PAYMENTS,
+                sync,
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,356 @@
+"""A local stand-in of the bunq API, to load test the bunq clients without bunq.
+
+Emulates the endpoints the project uses: installation, device-server and
+session-server, the monetary accounts, their payments, and the notification
+filters. Lists are paginated with older_url and newer_url like bunq does, newest
+first. Responses are signed with a key of the stand-in, that is handed out upon
+installation, such that the Signer verifies them. Signed requests are verified
+with the public key of the client.
+
+The accounts and payments are synthetic. Each response can be delayed, and a
+share of the requests can be throttled with a 429, to test the backoff.
+
+Use create_client to get a BunqClient for the stand-in.
+
+Usage: python -m bunq_ynab_connect.scripts.bunq_stand_in
+Then point a client at http://127.0.0.1:12010/v1
+"""
+
+import asyncio
+import json
+import re
+import socket
+from base64 import b64decode, b64encode
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from logging import LoggerAdapter
+from pathlib import Path
+from random import Random
+from secrets import token_hex
+from threading import Thread
+from time import sleep
+
+import uvicorn
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA256
+from fastapi import FastAPI, Request, Response
+from kink import di
+
+from bunq_ynab_connect.clients.bunq.base_client import BaseClient, BunqEnvironment
+from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.clients.cassette import Cassette
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
+
+USER_ID = 1
+SESSION_TIMEOUT_SECONDS = 3600
+PORT = 12010
+FIRST_PAYMENT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+LIMITS = {"GET": (1000, 1000.0), "POST": (1000, 1000.0)}
+
+
+def create_app(  # noqa: C901
+    accounts: int = 3,
+    payments_per_account: int = 500,
+    latency: float = 0.0,
+    throttle_rate: float = 0.0,
+    seed: int = 0,
+) -> FastAPI:
+    """Create the stand-in app, with synthetic accounts and payments.
+
+    Parameters
+    ----------
+        accounts: The amount of monetary accounts.
+        payments_per_account: The amount of payments per account.
+        latency: The seconds to wait before each response.
+        throttle_rate: The share of requests to answer with a 429.
+        seed: The seed of the random generator, for the payments and the 429s.
+
+    """
+    random = Random(seed)  # noqa: S311
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    state: dict = {"client_key": None, "installation_token": None, "sessions": set()}
+    notification_filters: list[dict] = []
+    monetary_accounts = [_account(USER_ID, i) for i in range(1, accounts + 1)]
+    payments = {
+        a["id"]: [_payment(a["id"], i, random) for i in range(payments_per_account)]
+        for a in monetary_accounts
+    }
+    app = FastAPI()
+
+    def respond(content: dict, status_code: int = 200) -> Response:
+        """Respond with the content, signed by the stand-in."""
+        body = json.dumps(content).encode()
+        signature = b64encode(key.sign(body, PKCS1v15(), SHA256())).decode()
+        return Response(
+            body,
+            status_code=status_code,
+            media_type="application/json",
+            headers={"X-Bunq-Server-Signature": signature},
+        )
+
+    def error(status_code: int, description: str) -> Response:
+        return respond({"Error": [{"error_description": description}]}, status_code)
+
+    @app.middleware("http")
+    async def emulate(
+        request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        """Normalize the path, delay, throttle, and check the token and signature."""
+        # Clients may join the base url and endpoint with a double slash
+        request.scope["path"] = re.sub("/+", "/", request.scope["path"])
+        if latency:
+            await asyncio.sleep(latency)
+        if random.random() < throttle_rate:
+            return error(429, "Too many requests. You can do a max of 3 calls per 3s")
+        endpoint = request.scope["path"].removeprefix("/v1/")
+        token = request.headers.get("X-Bunq-Client-Authentication")
+        if endpoint in ["device-server", "session-server"]:
+            if token is None or token != state["installation_token"]:
+                return error(401, "Insufficient authorisation")
+        elif endpoint != "installation" and token not in state["sessions"]:
+            return error(401, "Insufficient authorisation")
+        if request.method == "POST" and endpoint != "installation":
+            try:
+                state["client_key"].verify(
+                    b64decode(request.headers.get("X-Bunq-Client-Signature", "")),
+                    await request.body(),
+                    PKCS1v15(),
+                    SHA256(),
+                )
+            except InvalidSignature:
+                return error(400, "Request signature is invalid")
+        return await call_next(request)
+
+    @app.post("/v1/installation")
+    async def installation(request: Request) -> Response:
+        data = await request.json()
+        state["client_key"] = serialization.load_pem_public_key(
+            data["client_public_key"].encode()
+        )
+        state["installation_token"] = token_hex(32)
+        server_public_key = key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        return respond(
+            {
+                "Response": [
+                    {"Id": {"id": 1}},
+                    {"Token": {"token": state["installation_token"]}},
+                    {
+                        "ServerPublicKey": {
+                            "server_public_key": server_public_key.decode()
+                        }
+                    },
+                ]
+            }
+        )
+
+    @app.post("/v1/device-server")
+    async def device_server() -> Response:
+        return respond({"Response": [{"Id": {"id": 1}}]})
+
+    @app.post("/v1/session-server")
+    async def session_server() -> Response:
+        token = token_hex(32)
+        state["sessions"].add(token)
+        return respond(
+            {
+                "Response": [
+                    {"Id": {"id": len(state["sessions"])}},
+                    {"Token": {"token": token}},
+                    {
+                        "UserPerson": {
+                            "id": USER_ID,
+                            "display_name": "Stand-in",
+                            "session_timeout": SESSION_TIMEOUT_SECONDS,
+                        }
+                    },
+                ]
+            }
+        )
+
+    @app.get("/v1/user/{user_id}/monetary-account")
+    async def list_accounts(request: Request, user_id: int) -> Response:
+        if user_id != USER_ID:
+            return error(404, "User not found")
+        page, pagination = _paginate(monetary_accounts, request)
+        return respond(
+            {
+                "Response": [{"MonetaryAccountBank": a} for a in page],
+                "Pagination": pagination,
+            }
+        )
+
+    @app.get("/v1/user/{user_id}/monetary-account/{account_id}/payment")
+    async def list_payments(
+        request: Request, user_id: int, account_id: int
+    ) -> Response:
+        if user_id != USER_ID or account_id not in payments:
+            return error(404, "Monetary account not found")
+        page, pagination = _paginate(payments[account_id], request)
+        return respond(
+            {"Response": [{"Payment": p} for p in page], "Pagination": pagination}
+        )
+
+    @app.get("/v1/user/{user_id}/notification-filter-url")
+    async def get_notification_filters(user_id: int) -> Response:
+        if user_id != USER_ID:
+            return error(404, "User not found")
+        return respond(
+            {"Response": [{"NotificationFilterUrl": f} for f in notification_filters]}
+        )
+
+    @app.post("/v1/user/{user_id}/notification-filter-url")
+    async def set_notification_filters(request: Request, user_id: int) -> Response:
+        if user_id != USER_ID:
+            return error(404, "User not found")
+        data = await request.json()
+        notification_filters[:] = data["notification_filters"]
+        return respond({"Response": [{"Id": {"id": 1}}]})
+
+    return app
+
+
+def _paginate(items: list[dict], request: Request) -> tuple[list[dict], dict]:
+    """Select a page of items (sorted by id), newest first, like bunq.
+
+    Without newer_id, the newest count items before older_id are selected. With
+    newer_id, the oldest count items after it.
+    """
+    count = int(request.query_params.get("count", 10))
+    older_id = request.query_params.get("older_id")
+    newer_id = request.query_params.get("newer_id")
+    if newer_id is not None:
+        page = [x for x in items if x["id"] > int(newer_id)][:count]
+    else:
+        page = [x for x in items if older_id is None or x["id"] < int(older_id)]
+        page = page[-count:]
+    url = request.url.path
+    pagination = {"older_url": None, "newer_url": None, "future_url": None}
+    if page:
+        oldest, newest = page[0]["id"], page[-1]["id"]
+        if items[0]["id"] < oldest:
+            pagination["older_url"] = f"{url}?count={count}&older_id={oldest}"
+        if items[-1]["id"] > newest:
+            pagination["newer_url"] = f"{url}?count={count}&newer_id={newest}"
+        else:
+            pagination["future_url"] = f"{url}?count={count}&newer_id={newest}"
+    return page[::-1], pagination
+
+
+def _account(user_id: int, account_id: int) -> dict:
+    iban = f"NL00BUNQ{account_id:010d}"
+    return {
+        "id": account_id,
+        "user_id": user_id,
+        "alias": [{"type": "IBAN", "value": iban, "name": "Stand-in"}],
+        "avatar": None,
+        "balance": {"currency": "EUR", "value": "1000.00"},
+        "created": FIRST_PAYMENT.isoformat(),
+        "currency": "EUR",
+        "daily_limit": {"currency": "EUR", "value": "1000.00"},
+        "description": f"Account {account_id}",
+        "display_name": "Stand-in",
+        "monetary_account_profile": None,
+        "public_uuid": f"stand-in-{account_id}",
+        "setting": None,
+        "status": "ACTIVE",
+        "sub_status": "NONE",
+        "updated": FIRST_PAYMENT.isoformat(),
+    }
+
+
+def _payment(account_id: int, index: int, random: Random) -> dict:
+    """Create a payment. Ids and creation moments increase with the index."""
+    created = (FIRST_PAYMENT + timedelta(hours=index)).strftime("%Y-%m-%d %H:%M:%S.%f")
+    amount = f"{random.uniform(-200, 100):.2f}"
+    return {
+        "id": account_id * 1_000_000 + index,
+        "alias": {"iban": f"NL00BUNQ{account_id:010d}", "display_name": "Stand-in"},
+        "amount": {"currency": "EUR", "value": amount},
+        "attachment": [],
+        "balance_after_mutation": {"currency": "EUR", "value": "1000.00"},
+        "counterparty_alias": {"iban": "NL00SHOP0000000001", "display_name": "Shop"},
+        "created": created,
+        "description": f"Payment {index}",
+        "monetary_account_id": account_id,
+        "request_reference_split_the_bill": [],
+        "sub_type": "PAYMENT",
+        "type": "BUNQ",
+        "updated": created,
+    }
+
+
+class StandInBaseClient(BaseClient):
+    """BaseClient that sends its requests to the stand-in, over http."""
+
+    url: str
+
+    @property
+    def _base_url(self) -> str:
+        return self.url
+
+
+def free_port() -> int:
+    """Find a free port to serve the stand-in on."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def create_client(directory: Path, url: str) -> BunqClient:
+    """Create a BunqClient for the stand-in at the url, with a new bunq config.
+
+    The config in the directory only holds an API token, such that the client
+    creates its keys, installation and session with the stand-in. The rate limits
+    are raised, such that the client is not throttled by itself.
+    """
+    logger = di[LoggerAdapter]
+    bunq_config = JsonDict(logger=logger, path=directory / "bunq.cfg")
+    bunq_config.save({"api_token": "stand-in"})
+    base_client = StandInBaseClient(
+        environment=BunqEnvironment.SANDBOX,
+        signer=Signer(logger=logger, bunq_config=bunq_config),
+        bunq_config=bunq_config,
+        logger=logger,
+        bunq_rate_limiter=TokenBucketLimiter(limits=LIMITS),
+        bunq_cassette=Cassette(directory / "cassette.jsonl.gz"),
+    )
+    base_client.url = url
+    base_client.session.mount("http://", base_client.session.get_adapter("https://"))
+    return BunqClient(
+        storage=MemoryStorage(metadata=di[Metadata], logger=logger),
+        logger=logger,
+        base_client=base_client,
+        bunq_config=bunq_config,
+    )
+
+
+def serve_in_thread(app: FastAPI, port: int) -> uvicorn.Server:
+    """Serve the app in a background thread, and wait until it accepts requests.
+
+    Stop it by setting should_exit on the returned server.
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws="none")
+    )
+    thread = Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            msg = f"Could not start the bunq stand-in on port {port}"
+            raise RuntimeError(msg)
+        sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    uvicorn.run(create_app(), host="127.0.0.1", port=PORT)
@@ -8,24 +8,25 @@ from kink import di, inject
 from prefect.deployments import run_deployment
 from pydantic.error_wrappers import ValidationError
 
-from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.clients.async_bunq_client import AsyncBunqClient
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
 from bunq_ynab_connect.models.bunq_payment import BunqPayment
 
 
 @inject
-def ensure_callback_exists(bunq_callback: str, client: BunqClient) -> None:
+async def ensure_callback_exists(bunq_callback: str, client: AsyncBunqClient) -> None:
     url = f"https://{bunq_callback}/payment"
-    client.add_callback(url)
+    await client.add_callback(url)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator:  # noqa: ARG001
     """Ensure the callback url is registered in Bunq, before the server starts."""
-    ensure_callback_exists()
+    await ensure_callback_exists()
     logger = di[LoggerAdapter]
     logger.info("Started callback server.")
     yield
+    await di[AsyncBunqClient].aclose()
 
 
 @inject
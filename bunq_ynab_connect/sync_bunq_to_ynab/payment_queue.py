@@ -34,50 +34,84 @@ class PaymentQueue:
         self.logger = logger
         self.storage = storage
 
-    def get_payment_id(self) -> str:
+    def get_payment_id(self) -> int:
         """Get the payment id of the first non-synced payment in the queue.
 
         Order is determined by the updated_at column (first in, first out)
         """
         payment = self.storage.find_one(
-            self.TABLE_NAME, {("synced_at", "eq", None)}, "updated_at"
+            self.TABLE_NAME, [("synced_at", "eq", None)], ["updated_at"]
         )
         if payment is None:
             msg = "No payments in queue"
             raise IndexError(msg)
         return payment["payment_id"]
 
-    def mark_synced(self, payment_id: str) -> None:
-        """Mark a payment as synced."""
-        data = {
-            "payment_id": payment_id,
-            "synced_at": now(),
-        }
-        self.storage.upsert(self.TABLE_NAME, [data])
+    def get_payment_ids(self, limit: int | None = None) -> list[int]:
+        """Get the payment ids of the non-synced payments in the queue.
+
+        Order is determined by the updated_at column (first in, first out)
+        """
+        payments = self.storage.find(
+            self.TABLE_NAME,
+            [("synced_at", "eq", None)],
+            ["updated_at"],
+            projection=["payment_id"],
+            limit=limit,
+        )
+        return [payment["payment_id"] for payment in payments]
 
-    def synced_at(self, payment_id: str) -> datetime | None:
+    def mark_synced(self, payment_id: int) -> None:
+        """Mark a payment as synced."""
+        self.mark_many_synced([payment_id])
+
+    def mark_many_synced(self, payment_ids: list[int]) -> None:
+        """Mark payments as synced, with a single write."""
+        if not payment_ids:
+            return
+        synced_at = now()
+        data = [
+            {
+                "payment_id": payment_id,
+                "synced_at": synced_at,
+            }
+            for payment_id in payment_ids
+        ]
+        self.storage.upsert(self.TABLE_NAME, data)
+
+    def synced_at(self, payment_id: int) -> datetime | None:
         item = self.storage.find_one(
             self.TABLE_NAME, {("payment_id", "eq", payment_id)}
         )
         return None if not item else item["synced_at"]
 
-    def is_yet_synced(self, payment_id: str) -> bool:
+    def is_yet_synced(self, payment_id: int) -> bool:
         return self.synced_at(payment_id) is not None
 
     def __bool__(self) -> bool:
         """To support the usage of the queue in a while loop."""
         return self.storage.count(self.TABLE_NAME, {("synced_at", "eq", None)}) > 0
 
-    def add(self, payment_id: str) -> None:
+    def add(self, payment_id: int) -> None:
         """Add a payment to the queue (if it doesn't already exist)."""
-        data = {
-            "payment_id": payment_id,
-            "synced_at": None,
-        }
-        self.storage.insert_if_not_exists(self.TABLE_NAME, [data])
+        self.add_many([payment_id])
+
+    def add_many(self, payment_ids: list[int]) -> None:
+        """Add payments to the queue (if they don't already exist).
+
+        Existence is checked for all payments at once, instead of one by one.
+        """
+        data = [
+            {
+                "payment_id": payment_id,
+                "synced_at": None,
+            }
+            for payment_id in payment_ids
+        ]
+        self.storage.insert_if_not_exists(self.TABLE_NAME, data)
 
     @contextmanager
-    def pop(self) -> Generator[str, None, None]:
+    def pop(self) -> Generator[int, None, None]:
         """Pop a payment from the queue.
 
         The payment is removed from the queue when the context is exited cleanly.
@@ -1,4 +1,5 @@
 import os
+from collections import defaultdict
 from datetime import datetime
 from logging import LoggerAdapter
 
@@ -16,6 +17,7 @@ from bunq_ynab_connect.data.bunq_account_to_ynab_account_mapper import (
     BunqAccountToYnabAccountMapper,
 )
 from bunq_ynab_connect.data.storage.abstract_storage import AbstractStorage
+from bunq_ynab_connect.helpers.general import chunk
 from bunq_ynab_connect.models.bunq_account import BunqAccount
 from bunq_ynab_connect.models.bunq_payment import BunqPayment
 from bunq_ynab_connect.models.ynab_account import YnabAccount
@@ -32,7 +34,8 @@ class Prediction(BaseModel):
 class PaymentSyncer:
     """Class that syncs payments from Bunq to Ynab.
 
-    Loops over the payment queue and syncs payments one by one.
+    Loops over the payment queue and syncs payments one by one. In batched mode, the
+    transactions are created with one request per chunk of payments of a budget.
 
     Attributes
     ----------
@@ -44,11 +47,17 @@ class PaymentSyncer:
         account_map: A map from Bunq account id to YNAB account.
         prediction_base_url: The url ofr the MLServerm odle to use to predict categories
             contains var "budget_id" to be replaced with the budget id.
+        BATCH_SIZE: The amount of transactions to create with one request, in batched
+            mode. Also the amount of payments to load from the storage at once.
+        IMPORT_ID_PREFIX: Prefix of the import id of a transaction in batched mode,
+            followed by the payment id. Maps the response of YNAB to the payments.
 
     """
 
     FLAG_COLOR = "blue"
     CLEARING_STATUS = "uncleared"
+    BATCH_SIZE = 100
+    IMPORT_ID_PREFIX = "BUNQ:"
 
     logger: LoggerAdapter
     storage: AbstractStorage
@@ -249,6 +258,111 @@ class PaymentSyncer:
             counter += 1
         self.logger.info("Synced %s payments", counter)
 
+    def sync_batched(self) -> None:
+        """Sync all payments in the queue, with one request per chunk of transactions.
+
+        - Load the queued payments, BATCH_SIZE at a time
+        - Keep the payments that are not stored (yet) in the queue, eg when an
+            extract is running, and log them once.
+        - Skip the payments without YNAB account, or that fail the sanity check.
+            Like in sync, these are removed from the queue.
+        - Group the transactions by budget, and create them in chunks of BATCH_SIZE
+        - Mark the payments synced that YNAB created, or refused as duplicate since
+            their import id already exists. The others stay in the queue.
+
+        YNAB limits the amount of requests per hour, not the amount of transactions.
+        """
+        transactions = defaultdict(list)
+        skipped = []
+        missing = []
+        for payment_ids in chunk(self.queue.get_payment_ids(), self.BATCH_SIZE):
+            rows = self.storage.find("bunq_payments", [("id", "in", payment_ids)])
+            payments = {
+                payment.id: payment
+                for payment in self.storage.rows_to_entities(rows, BunqPayment)
+            }
+            for payment_id in payment_ids:
+                if payment_id not in payments:
+                    missing.append(payment_id)
+                    continue
+                payment = payments[payment_id]
+                account_id = payment.monetary_account_id
+                if account_id not in self.account_map:
+                    self.logger.warning(
+                        "Could not find YNAB account for Bunq account %s, not syncing payment %s",  # noqa: E501
+                        account_id,
+                        payment_id,
+                    )
+                    skipped.append(payment_id)
+                    continue
+                ynab_account: YnabAccount = self.account_map[account_id]
+                transaction = self.payment_to_transaction(payment, ynab_account)
+                if not self.sanity_check_payment(payment):
+                    skipped.append(payment_id)
+                    continue
+                transaction.import_id = f"{self.IMPORT_ID_PREFIX}{payment_id}"
+                transactions[ynab_account.budget_id].append((payment_id, transaction))
+        self.queue.mark_many_synced(skipped)
+        if missing:
+            self.logger.warning(
+                "Could not find %s queued payments, keeping them queued: %s",
+                len(missing),
+                missing,
+            )
+
+        counter = 0
+        for budget_id, budget_transactions in transactions.items():
+            for transactions_chunk in chunk(budget_transactions, self.BATCH_SIZE):
+                counter += self.create_transactions(transactions_chunk, budget_id)
+        self.logger.info(
+            "Synced %s payments, skipped %s payments", counter, len(skipped)
+        )
+
+    def create_transactions(
+        self, transactions: list[tuple[int, NewTransaction]], budget_id: str
+    ) -> int:
+        """Create transactions in YNAB with one request, and mark their payments synced.
+
+        Only the payments whose import id YNAB returned are marked synced. If the
+        request fails, all payments stay in the queue.
+
+        Parameters
+        ----------
+            transactions: The payment id and the transaction to create, per payment
+            budget_id: The YNAB budget to which all transactions belong
+
+        Returns
+        -------
+            The amount of payments marked synced
+
+        """
+        try:
+            result = self.client.create_transactions(
+                [transaction for _, transaction in transactions], budget_id
+            )
+        except OSError:
+            # Logged by the client. The payments are retried with the next sync
+            return 0
+        created = {t.import_id for t in result.transactions or []}
+        duplicates = set(result.duplicate_import_ids or [])
+        if duplicates:
+            self.logger.info(
+                "YNAB already has %s transactions of budget %s",
+                len(duplicates),
+                budget_id,
+            )
+        accepted = created | duplicates
+        synced = []
+        for payment_id, transaction in transactions:
+            if transaction.import_id in accepted:
+                synced.append(payment_id)
+            else:
+                self.logger.warning(
+                    "YNAB did not create the transaction of payment %s", payment_id
+                )
+        self.queue.mark_many_synced(synced)
+        return len(synced)
+
     def sync_account(
         self,
         iban: str,
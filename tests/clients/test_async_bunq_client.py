@@ -0,0 +1,109 @@
+import asyncio
+import json
+from logging import LoggerAdapter
+from pathlib import Path
+from unittest.mock import Mock
+
+import httpx
+from kink import di
+
+from bunq_ynab_connect.clients.async_bunq_client import AsyncBunqClient
+from bunq_ynab_connect.clients.bunq.async_base_client import AsyncBaseClient
+from bunq_ynab_connect.clients.bunq.base_client import BaseClient, BunqEnvironment
+from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.clients.cassette import Cassette
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
+from bunq_ynab_connect.models.bunq_account import BunqAccount
+
+
+def _response(status_code: int, body: dict | None = None) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        headers={"X-Bunq-Server-Signature": "signature", "Retry-After": "0"},
+        content=json.dumps(body or {}).encode(),
+    )
+
+
+def _base_client(tmp_path: Path, handler: object) -> AsyncBaseClient:
+    """Create an AsyncBaseClient that sends its requests to the handler."""
+    base_client = BaseClient(
+        environment=BunqEnvironment.SANDBOX,
+        signer=Mock(spec=Signer),
+        bunq_config=Mock(spec=JsonDict),
+        logger=di[LoggerAdapter],
+        bunq_rate_limiter=TokenBucketLimiter(limits={"GET": (100, 100.0)}),
+        bunq_cassette=Cassette(tmp_path / "cassette.jsonl.gz"),
+    )
+    base_client._default_headers = Mock(return_value={})  # noqa: SLF001
+    client = AsyncBaseClient(base_client=base_client, logger=di[LoggerAdapter])
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_iter_pages_streams_pages_and_retries_429(tmp_path: Path) -> None:
+    """Test that pages are yielded one by one, and a throttled page is retried."""
+    # Arrange
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if len(requests) == 2:  # noqa: PLR2004
+            return _response(429)
+        if request.url.path.endswith("/older"):
+            return _response(200, {"Response": [3]})
+        return _response(
+            200, {"Response": [1, 2], "Pagination": {"older_url": "older"}}
+        )
+
+    client = _base_client(tmp_path, handler)
+
+    async def collect() -> list[list]:
+        return [page async for page in client.iter_pages(endpoint="payment")]
+
+    # Act
+    pages = asyncio.run(collect())
+
+    # Assert
+    assert pages == [[1, 2], [3]]
+    assert len(requests) == 3  # noqa: PLR2004
+    assert client.base_client.rate_limiter.stats()["retries"] == 1
+
+
+def test_payments_are_loaded_concurrently_with_cap(tmp_path: Path) -> None:
+    """Test that accounts load concurrently, up to the cap, and failures are skipped."""
+    # Arrange
+    in_flight = []
+    max_in_flight = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight.append(request)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.remove(request)
+        account_id = int(request.url.path.split("/")[-2])
+        if account_id == 1:
+            return _response(500)
+        return _response(200, {"Response": [{"Payment": {"id": account_id * 10}}]})
+
+    bunq_client = Mock(spec=BunqClient)
+    bunq_client.user_id = 1
+    client = AsyncBunqClient(
+        logger=di[LoggerAdapter],
+        base_client=_base_client(tmp_path, handler),
+        bunq_client=bunq_client,
+    )
+    client.base_client.RETRY_BACKOFF = 0
+    bunq_accounts = [
+        BunqAccount(**{**dict.fromkeys(BunqAccount.model_fields), "id": i})
+        for i in range(6)
+    ]
+
+    # Act
+    payments = asyncio.run(client.get_payments_for_accounts(bunq_accounts))
+
+    # Assert
+    assert max(max_in_flight) == client.MAX_CONCURRENT_ACCOUNTS
+    assert sorted(payments) == [0, 2, 3, 4, 5]
+    assert payments[2] == [{"id": 20}]
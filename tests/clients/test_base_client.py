@@ -0,0 +1,127 @@
+import gzip
+import json
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import LoggerAdapter
+from pathlib import Path
+from threading import Thread
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.clients.bunq.base_client import BaseClient, BunqEnvironment
+from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.clients.cassette import Cassette, CassetteMode
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Answers each GET with an empty JSON object, and keeps the connection open."""
+
+    protocol_version = "HTTP/1.1"
+
+    throttled = 0
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.startswith("/throttled") and KeepAliveHandler.throttled < 2:  # noqa: PLR2004
+            KeepAliveHandler.throttled += 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    """Run a local HTTP server, and return its url."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connections(server_url: str) -> None:
+    """Test that consecutive requests reuse one kept-alive connection."""
+    # Arrange
+    client = BaseClient(
+        environment=BunqEnvironment.SANDBOX,
+        signer=Mock(spec=Signer),
+        bunq_config=Mock(spec=JsonDict),
+        logger=di[LoggerAdapter],
+        bunq_rate_limiter=Mock(spec=TokenBucketLimiter),
+        bunq_cassette=Mock(spec=Cassette),
+    )
+    client.session.mount("http://", client.session.get_adapter("https://"))
+
+    # Act
+    for _ in range(3):
+        client.session.get(server_url, timeout=5).raise_for_status()
+
+    # Assert
+    assert client.connection_stats() == {"requests": 3, "connections": 1, "reused": 2}
+
+
+def test_throttled_request_is_retried(server_url: str) -> None:
+    """Test that a 429 is retried after backoff, and counted by the rate limiter."""
+    # Arrange
+    KeepAliveHandler.throttled = 0
+    client = BaseClient(
+        environment=BunqEnvironment.SANDBOX,
+        signer=Mock(spec=Signer),
+        bunq_config=Mock(spec=JsonDict),
+        logger=di[LoggerAdapter],
+        bunq_rate_limiter=TokenBucketLimiter(limits={"GET": (5, 5.0)}),
+        bunq_cassette=Mock(spec=Cassette),
+    )
+    client.session.mount("http://", client.session.get_adapter("https://"))
+
+    # Act
+    response = client._send("GET", "payment", f"{server_url}/throttled")  # noqa: SLF001
+
+    # Assert
+    assert response.status_code == 200  # noqa: PLR2004
+    stats = client.rate_limiter.stats()
+    assert stats["retries"] == 2  # noqa: PLR2004
+    # The backoff emptied the bucket, hence the retries waited for a refill
+    assert stats["throttled_seconds"] > 0
+
+
+def test_authentication_responses_are_not_recorded(tmp_path: Path) -> None:
+    """Test that the cassette records a POST, but not the tokens of a session."""
+    # Arrange
+    path = tmp_path / "bunq.jsonl.gz"
+    client = BaseClient(
+        environment=BunqEnvironment.SANDBOX,
+        signer=Mock(spec=Signer),
+        bunq_config=Mock(spec=JsonDict),
+        logger=di[LoggerAdapter],
+        bunq_rate_limiter=Mock(spec=TokenBucketLimiter),
+        bunq_cassette=Cassette(path, CassetteMode.RECORD),
+    )
+    client._default_headers = Mock(return_value={})  # noqa: SLF001
+    client._send = Mock(  # noqa: SLF001
+        return_value=Mock(text="", headers={"X-Bunq-Server-Signature": ""})
+    )
+    client._send.return_value.json.return_value = {"Response": [{"Token": {}}]}  # noqa: SLF001
+
+    # Act
+    client.post(endpoint="session-server", data={"secret": "api-token"})
+    client.post(endpoint="installation")
+    client.post(endpoint="user/{user_id}/payment", user_id=1)
+
+    # Assert
+    with gzip.open(path, "rt") as f:
+        keys = [json.loads(line)["key"] for line in f]
+    assert keys == [f"POST {client._base_url}/user/1/payment"]  # noqa: SLF001
@@ -0,0 +1,52 @@
+from collections.abc import Iterator
+from datetime import timedelta
+
+import pytest
+
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.models.bunq_account import BunqAccount
+from bunq_ynab_connect.scripts.bunq_stand_in import (
+    FIRST_PAYMENT,
+    create_app,
+    create_client,
+    free_port,
+    serve_in_thread,
+)
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory: pytest.TempPathFactory) -> Iterator[BunqClient]:
+    """Serve a stand-in with two accounts, and return a BunqClient for it."""
+    port = free_port()
+    server = serve_in_thread(create_app(accounts=2, payments_per_account=250), port)
+    yield create_client(tmp_path_factory.mktemp("bunq"), f"http://127.0.0.1:{port}/v1")
+    server.should_exit = True
+
+
+def test_client_loads_signed_pages(client: BunqClient) -> None:
+    """Test that the client authenticates, and verifies and pages the responses."""
+    # Arrange
+    accounts = [BunqAccount(**a) for a in client.get_accounts()]
+
+    # Act
+    payments = client.get_payments_for_account(accounts[0])
+    newer = client.get_payments_for_account(accounts[0], newer_id=payments[10]["id"])
+    recent = client.get_payments_for_account(
+        accounts[0], last_runmoment=FIRST_PAYMENT + timedelta(hours=200)
+    )
+
+    # Assert
+    assert sorted(a.id for a in accounts) == [1, 2]
+    assert len(payments) == 250  # noqa: PLR2004
+    assert payments[0]["id"] > payments[-1]["id"]
+    assert sorted(p["id"] for p in newer) == sorted(p["id"] for p in payments[:10])
+    assert len(recent) == 49  # noqa: PLR2004
+
+
+def test_client_adds_callback(client: BunqClient) -> None:
+    """Test that a signed POST is accepted, and the callback is stored."""
+    # Act
+    client.add_callback("https://example.com/payment")
+
+    # Assert
+    assert client._callback_exists("https://example.com/payment")  # noqa: SLF001
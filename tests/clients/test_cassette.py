@@ -0,0 +1,106 @@
+import json
+from logging import LoggerAdapter
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+from ynab import ApiClient
+from ynab.rest import RESTResponse
+
+from bunq_ynab_connect.clients.cassette import Cassette, CassetteMode
+from bunq_ynab_connect.clients.ynab_client import YnabClient
+from bunq_ynab_connect.helpers.rate_limiter import RateLimiter
+
+
+def test_replay_serves_recorded_responses_in_order(tmp_path: Path) -> None:
+    """Test that responses are replayed per key in order, repeating the last one."""
+    # Arrange
+    path = tmp_path / "api.jsonl.gz"
+    recorder = Cassette(path, CassetteMode.RECORD)
+    for page in [1, 2]:
+        recorder.play("GET /payments", lambda page=page: {"page": page})
+    recorder.play("GET /accounts", lambda: {"accounts": []})
+    request = Mock()
+
+    # Act
+    player = Cassette(path, CassetteMode.REPLAY)
+    responses = [player.play("GET /payments", request) for _ in range(3)]
+
+    # Assert
+    assert responses == [{"page": 1}, {"page": 2}, {"page": 2}]
+    assert player.play("GET /accounts", request) == {"accounts": []}
+    request.assert_not_called()
+    with pytest.raises(LookupError):
+        player.play("GET /budgets", request)
+
+
+def test_recording_is_only_readable_by_its_owner(tmp_path: Path) -> None:
+    """Test that a recording, which holds financial data, is created with 0600."""
+    # Arrange
+    path = tmp_path / "api.jsonl.gz"
+
+    # Act
+    Cassette(path, CassetteMode.RECORD).play("GET /payments", lambda: {"page": 1})
+
+    # Assert
+    assert path.stat().st_mode & 0o777 == Cassette.FILE_MODE
+
+
+def test_ynab_client_replays_without_token(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the YNAB SDK deserializes a replayed response like a sent one."""
+    # Arrange
+    monkeypatch.delenv("YNAB_TOKEN", raising=False)
+    path = tmp_path / "ynab.jsonl.gz"
+    body = {"data": {"budgets": [{"id": "budget", "name": "Budget"}]}}
+    Cassette(path, CassetteMode.RECORD).play(
+        "GET https://api.ynab.com/v1/budgets",
+        lambda: {
+            "status": 200,
+            "reason": "OK",
+            "headers": {"content-type": "application/json; charset=utf-8"},
+            "data": json.dumps(body),
+        },
+    )
+    rate_limiter = Mock(spec=RateLimiter)
+    client = YnabClient(
+        logger=di[LoggerAdapter],
+        ynab_rate_limiter=rate_limiter,
+        ynab_cassette=Cassette(path, CassetteMode.REPLAY),
+    )
+
+    # Act
+    budgets = client.get_budgets()
+
+    # Assert
+    assert [budget.id for budget in budgets] == ["budget"]
+    rate_limiter.acquire.assert_not_called()
+
+
+def test_ynab_client_acquires_rate_limit_per_sent_request(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a request that is sent, rather than replayed, is rate limited once."""
+    # Arrange
+    monkeypatch.setenv("YNAB_TOKEN", "token")
+    body = {"data": {"budgets": [{"id": "budget", "name": "Budget"}]}}
+    response = Mock(status=200, reason="OK", data=json.dumps(body).encode())
+    response.headers = {"content-type": "application/json; charset=utf-8"}
+    send = Mock(return_value=RESTResponse(response))
+    monkeypatch.setattr(ApiClient, "call_api", send)
+    rate_limiter = Mock(spec=RateLimiter)
+    client = YnabClient(
+        logger=di[LoggerAdapter],
+        ynab_rate_limiter=rate_limiter,
+        ynab_cassette=Cassette(Path("unused.jsonl.gz"), CassetteMode.OFF),
+    )
+
+    # Act
+    budgets = client.get_budgets()
+
+    # Assert
+    assert [budget.id for budget in budgets] == ["budget"]
+    send.assert_called_once()
+    rate_limiter.acquire.assert_called_once_with()
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from logging import LoggerAdapter
+from pathlib import Path
+from time import sleep
+from unittest.mock import Mock
+
+from kink import di
+
+from bunq_ynab_connect.clients.bunq.base_client import BaseClient
+from bunq_ynab_connect.clients.bunq.session_activator import SessionActivator
+from bunq_ynab_connect.helpers.general import now
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+
+RENEWED = "new"
+SESSION_RESPONSE = {
+    "Response": [
+        {},
+        {"Token": {"token": RENEWED}},
+        {"UserPerson": {"id": 1, "session_timeout": 3600}},
+    ]
+}
+
+
+def _create_config(path: Path, expires_in: timedelta) -> None:
+    JsonDict(logger=di[LoggerAdapter], path=path).save(
+        {
+            "api_token": "token",
+            "installation_context": {"device_id": 1, "token": "installation"},
+            "session_context": {
+                "token": "old",
+                "expires_at": (now() + expires_in).isoformat(),
+            },
+        }
+    )
+
+
+def _activator(path: Path, bunq_client: Mock) -> SessionActivator:
+    return SessionActivator(
+        bunq_client=bunq_client,
+        bunq_config=JsonDict(logger=di[LoggerAdapter], path=path),
+        logger=di[LoggerAdapter],
+    )
+
+
+def test_expired_session_is_renewed_once(tmp_path: Path) -> None:
+    """Test that concurrent requests, also with their own config, renew once."""
+    # Arrange
+    path = tmp_path / "bunq.cfg"
+    _create_config(path, timedelta(seconds=-1))
+    bunq_client = Mock(spec=BaseClient)
+
+    def post(**_: object) -> dict:
+        sleep(0.1)
+        return SESSION_RESPONSE
+
+    bunq_client.post.side_effect = post
+    activators = [_activator(path, bunq_client) for _ in range(4)]
+
+    # Act
+    with ThreadPoolExecutor(len(activators) * 2) as executor:
+        tokens = list(
+            executor.map(
+                lambda a: (a.ensure_session_active(), a.session_token)[1],
+                activators * 2,
+            )
+        )
+
+    # Assert
+    assert bunq_client.post.call_count == 1
+    assert tokens == [RENEWED] * len(activators) * 2
+
+
+def test_refresher_renews_session_before_expiry(tmp_path: Path) -> None:
+    """Test that the refresher renews a session that expires within its margin."""
+    # Arrange
+    path = tmp_path / "bunq.cfg"
+    _create_config(path, timedelta(seconds=SessionActivator.REFRESH_MARGIN_SECONDS / 2))
+    bunq_client = Mock(spec=BaseClient)
+    bunq_client.post.return_value = SESSION_RESPONSE
+    activator = _activator(path, bunq_client)
+
+    # Act
+    activator.start_refresher()
+    for _ in range(50):
+        if activator.session_token == RENEWED:
+            break
+        sleep(0.02)
+    activator.stop_refresher()
+
+    # Assert
+    assert activator.session_token == RENEWED
+    assert bunq_client.post.call_count == 1
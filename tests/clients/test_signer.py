@@ -0,0 +1,86 @@
+import json
+from base64 import b64encode
+from logging import LoggerAdapter
+from pathlib import Path
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.padding import PKCS1v15
+from cryptography.hazmat.primitives.hashes import SHA256
+from kink import di
+
+from bunq_ynab_connect.clients.bunq import signer as signer_module
+from bunq_ynab_connect.clients.bunq.signer import Signer
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+
+
+def _write_config(path: Path) -> rsa.RSAPrivateKey:
+    """Write a config with a new key pair, as both client and server key."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    public_pem = key.public_key().public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    JsonDict(logger=di[LoggerAdapter], path=path).save(
+        {
+            "installation_context": {
+                "private_key_client": private_pem.decode(),
+                "public_key_server": public_pem.decode(),
+            }
+        }
+    )
+    return key
+
+
+def test_keys_are_parsed_once(tmp_path: Path) -> None:
+    """Test that signing and verifying reuse the keys, until the config changes."""
+    # Arrange
+    path = tmp_path / "bunq.cfg"
+    _write_config(path)
+    signer = Signer(
+        logger=di[LoggerAdapter],
+        bunq_config=JsonDict(logger=di[LoggerAdapter], path=path),
+    )
+    load = patch.object(
+        signer_module.serialization,
+        "load_pem_private_key",
+        wraps=serialization.load_pem_private_key,
+    )
+
+    # Act
+    with load as load_pem_private_key:
+        for _ in range(3):
+            signer.sign({"secret": "value"})
+        new_key = _write_config(path)
+        signature = signer.sign({"secret": "value"})
+
+    # Assert
+    assert load_pem_private_key.call_count == 2  # noqa: PLR2004
+    data = json.dumps({"secret": "value"}).encode()
+    expected = b64encode(new_key.sign(data, PKCS1v15(), SHA256()))
+    assert signature == expected
+    assert signer.verify(data.decode(), signature.decode())
+
+
+def test_invalidate_drops_keys_of_cleared_config(tmp_path: Path) -> None:
+    """Test that old keys are not used after the installation context is cleared."""
+    # Arrange
+    path = tmp_path / "bunq.cfg"
+    _write_config(path)
+    config = JsonDict(logger=di[LoggerAdapter], path=path)
+    signer = Signer(logger=di[LoggerAdapter], bunq_config=config)
+    signer.sign({"secret": "value"})
+
+    # Act
+    config.save({"installation_context": {}})
+    signer.invalidate()
+
+    # Assert
+    assert signer._server_public_key is None  # noqa: SLF001
+    assert signer.verify("data", "not a signature")
@@ -0,0 +1,43 @@
+from logging import LoggerAdapter
+from unittest.mock import Mock
+
+import mongomock
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
+from bunq_ynab_connect.data.table_metadata import TableMetadata
+
+
+@pytest.fixture
+def mongo(monkeypatch) -> mongomock.MongoClient:  # noqa: ANN001
+    """Return a mongomock client.
+
+    Newer pymongo versions pass a sort argument to bulk updates, which mongomock does
+    not accept yet. Drop it, such that bulk_write can be tested.
+    """
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+    monkeypatch.setattr(
+        mongomock.collection.BulkOperationBuilder,
+        "add_update",
+        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs),  # noqa: ARG005
+    )
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def metadata() -> Metadata:
+    """Return a mock metadata object."""
+    return Mock(spec=Metadata)
+
+
+@pytest.fixture
+def mongo_storage(monkeypatch, mongo, metadata) -> MongoStorage:  # noqa: ANN001
+    """Return a MongoStorage object."""
+    monkeypatch.setattr(MongoStorage, "set_indexes", Mock())
+    storage = MongoStorage(mongo, mongo["test_database"], metadata, di[LoggerAdapter])
+    storage.metadata.get_table.return_value = TableMetadata(
+        name="test_table", key_col="key", timestamp_col="timestamp", type="test_table"
+    )
+    return storage
@@ -0,0 +1,97 @@
+from collections.abc import Iterator
+from logging import LoggerAdapter
+from time import sleep
+from unittest.mock import Mock
+
+from kink import di
+
+from bunq_ynab_connect.data.data_extractors.abstract_extractor import AbstractExtractor
+from bunq_ynab_connect.data.data_extractors.checkpoint import Checkpoint
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.data.table_metadata import TableMetadata
+
+
+class AccountExtractor(AbstractExtractor):
+    """Loads two rows per account. Loading the account 'broken' fails."""
+
+    def load(self) -> list[dict]:
+        return self.load_concurrently(["slow", "broken", "fast"], self._load_account)
+
+    def _load_account(self, account: str) -> list[dict]:
+        if account == "broken":
+            msg = "API down"
+            raise OSError(msg)
+        if account == "slow":
+            sleep(0.05)
+        return [{"id": f"{account}_{i}", "account": account} for i in range(2)]
+
+
+class PagedExtractor(AbstractExtractor):
+    """Yields three rows, then a checkpoint, then two more rows."""
+
+    PAGE_SIZE = 2
+
+    def load(self) -> Iterator[dict | Checkpoint]:
+        yield from ({"id": i} for i in range(3))
+        yield Checkpoint("first", self._save)
+        yield from ({"id": i} for i in range(3, 5))
+
+    def _save(self) -> None:
+        self.saved_count = self.storage.count(self.destination)
+
+
+def _storage() -> MemoryStorage:
+    metadata = Mock()
+    metadata.get_table.side_effect = lambda name: TableMetadata(
+        name=name,
+        key_col="source" if name == "runmoments" else "id",
+        timestamp_col="",
+        type=name,
+    )
+    return MemoryStorage(metadata=metadata, logger=di[LoggerAdapter])
+
+
+def test_load_concurrently_keeps_order_and_isolates_errors() -> None:
+    """Test that results follow the order of the items, and errors skip an item."""
+    # Arrange
+    storage = _storage()
+    extractor = AccountExtractor("payments", storage=storage, logger=di[LoggerAdapter])
+    extractor.is_complete = True
+
+    # Act
+    rows = extractor.load()
+
+    # Assert
+    assert [row["id"] for row in rows] == ["slow_0", "slow_1", "fast_0", "fast_1"]
+    assert not extractor.is_complete
+
+
+def test_incomplete_extract_keeps_runmoment() -> None:
+    """Test that the loaded rows are stored, but the runmoment is not updated."""
+    # Arrange
+    storage = _storage()
+    extractor = AccountExtractor("payments", storage=storage, logger=di[LoggerAdapter])
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    assert storage.count("payments") == 4  # noqa: PLR2004
+    assert storage.find("runmoments") == []
+
+
+def test_extract_upserts_pages_before_checkpoints() -> None:
+    """Test that rows are upserted per page, and before a checkpoint is saved."""
+    # Arrange
+    storage = _storage()
+    storage.upsert = Mock(wraps=storage.upsert)
+    extractor = PagedExtractor("rows", storage=storage, logger=di[LoggerAdapter])
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    assert extractor.saved_count == 3  # noqa: PLR2004
+    assert storage.count("rows") == 5  # noqa: PLR2004
+    pages = [c.args[1] for c in storage.upsert.call_args_list if c.args[0] == "rows"]
+    assert [len(page) for page in pages] == [2, 1, 2, 0]
@@ -0,0 +1,113 @@
+from collections.abc import Iterator
+from logging import LoggerAdapter
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.clients.bunq_client import BunqClient
+from bunq_ynab_connect.data.data_extractors.bunq_payment_extractor import (
+    BunqPaymentExtractor,
+)
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.models.bunq_account import BunqAccount
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
+
+
+@pytest.fixture
+def storage() -> MemoryStorage:
+    """Return a MemoryStorage with one account."""
+    storage = MemoryStorage(metadata=Metadata(), logger=di[LoggerAdapter])
+    account = dict.fromkeys(BunqAccount.model_fields)
+    account.update(id=1)
+    storage.insert("bunq_accounts", [account])
+    return storage
+
+
+def _extractor(storage: MemoryStorage, pages: list[list[dict]]) -> BunqPaymentExtractor:
+    client = Mock(spec=BunqClient)
+    client.iter_payment_pages_for_account.return_value = iter(pages)
+    return BunqPaymentExtractor(
+        storage=storage,
+        logger=di[LoggerAdapter],
+        client=client,
+        payment_queue=Mock(spec=PaymentQueue),
+    )
+
+
+def test_first_run_stores_newest_payment_as_cursor(storage: MemoryStorage) -> None:
+    """Test that an account without cursor is loaded and gets the newest id."""
+    # Arrange
+    extractor = _extractor(storage, [[{"id": 12}, {"id": 11}], [{"id": 10}]])
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    call = extractor.client.iter_payment_pages_for_account.call_args
+    assert call.kwargs["newer_id"] is None
+    assert storage.count("bunq_payments") == 3  # noqa: PLR2004
+    assert storage.get_cursor("bunq_payments", account=1) == 12  # noqa: PLR2004
+
+
+def test_next_run_loads_after_cursor(storage: MemoryStorage) -> None:
+    """Test that an account with cursor only loads newer payments, per page."""
+    # Arrange
+    storage.set_cursor("bunq_payments", 12, account=1)
+    extractor = _extractor(storage, [[{"id": 14}, {"id": 13}], [{"id": 15}]])
+    storage.set_cursor = Mock(wraps=storage.set_cursor)
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    call = extractor.client.iter_payment_pages_for_account.call_args
+    assert call.kwargs["newer_id"] == 12  # noqa: PLR2004
+    assert [c.args[1] for c in storage.set_cursor.call_args_list] == [14, 15]
+    assert storage.get_cursor("bunq_payments", account=1) == 15  # noqa: PLR2004
+
+
+def test_failed_account_keeps_its_watermark(storage: MemoryStorage) -> None:
+    """Test that the other accounts advance, if loading one account fails."""
+    # Arrange
+    account = dict.fromkeys(BunqAccount.model_fields)
+    account.update(id=2)
+    storage.insert("bunq_accounts", [account])
+    extractor = _extractor(storage, [])
+
+    def iter_pages(account: BunqAccount, *_: Any, **__: Any) -> Iterator[list]:
+        if account.id == 2:  # noqa: PLR2004
+            msg = "API down"
+            raise OSError(msg)
+        yield [{"id": 10}]
+
+    extractor.client.iter_payment_pages_for_account.side_effect = iter_pages
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    assert storage.get_last_runmoment("bunq_payments", account=1) == extractor.runmoment
+    assert storage.get_last_runmoment("bunq_payments", account=2) == (
+        storage.RUNMOMENT_START
+    )
+    assert storage.get_last_runmoment("bunq_payments") == storage.RUNMOMENT_START
+
+
+def test_payments_are_queued_after_they_are_stored(storage: MemoryStorage) -> None:
+    """Test that a page is only queued once its payments are stored."""
+    # Arrange
+    extractor = _extractor(storage, [[{"id": 12}, {"id": 11}]])
+    stored_when_queued = []
+    extractor.payment_queue.add_many.side_effect = lambda ids: (
+        stored_when_queued.append(storage.count("bunq_payments", [("id", "in", ids)]))
+    )
+
+    # Act
+    extractor.extract()
+
+    # Assert
+    extractor.payment_queue.add_many.assert_called_once_with([12, 11])
+    assert stored_when_queued == [2]
@@ -0,0 +1,122 @@
+from logging import LoggerAdapter
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.storage.cached_storage import CachedStorage
+from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
+from bunq_ynab_connect.data.table_metadata import TableMetadata
+
+
+@pytest.fixture
+def cached_storage(mongo_storage: MongoStorage) -> CachedStorage:
+    """Return a CachedStorage around a MongoStorage, with test_table as dimension."""
+    mongo_storage.metadata.tables = [
+        TableMetadata(
+            name="test_table",
+            key_col="key",
+            timestamp_col="timestamp",
+            type="test_table",
+            dimension=True,
+        )
+    ]
+    return CachedStorage(
+        storage=mongo_storage,
+        metadata=mongo_storage.metadata,
+        logger=di[LoggerAdapter],
+        ttl_seconds=None,
+    )
+
+
+def test_reads_are_cached(cached_storage: CachedStorage) -> None:
+    """Test that repeated reads of a dimension table are served from memory."""
+    # Arrange
+    table_name = "test_table"
+    cached_storage.insert(table_name, [{"key": 1, "value": "one"}])
+
+    # Act
+    first = cached_storage.get(table_name)
+    cached_storage.storage.delete(table_name)  # Bypasses the cache
+    second = cached_storage.get(table_name)
+
+    # Assert
+    assert first == second
+    assert cached_storage.cache_stats()[table_name] == {"hits": 1, "misses": 1}
+
+
+def test_write_invalidates_cache(cached_storage: CachedStorage) -> None:
+    """Test that writing to a dimension table invalidates its cached reads."""
+    # Arrange
+    table_name = "test_table"
+    cached_storage.upsert(table_name, [{"key": 1, "value": "one"}])
+    cached_storage.get(table_name)
+
+    # Act
+    cached_storage.upsert(table_name, [{"key": 1, "value": "changed"}])
+    result = cached_storage.get(table_name)
+
+    # Assert
+    assert result[0]["value"] == "changed"
+    assert cached_storage.misses[table_name] == 2  # noqa: PLR2004
+
+
+def test_cached_rows_cannot_be_modified(cached_storage: CachedStorage) -> None:
+    """Test that modifying a returned row does not modify the cached row."""
+    # Arrange
+    table_name = "test_table"
+    cached_storage.insert(table_name, [{"key": 1, "value": "one"}])
+
+    # Act
+    cached_storage.get(table_name)[0]["value"] = "modified"
+    result = cached_storage.get(table_name)
+
+    # Assert
+    assert result[0]["value"] == "one"
+
+
+def test_expired_reads_are_reloaded(cached_storage: CachedStorage) -> None:
+    """Test that a cached read is reloaded once its TTL has passed."""
+    # Arrange
+    table_name = "test_table"
+    cached_storage.ttl_seconds = 0
+    cached_storage.insert(table_name, [{"key": 1, "value": "one"}])
+
+    # Act
+    cached_storage.get(table_name)
+    cached_storage.get(table_name)
+
+    # Assert
+    assert cached_storage.hits[table_name] == 0
+    assert cached_storage.misses[table_name] == 2  # noqa: PLR2004
+
+
+def test_insert_if_not_exists_invalidates_cache(cached_storage: CachedStorage) -> None:
+    """Test that insert_if_not_exists checks the stored keys, and invalidates."""
+    # Arrange
+    table_name = "test_table"
+    cached_storage.insert(table_name, [{"key": 1, "value": "one"}])
+    cached_storage.get(table_name)
+    cached_storage.storage.delete(table_name)  # Bypasses the cache
+
+    # Act
+    cached_storage.insert_if_not_exists(table_name, [{"key": 1, "value": "again"}])
+    result = cached_storage.get(table_name)
+
+    # Assert
+    assert [row["value"] for row in result] == ["again"]
+
+
+def test_cursors_are_read_by_wrapped_storage(cached_storage: CachedStorage) -> None:
+    """Test that cursors use the implementation of the wrapped storage."""
+    # Arrange
+    cached_storage.storage.get_cursor = Mock(return_value=7)
+
+    # Act
+    cursor = cached_storage.get_cursor("ynab_transactions", "budget")
+
+    # Assert
+    assert cursor == 7  # noqa: PLR2004
+    cached_storage.storage.get_cursor.assert_called_once_with(
+        "ynab_transactions", "budget"
+    )
@@ -0,0 +1,79 @@
+from logging import LoggerAdapter
+from threading import Barrier
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.data_extractors.extractor_graph import ExtractorGraph
+
+
+def _extractor(destination: str, depends_on: list[str], extract: Mock) -> Mock:
+    return Mock(destination=destination, DEPENDS_ON=depends_on, extract=extract)
+
+
+def test_chains_overlap_and_follow_dependencies() -> None:
+    """Test that independent chains run concurrently, and dependencies in order."""
+    # Arrange
+    # Both heads of the chains wait for each other, which only works concurrently
+    barrier = Barrier(2, timeout=5)
+    order = []
+    extractors = [
+        _extractor("accounts", [], Mock()),
+        _extractor("payments", ["accounts"], Mock()),
+        _extractor("budgets", [], Mock(side_effect=lambda: barrier.wait())),
+        _extractor("unknown", ["not_in_graph"], Mock()),
+    ]
+    extractors[0].extract.side_effect = lambda: (
+        barrier.wait(),
+        order.append("accounts"),
+    )
+    extractors[1].extract.side_effect = lambda: order.append("payments")
+    graph = ExtractorGraph(logger=di[LoggerAdapter], extractors=extractors)
+
+    # Act
+    durations = graph.run()
+
+    # Assert
+    assert set(durations) == {"accounts", "payments", "budgets", "unknown"}
+    assert order == ["accounts", "payments"]
+    for extractor in extractors:
+        extractor.extract.assert_called_once()
+
+
+def test_failure_skips_dependents() -> None:
+    """Test that dependents of a failed extractor are skipped, and others run."""
+    # Arrange
+    error = RuntimeError("API down")
+    extractors = [
+        _extractor("budgets", [], Mock(side_effect=error)),
+        _extractor("accounts", ["budgets"], Mock()),
+        _extractor("transactions", ["accounts"], Mock()),
+        _extractor("bunq_accounts", [], Mock()),
+    ]
+    graph = ExtractorGraph(logger=di[LoggerAdapter], extractors=extractors)
+
+    # Act
+    with pytest.raises(RuntimeError) as raised:
+        graph.run()
+
+    # Assert
+    assert raised.value is error
+    extractors[1].extract.assert_not_called()
+    extractors[2].extract.assert_not_called()
+    assert set(graph.durations) == {"bunq_accounts"}
+
+
+def test_circular_dependencies_raise() -> None:
+    """Test that circular dependencies are detected before running anything."""
+    # Arrange
+    extractors = [
+        _extractor("a", ["b"], Mock()),
+        _extractor("b", ["a"], Mock()),
+    ]
+    graph = ExtractorGraph(logger=di[LoggerAdapter], extractors=extractors)
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run()
+    extractors[0].extract.assert_not_called()
@@ -0,0 +1,185 @@
+from datetime import datetime, timezone
+from logging import LoggerAdapter
+
+import pandas as pd
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.data.table_metadata import TableMetadata
+
+
+@pytest.fixture
+def memory_storage(metadata: Metadata) -> MemoryStorage:
+    """Return a MemoryStorage, with an index like the one of the payment queue."""
+    metadata.get_table.side_effect = lambda name: TableMetadata(
+        name=name,
+        key_col="source" if name == "runmoments" else "key",
+        timestamp_col="timestamp",
+        type=name,
+        indexes=[{"columns": ["synced_at", "updated_at"]}],
+    )
+    return MemoryStorage(metadata=metadata, logger=di[LoggerAdapter])
+
+
+def test_upsert_merges_and_reports_counts(memory_storage: MemoryStorage) -> None:
+    """Test that upsert updates existing rows like a $set, and inserts new rows."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.insert(table_name, [{"key": 1, "value": "one", "extra": True}])
+
+    # Act
+    result = memory_storage.upsert(
+        table_name, [{"key": 1, "value": "changed"}, {"key": 2, "value": "two"}]
+    )
+    rows = memory_storage.find(table_name, sort=["key"])
+
+    # Assert
+    assert (result.matched, result.modified, result.upserted) == (1, 1, 1)
+    assert rows[0]["value"] == "changed"
+    assert rows[0]["extra"] is True
+    assert len(rows) == 2  # noqa: PLR2004
+
+
+def test_upsert_skips_outdated_rows(memory_storage: MemoryStorage) -> None:
+    """Test that rows older than the stored row (by timestamp_col) are skipped."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.upsert(table_name, [{"key": 1, "value": "new", "timestamp": 2}])
+
+    # Act
+    result = memory_storage.upsert(
+        table_name, [{"key": 1, "value": "old", "timestamp": 1}]
+    )
+
+    # Assert
+    assert result.skipped == 1
+    assert memory_storage.find_one(table_name, [("key", "eq", 1)])["value"] == "new"
+
+
+def test_query_operators(memory_storage: MemoryStorage) -> None:
+    """Test the query operators, including the null semantics of MongoDB."""
+    # Arrange
+    table_name = "test_table"
+    data = [
+        {"key": 1, "synced_at": None},
+        {"key": 2, "synced_at": "2024-01-01"},
+        {"key": 3},
+    ]
+    memory_storage.insert(table_name, data)
+
+    def keys(query: list[tuple]) -> list[int]:
+        return [r["key"] for r in memory_storage.find(table_name, query, ["key"])]
+
+    # Act & Assert
+    assert keys([("synced_at", "eq", None)]) == [1, 3]
+    assert keys([("synced_at", "ne", None)]) == [2]
+    assert keys([("key", "in", [1, 3])]) == [1, 3]
+    assert keys([("key", "nin", [1, 3])]) == [2]
+    assert keys([("key", "gt", 1), ("key", "lte", 3)]) == [2, 3]
+    assert keys([("synced_at", "gte", "2000-01-01")]) == [2]
+    assert keys([("synced_at", "ne", "2024-01-01")]) == [1, 3]
+
+
+def test_sorted_index_serves_filter_and_sort(memory_storage: MemoryStorage) -> None:
+    """Test that the queue head is found through the index, also after updates."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.insert(
+        table_name,
+        [{"key": i, "synced_at": None, "updated_at": 10 - i} for i in range(10)],
+    )
+    memory_storage.upsert(table_name, [{"key": 9, "synced_at": "2024-01-01"}])
+
+    # Act
+    head = memory_storage.find_one(
+        table_name, [("synced_at", "eq", None)], ["updated_at"]
+    )
+    last = memory_storage.find(
+        table_name, [("synced_at", "eq", None)], ["updated_at"], asc=False, limit=1
+    )
+
+    # Assert
+    assert head["key"] == 8  # noqa: PLR2004
+    assert last[0]["key"] == 0
+
+
+def test_datetimes_and_nested_columns(memory_storage: MemoryStorage) -> None:
+    """Test that datetimes are stored like pymongo does, and can be compared."""
+    # Arrange
+    table_name = "test_table"
+    moment = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    memory_storage.insert(
+        table_name, [{"key": 1, "nested": {"value": "a"}, "created": moment}]
+    )
+
+    # Act
+    result = memory_storage.find(
+        table_name,
+        [("created", "gte", moment), ("nested.value", "eq", "a")],
+        projection=["created", "nested.value"],
+    )
+
+    # Assert
+    expected = {"created": moment.replace(tzinfo=None), "nested": {"value": "a"}}
+    assert result == [expected]
+
+
+def test_returned_rows_are_copies(memory_storage: MemoryStorage) -> None:
+    """Test that changing a returned row does not change the stored row."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.insert(table_name, [{"key": 1, "nested": {"value": "a"}}])
+
+    # Act
+    memory_storage.find_one(table_name)["nested"]["value"] = "changed"
+
+    # Assert
+    assert memory_storage.find_one(table_name)["nested"]["value"] == "a"
+
+
+def test_overwrite_count_and_delete(memory_storage: MemoryStorage) -> None:
+    """Test that overwrite replaces all rows, and count and delete use the query."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.insert(table_name, [{"key": 1}])
+    data = pd.DataFrame.from_records([{"key": 2, "a": 1.0}, {"key": 3}])
+
+    # Act
+    memory_storage.overwrite(table_name, data)
+    count = memory_storage.count(table_name)
+    memory_storage.delete(table_name, [("key", "eq", 2)])
+
+    # Assert
+    assert count == 2  # noqa: PLR2004
+    assert memory_storage.find(table_name) == [{"key": 3, "a": None}]
+
+
+def test_iter_find_with_limit_and_skip(memory_storage: MemoryStorage) -> None:
+    """Test that iter_find yields all rows, and find supports limit and skip."""
+    # Arrange
+    table_name = "test_table"
+    memory_storage.insert(table_name, [{"key": i} for i in range(5)])
+
+    # Act
+    streamed = memory_storage.iter_find(table_name, sort=["key"], batch_size=2)
+    page = memory_storage.find(table_name, sort=["key"], asc=False, limit=2, skip=1)
+
+    # Assert
+    assert [r["key"] for r in streamed] == [0, 1, 2, 3, 4]
+    assert [r["key"] for r in page] == [3, 2]
+
+
+def test_runmoments(memory_storage: MemoryStorage) -> None:
+    """Test that the last runmoment is set and retrieved correctly."""
+    # Arrange
+    source = "test_source"
+    current_time = datetime.now(tz=timezone.utc).replace(microsecond=0)
+
+    # Act
+    memory_storage.set_last_runmoment(source, current_time)
+    result = memory_storage.get_last_runmoment(source)
+
+    # Assert
+    assert result == current_time
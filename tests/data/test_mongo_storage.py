@@ -1,38 +1,16 @@
 from datetime import datetime, timezone
-from logging import LoggerAdapter
 from time import sleep
 from unittest.mock import Mock
 
 import mongomock
+import pandas as pd
 import pytest
-from kink import di
 
-from bunq_ynab_connect.data.metadata import Metadata
 from bunq_ynab_connect.data.storage.mongo_storage import MongoStorage
-from bunq_ynab_connect.data.table_metadata import TableMetadata
+from bunq_ynab_connect.data.table_metadata import IndexMetadata, TableMetadata
 
-
-@pytest.fixture
-def mongo() -> mongomock.MongoClient:
-    """Return a mongomock client."""
-    return mongomock.MongoClient()
-
-
-@pytest.fixture
-def metadata() -> Metadata:
-    """Return a mock metadata object."""
-    return Mock(spec=Metadata)
-
-
-@pytest.fixture
-def mongo_storage(monkeypatch, mongo, metadata) -> MongoStorage:  # noqa: ANN001
-    """Return a MongoStorage object."""
-    monkeypatch.setattr(MongoStorage, "set_indexes", Mock())
-    storage = MongoStorage(mongo, mongo["test_database"], metadata, di[LoggerAdapter])
-    storage.metadata.get_table.return_value = TableMetadata(
-        name="test_table", key_col="key", timestamp_col="timestamp", type="test_table"
-    )
-    return storage
+# The fixture disables set_indexes. Keep a reference, to test it explicitly
+set_indexes = MongoStorage.set_indexes
 
 
 def test_insert_and_find_one(mongo_storage: MongoStorage) -> None:
@@ -161,7 +139,7 @@ def test_inserted_at_is_added(mongo_storage: MongoStorage) -> None:
 
 
 def test_updated_at_is_updated(mongo_storage: MongoStorage) -> None:
-    """Test that the updated_at column is updated when upserting data."""
+    """Test that the updated_at column is updated when upserting changed data."""
     # Arrange
     table_name = "test_table"
     data = [
@@ -172,13 +150,32 @@ def test_updated_at_is_updated(mongo_storage: MongoStorage) -> None:
     mongo_storage.upsert(table_name, data)
     old_updated_at = mongo_storage.get(table_name)[0]["updated_at"]
     sleep(0.1)
-    mongo_storage.upsert(table_name, data)
+    mongo_storage.upsert(table_name, [{"key": 1, "value": "changed"}])
     new_updated_at = mongo_storage.get(table_name)[0]["updated_at"]
 
     # Assert
     assert new_updated_at > old_updated_at
 
 
+def test_unchanged_rows_are_not_written(mongo_storage: MongoStorage) -> None:
+    """Test that rows with the same content hash are skipped, and counted."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": 1, "value": "one"}, {"key": 2, "value": "two"}]
+    mongo_storage.upsert(table_name, data)
+    old_updated_at = mongo_storage.get(table_name)[0]["updated_at"]
+    sleep(0.1)
+
+    # Act
+    result = mongo_storage.upsert(
+        table_name, [*data[:1], {"key": 2, "value": "changed"}, {"key": 3}]
+    )
+
+    # Assert
+    assert (result.unchanged, result.modified, result.upserted) == (1, 1, 1)
+    assert mongo_storage.get(table_name)[0]["updated_at"] == old_updated_at
+
+
 def test_convert_query_is_used(mongo_storage: MongoStorage) -> None:
     """Test that the convert_query method is called when find is called."""
     # Arrange
@@ -192,3 +189,250 @@ def test_convert_query_is_used(mongo_storage: MongoStorage) -> None:
 
     # Assert
     mongo_storage.convert_query.assert_called_once_with(query)
+
+
+def test_upsert_reports_counts(mongo_storage: MongoStorage) -> None:
+    """Test that upsert reports the matched, modified and upserted counts."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.upsert(table_name, [{"key": 1, "value": "one", "timestamp": 1}])
+
+    # Act
+    result = mongo_storage.upsert(
+        table_name,
+        [
+            {"key": 1, "value": "updated", "timestamp": 2},
+            {"key": 2, "value": "two", "timestamp": 1},
+        ],
+    )
+
+    # Assert
+    assert result.matched == 1
+    assert result.modified == 1
+    assert result.upserted == 1
+    assert result.skipped == 0
+
+
+def test_upsert_skips_outdated_rows(mongo_storage: MongoStorage) -> None:
+    """Test that rows older than the stored row (by timestamp_col) are skipped."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.upsert(table_name, [{"key": 1, "value": "new", "timestamp": 2}])
+
+    # Act
+    result = mongo_storage.upsert(
+        table_name, [{"key": 1, "value": "old", "timestamp": 1}]
+    )
+    stored = mongo_storage.find_one(table_name, [("key", "eq", 1)])
+
+    # Assert
+    assert result.skipped == 1
+    assert stored["value"] == "new"
+
+
+def test_upsert_keeps_newest_row_of_duplicate_keys(mongo_storage: MongoStorage) -> None:
+    """Test that of the rows with the same key, only the newest is written."""
+    # Arrange
+    table_name = "test_table"
+    data = [
+        {"key": 1, "value": "new", "timestamp": 2},
+        {"key": 1, "value": "old", "timestamp": 1},
+        {"key": 2, "value": "first"},
+        {"key": 2, "value": "last"},
+    ]
+
+    # Act
+    result = mongo_storage.upsert(table_name, data)
+    stored = mongo_storage.find(table_name, sort=["key"])
+
+    # Assert
+    assert [row["value"] for row in stored] == ["new", "last"]
+    assert result.upserted == 2  # noqa: PLR2004
+    assert result.skipped == 2  # noqa: PLR2004
+
+
+def test_upsert_in_chunks(mongo_storage: MongoStorage) -> None:
+    """Test that upserting more rows than the chunk size writes all rows."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.UPSERT_CHUNK_SIZE = 2
+    data = [{"key": i, "value": str(i)} for i in range(5)]
+
+    # Act
+    result = mongo_storage.upsert(table_name, data)
+
+    # Assert
+    assert result.upserted == 5  # noqa: PLR2004
+    assert mongo_storage.count(table_name) == 5  # noqa: PLR2004
+
+
+def test_upsert_reads_stored_rows_once(
+    mongo_storage: MongoStorage, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the stored hashes and timestamps are read with a single query."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.upsert(table_name, [{"key": 1, "value": "new", "timestamp": 2}])
+    find = mongomock.collection.Collection.find
+    queries = []
+
+    def count_find(collection, *args, **kwargs):  # noqa: ANN001, ANN002, ANN003, ANN202
+        queries.append(args)
+        return find(collection, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "find", count_find)
+
+    # Act
+    result = mongo_storage.upsert(
+        table_name,
+        [
+            {"key": 1, "value": "old", "timestamp": 1},
+            {"key": 2, "value": "two", "timestamp": 1},
+        ],
+    )
+
+    # Assert
+    assert len(queries) == 1
+    assert (result.skipped, result.upserted) == (1, 1)
+
+
+def test_insert_if_not_exists(mongo_storage: MongoStorage) -> None:
+    """Test that only rows with a new key are inserted, each key only once."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.IN_QUERY_CHUNK_SIZE = 2
+    mongo_storage.insert(table_name, [{"key": 1, "value": "one"}])
+    data = [
+        {"key": 1, "value": "changed"},
+        {"key": 2, "value": "two"},
+        {"key": 3, "value": "three"},
+        {"key": 3, "value": "duplicate"},
+    ]
+
+    # Act
+    mongo_storage.insert_if_not_exists(table_name, data)
+    result = mongo_storage.find(table_name, sort=["key"])
+
+    # Assert
+    assert [r["key"] for r in result] == [1, 2, 3]
+    assert [r["value"] for r in result] == ["one", "two", "three"]
+
+
+def test_find_with_projection_limit_and_skip(mongo_storage: MongoStorage) -> None:
+    """Test that find only returns the projected columns of the requested page."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": i, "value": str(i)} for i in range(5)]
+    mongo_storage.insert(table_name, data)
+
+    # Act
+    result = mongo_storage.find(
+        table_name, sort=["key"], projection=["key"], limit=2, skip=1
+    )
+
+    # Assert
+    assert [r["key"] for r in result] == [1, 2]
+    assert all("value" not in r for r in result)
+
+
+def test_iter_find(mongo_storage: MongoStorage) -> None:
+    """Test that iter_find lazily yields all matching rows, in order."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": i, "value": str(i)} for i in range(5)]
+    mongo_storage.insert(table_name, data)
+
+    # Act
+    result = mongo_storage.iter_find(
+        table_name, [("key", "gte", 2)], ["key"], ["value"], batch_size=2, asc=False
+    )
+
+    # Assert
+    assert not isinstance(result, list)
+    assert [r["value"] for r in result] == ["4", "3", "2"]
+
+
+def test_find_one_sorts(mongo_storage: MongoStorage) -> None:
+    """Test that find_one returns the first row according to the sort."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": i, "value": "same"} for i in [2, 3, 1]]
+    mongo_storage.insert(table_name, data)
+
+    # Act
+    first = mongo_storage.find_one(table_name, [("value", "eq", "same")], ["key"])
+    last = mongo_storage.find_one(
+        table_name, [("value", "eq", "same")], ["key"], asc=False
+    )
+
+    # Assert
+    assert first["key"] == 1
+    assert last["key"] == 3  # noqa: PLR2004
+
+
+def test_set_indexes_reconciles_declared_indexes(mongo_storage: MongoStorage) -> None:
+    """Test that set_indexes drops undeclared and creates declared indexes."""
+    # Arrange
+    collection = mongo_storage.database["test_table"]
+    collection.create_index([("stale", 1)])
+    mongo_storage.metadata.tables = [
+        TableMetadata(
+            name="test_table",
+            key_col="key",
+            timestamp_col="timestamp",
+            type="test_table",
+            indexes=[
+                {"columns": ["key"], "unique": True},
+                {"columns": ["value", "-timestamp"]},
+            ],
+        )
+    ]
+
+    # Act
+    set_indexes(mongo_storage)
+    set_indexes(mongo_storage)
+    indexes = collection.index_information()
+
+    # Assert
+    assert set(indexes) == {"_id_", "key_1", "value_1_timestamp_-1"}
+    assert indexes["key_1"]["unique"]
+
+
+def test_overwrite_swaps_in_indexed_collection(mongo_storage: MongoStorage) -> None:
+    """Test that overwrite replaces the rows, and keeps the declared indexes."""
+    # Arrange
+    table_name = "test_table"
+    mongo_storage.metadata.get_table.return_value.indexes = [
+        IndexMetadata(["key"], unique=True)
+    ]
+    mongo_storage.insert(table_name, [{"key": 1}, {"key": 2}])
+
+    # Act
+    mongo_storage.overwrite(table_name, pd.DataFrame.from_records([{"key": 3}]))
+
+    # Assert
+    assert [r["key"] for r in mongo_storage.find(table_name)] == [3]
+    assert "key_1" in mongo_storage.database[table_name].index_information()
+    assert table_name + MongoStorage.STAGING_SUFFIX not in (
+        mongo_storage.database.list_collection_names()
+    )
+
+
+def test_overwrite_with_diff_writes_changes(mongo_storage: MongoStorage) -> None:
+    """Test that overwrite with diff only writes changed rows, and removes rows."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": 1, "value": "one"}, {"key": 2, "value": "two"}]
+    mongo_storage.overwrite(table_name, pd.DataFrame.from_records(data), diff=True)
+    updated_at = mongo_storage.find_one(table_name, [("key", "eq", 1)])["updated_at"]
+    data = [{"key": 1, "value": "one"}, {"key": 3, "value": "three"}]
+    sleep(0.01)
+
+    # Act
+    mongo_storage.overwrite(table_name, pd.DataFrame.from_records(data), diff=True)
+    result = mongo_storage.find(table_name, sort=["key"])
+
+    # Assert
+    assert [r["key"] for r in result] == [1, 3]
+    assert result[0]["updated_at"] == updated_at
+    assert result[1]["content_hash"] == MongoStorage.content_hash(data[1])
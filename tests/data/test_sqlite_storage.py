@@ -0,0 +1,205 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from logging import LoggerAdapter
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.sqlite_storage import SqliteStorage
+from bunq_ynab_connect.data.table_metadata import TableMetadata
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path: Path, metadata: Metadata) -> SqliteStorage:
+    """Return a SqliteStorage in a temporary directory."""
+    metadata.tables = []
+    metadata.get_table.side_effect = lambda name: TableMetadata(
+        name=name,
+        key_col="source" if name == "runmoments" else "key",
+        timestamp_col="timestamp",
+        type=name,
+        indexes=[{"columns": ["key"], "unique": True}, {"columns": ["nested.value"]}],
+    )
+    return SqliteStorage(
+        metadata=metadata,
+        logger=di[LoggerAdapter],
+        sqlite_path=tmp_path / "test.sqlite",
+    )
+
+
+def test_insert_and_find_one(sqlite_storage: SqliteStorage) -> None:
+    """Test that inserting data into a table and then finding it works."""
+    # Arrange
+    table_name = "test_table"
+    data = [{"key": 1, "value": "one"}, {"key": 2, "value": "two"}]
+
+    # Act
+    sqlite_storage.insert(table_name, data)
+    result = sqlite_storage.find_one(table_name, [("key", "eq", 2)])
+
+    # Assert
+    assert result["value"] == "two"
+    assert "inserted_at" in result
+
+
+def test_upsert_merges_and_reports_counts(sqlite_storage: SqliteStorage) -> None:
+    """Test that upsert updates existing rows like a $set, and inserts new rows."""
+    # Arrange
+    table_name = "test_table"
+    sqlite_storage.insert(table_name, [{"key": 1, "value": "one", "extra": True}])
+
+    # Act
+    result = sqlite_storage.upsert(
+        table_name, [{"key": 1, "value": "changed"}, {"key": 2, "value": "two"}]
+    )
+    rows = sqlite_storage.find(table_name, sort=["key"])
+
+    # Assert
+    assert (result.matched, result.modified, result.upserted) == (1, 1, 1)
+    assert rows[0]["value"] == "changed"
+    assert rows[0]["extra"] is True
+    assert len(rows) == 2  # noqa: PLR2004
+
+
+def test_upsert_skips_outdated_rows(sqlite_storage: SqliteStorage) -> None:
+    """Test that rows older than the stored row (by timestamp_col) are skipped."""
+    # Arrange
+    table_name = "test_table"
+    sqlite_storage.upsert(table_name, [{"key": 1, "value": "new", "timestamp": 2}])
+
+    # Act
+    result = sqlite_storage.upsert(
+        table_name, [{"key": 1, "value": "old", "timestamp": 1}]
+    )
+
+    # Assert
+    assert result.skipped == 1
+    assert sqlite_storage.find_one(table_name, [("key", "eq", 1)])["value"] == "new"
+
+
+def test_query_operators(sqlite_storage: SqliteStorage) -> None:
+    """Test the query operators, including the null semantics of MongoDB."""
+    # Arrange
+    table_name = "test_table"
+    data = [
+        {"key": 1, "synced_at": None},
+        {"key": 2, "synced_at": "2024-01-01"},
+        {"key": 3},
+    ]
+    sqlite_storage.insert(table_name, data)
+
+    def keys(query: list[tuple]) -> list[int]:
+        return [r["key"] for r in sqlite_storage.find(table_name, query, ["key"])]
+
+    # Act & Assert
+    assert keys([("synced_at", "eq", None)]) == [1, 3]
+    assert keys([("synced_at", "ne", None)]) == [2]
+    assert keys([("key", "in", [1, 3])]) == [1, 3]
+    assert keys([("key", "nin", [1, 3])]) == [2]
+    assert keys([("key", "gt", 1), ("key", "lte", 3)]) == [2, 3]
+    assert keys([("synced_at", "ne", "2024-01-01")]) == [1, 3]
+
+
+def test_datetimes_and_nested_columns(sqlite_storage: SqliteStorage) -> None:
+    """Test that datetimes are loaded as datetimes, and can be compared."""
+    # Arrange
+    table_name = "test_table"
+    moment = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    sqlite_storage.insert(
+        table_name, [{"key": 1, "nested": {"value": "a"}, "created": moment}]
+    )
+
+    # Act
+    result = sqlite_storage.find(
+        table_name,
+        [("created", "gte", moment), ("nested.value", "eq", "a")],
+        projection=["created", "nested.value"],
+    )
+
+    # Assert
+    expected = {"created": moment.replace(tzinfo=None), "nested": {"value": "a"}}
+    assert result == [expected]
+
+
+def test_overwrite_count_and_delete(sqlite_storage: SqliteStorage) -> None:
+    """Test that overwrite replaces all rows, and count and delete use the query."""
+    # Arrange
+    table_name = "test_table"
+    sqlite_storage.insert(table_name, [{"key": 1}])
+    data = pd.DataFrame.from_records([{"key": 2, "a": 1.0}, {"key": 3}])
+
+    # Act
+    sqlite_storage.overwrite(table_name, data)
+    count = sqlite_storage.count(table_name)
+    sqlite_storage.delete(table_name, [("key", "eq", 2)])
+
+    # Assert
+    assert count == 2  # noqa: PLR2004
+    assert sqlite_storage.find(table_name) == [{"key": 3, "a": None}]
+
+
+def test_iter_find_with_limit_and_skip(sqlite_storage: SqliteStorage) -> None:
+    """Test that iter_find yields all rows, and find supports limit and skip."""
+    # Arrange
+    table_name = "test_table"
+    sqlite_storage.insert(table_name, [{"key": i} for i in range(5)])
+
+    # Act
+    streamed = sqlite_storage.iter_find(table_name, sort=["key"], batch_size=2)
+    page = sqlite_storage.find(table_name, sort=["key"], asc=False, limit=2, skip=1)
+
+    # Assert
+    assert [r["key"] for r in streamed] == [0, 1, 2, 3, 4]
+    assert [r["key"] for r in page] == [3, 2]
+
+
+def test_runmoments(sqlite_storage: SqliteStorage) -> None:
+    """Test that the last runmoment is set and retrieved correctly."""
+    # Arrange
+    source = "test_source"
+    current_time = datetime.now(tz=timezone.utc).replace(microsecond=0)
+
+    # Act
+    sqlite_storage.set_last_runmoment(source, current_time)
+    result = sqlite_storage.get_last_runmoment(source)
+
+    # Assert
+    assert result == current_time
+
+
+def test_concurrent_upserts_do_not_duplicate_keys(
+    sqlite_storage: SqliteStorage,
+) -> None:
+    """Test that threads that upsert the same new keys store each key once."""
+    # Arrange
+    table_name = "test_table"
+    rows = [{"key": i, "value": "a"} for i in range(50)]
+
+    def upsert(thread: int) -> None:
+        for attempt in range(5):
+            sqlite_storage.upsert(
+                table_name, [{**row, "value": f"{thread}-{attempt}"} for row in rows]
+            )
+
+    # Act
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(upsert, range(8)))
+
+    # Assert
+    assert sqlite_storage.count(table_name) == len(rows)
+
+
+def test_dates_are_stored_as_iso_strings(sqlite_storage: SqliteStorage) -> None:
+    """Test that dates can be stored and queried, unlike other non-JSON types."""
+    # Arrange
+    table_name = "test_table"
+
+    # Act
+    sqlite_storage.upsert(table_name, [{"key": 1, "day": date(2024, 1, 2)}])
+    result = sqlite_storage.find(table_name, [("day", "gte", date(2024, 1, 1))])
+
+    # Assert
+    assert [row["day"] for row in result] == ["2024-01-02"]
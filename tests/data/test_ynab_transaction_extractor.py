@@ -0,0 +1,99 @@
+from datetime import date
+from logging import LoggerAdapter
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.clients.ynab_client import YnabClient
+from bunq_ynab_connect.data.data_extractors.ynab_transaction_extractor import (
+    YnabTransactionExtractor,
+)
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.models.ynab_budget import YnabBudget
+from bunq_ynab_connect.models.ynab_transaction import YnabTransaction
+
+
+def _transaction(transaction_id: str, *, deleted: bool = False) -> Mock:
+    """Return a transaction like the YNAB API does, with all fields empty."""
+    data = dict.fromkeys(YnabTransaction.model_fields)
+    data.pop("budget_id")
+    data.update(id=transaction_id, date=date(2024, 1, 1), deleted=deleted)
+    return Mock(id=transaction_id, deleted=deleted, to_dict=Mock(return_value=data))
+
+
+@pytest.fixture
+def storage() -> MemoryStorage:
+    """Return a MemoryStorage with one budget."""
+    storage = MemoryStorage(metadata=Metadata(), logger=di[LoggerAdapter])
+    budget = dict.fromkeys(YnabBudget.model_fields)
+    budget.update(
+        id="budget", first_month=date(2024, 1, 1), last_month=date(2024, 1, 1)
+    )
+    storage.insert("ynab_budgets", [budget])
+    return storage
+
+
+def test_delta_passes_and_stores_server_knowledge(storage: MemoryStorage) -> None:
+    """Test that the first run loads since the runmoment, and later runs the delta."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.get_transactions_for_budget.side_effect = [
+        ([_transaction("a")], 10),
+        ([_transaction("b")], 12),
+    ]
+    extractor = YnabTransactionExtractor(
+        storage=storage, logger=di[LoggerAdapter], client=client
+    )
+
+    # Act
+    extractor.extract()
+    extractor.extract()
+
+    # Assert
+    first, second = client.get_transactions_for_budget.call_args_list
+    assert first.kwargs["last_knowledge_of_server"] is None
+    assert first.kwargs["since_date"] is not None
+    assert second.kwargs == {"last_knowledge_of_server": 10, "since_date": None}
+    assert storage.get_cursor("ynab_transactions/budget") == 12  # noqa: PLR2004
+    assert storage.count("ynab_transactions") == 2  # noqa: PLR2004
+
+
+def test_failed_store_keeps_server_knowledge(storage: MemoryStorage) -> None:
+    """Test that the server knowledge is not stored, if storing the changes fails."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.get_transactions_for_budget.return_value = ([_transaction("a")], 10)
+    extractor = YnabTransactionExtractor(
+        storage=storage, logger=di[LoggerAdapter], client=client
+    )
+    storage.upsert = Mock(side_effect=OSError("Storage down"))
+
+    # Act
+    with pytest.raises(OSError, match="Storage down"):
+        extractor.extract()
+
+    # Assert
+    assert storage.get_cursor("ynab_transactions/budget") is None
+
+
+def test_delta_removes_deleted_transactions(storage: MemoryStorage) -> None:
+    """Test that a transaction deleted in YNAB is removed, rather than stored."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.get_transactions_for_budget.side_effect = [
+        ([_transaction("a"), _transaction("b")], 10),
+        ([_transaction("a", deleted=True), _transaction("c", deleted=True)], 12),
+    ]
+    extractor = YnabTransactionExtractor(
+        storage=storage, logger=di[LoggerAdapter], client=client
+    )
+
+    # Act
+    extractor.extract()
+    extractor.extract()
+
+    # Assert
+    assert [t["id"] for t in storage.find("ynab_transactions")] == ["b"]
+    assert storage.get_cursor("ynab_transactions/budget") == 12  # noqa: PLR2004
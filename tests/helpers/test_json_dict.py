@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging import LoggerAdapter
+from pathlib import Path
+from unittest.mock import Mock
+
+from kink import di
+
+from bunq_ynab_connect.helpers.json_dict import JsonDict
+
+
+def test_reads_file_only_when_changed(tmp_path: Path) -> None:
+    """Test that lookups are served from memory, until another writer changes it."""
+    # Arrange
+    path = tmp_path / "config.json"
+    reader = JsonDict(logger=di[LoggerAdapter], path=path)
+    writer = JsonDict(logger=di[LoggerAdapter], path=path)
+    writer.save({"session_context": {"token": "first"}})
+    reader._read = Mock(wraps=reader._read)  # noqa: SLF001
+
+    # Act
+    first = [reader["session_context.token"] for _ in range(3)]
+    writer.update({"session_context": {"token": "second"}})
+    second = reader["session_context.token"]
+
+    # Assert
+    assert first == ["first"] * 3
+    assert second == "second"
+    assert reader._read.call_count == 2  # noqa: SLF001, PLR2004
+
+
+def test_concurrent_updates_are_not_lost(tmp_path: Path) -> None:
+    """Test that writers with their own instance (like processes) keep all keys."""
+    # Arrange
+    path = tmp_path / "config.json"
+    writers = [JsonDict(logger=di[LoggerAdapter], path=path) for _ in range(4)]
+
+    def write(i: int) -> None:
+        for j in range(10):
+            writers[i].update({f"writer_{i}": {f"key_{j}": j}})
+
+    # Act
+    with ThreadPoolExecutor(len(writers)) as executor:
+        list(executor.map(write, range(len(writers))))
+
+    # Assert
+    data = JsonDict(logger=di[LoggerAdapter], path=path).data
+    assert data == {
+        f"writer_{i}": {f"key_{j}": j for j in range(10)} for i in range(len(writers))
+    }
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
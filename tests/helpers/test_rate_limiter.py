@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging import LoggerAdapter
+from time import monotonic
+from unittest.mock import Mock, patch
+
+from bunq_ynab_connect.helpers.rate_limiter import RateLimiter
+
+
+def test_acquire_blocks_when_window_is_full() -> None:
+    """Test that calls beyond max_calls wait until the window has passed."""
+    # Arrange
+    rate_limiter = RateLimiter(max_calls=2, period=0.2)
+    start = monotonic()
+
+    # Act
+    moments = []
+    for _ in range(3):
+        rate_limiter.acquire()
+        moments.append(monotonic() - start)
+
+    # Assert
+    assert moments[1] < 0.1  # noqa: PLR2004
+    assert moments[2] >= 0.2  # noqa: PLR2004
+
+
+def test_acquire_is_shared_across_threads() -> None:
+    """Test that concurrent threads together stay within the limit."""
+    # Arrange
+    rate_limiter = RateLimiter(max_calls=3, period=0.2)
+    start = monotonic()
+
+    # Act
+    with ThreadPoolExecutor(6) as executor:
+        moments = sorted(
+            executor.map(
+                lambda _: (rate_limiter.acquire(), monotonic() - start)[1], range(6)
+            )
+        )
+
+    # Assert
+    assert moments[2] < 0.1  # noqa: PLR2004
+    assert moments[3] >= 0.2  # noqa: PLR2004
+
+
+def test_long_wait_is_logged() -> None:
+    """Test that a wait longer than WARN_AFTER_SECONDS is logged as a warning."""
+    # Arrange
+    logger = Mock(spec=LoggerAdapter)
+    rate_limiter = RateLimiter(max_calls=1, period=3600, logger=logger)
+
+    # Act
+    with patch("bunq_ynab_connect.helpers.rate_limiter.sleep") as sleep:
+        sleep.side_effect = lambda _: rate_limiter._calls.clear()  # noqa: SLF001
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+
+    # Assert
+    sleep.assert_called_once()
+    logger.warning.assert_called_once()
+    assert logger.warning.call_args.args[1:3] == (1, 3600)
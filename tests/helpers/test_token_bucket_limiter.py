@@ -0,0 +1,122 @@
+import asyncio
+import threading
+from logging import LoggerAdapter
+from time import monotonic
+from unittest.mock import patch
+
+import pytest
+from kink import di
+
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.helpers.token_bucket_limiter import TokenBucketLimiter
+
+
+def test_acquire_waits_for_refill_per_bucket() -> None:
+    """Test that a burst empties its bucket, without throttling other buckets."""
+    # Arrange
+    limiter = TokenBucketLimiter(limits={"GET": (2, 10.0), "POST": (1, 1.0)})
+    start = monotonic()
+
+    # Act
+    moments = []
+    for bucket in ["GET", "GET", "POST", "GET"]:
+        limiter.acquire(bucket)
+        moments.append(monotonic() - start)
+
+    # Assert
+    assert moments[2] < 0.05  # noqa: PLR2004
+    assert moments[3] >= 0.09  # noqa: PLR2004
+    assert limiter.stats()["throttled_seconds"] > 0
+
+
+def test_storage_shares_budget_across_limiters() -> None:
+    """Test that limiters on the same storage (like processes) share the tokens."""
+    # Arrange
+    storage = MemoryStorage(metadata=Metadata(), logger=di[LoggerAdapter])
+    limiters = [
+        TokenBucketLimiter(limits={"GET": (2, 10.0)}, storage=storage) for _ in range(2)
+    ]
+    start = monotonic()
+
+    # Act
+    for limiter in [*limiters, limiters[0]]:
+        limiter.acquire("GET")
+
+    # Assert
+    assert monotonic() - start >= 0.09  # noqa: PLR2004
+
+
+def test_acquire_async_reads_shared_buckets_off_the_loop() -> None:
+    """Test that the blocking storage of shared buckets is not read on the loop."""
+    # Arrange
+    storage = MemoryStorage(metadata=Metadata(), logger=di[LoggerAdapter])
+    limiter = TokenBucketLimiter(limits={"GET": (1, 1000.0)}, storage=storage)
+    threads = []
+    find_one = storage.find_one
+
+    def record_thread(*args: object, **kwargs: object) -> dict | None:
+        threads.append(threading.get_ident())
+        return find_one(*args, **kwargs)
+
+    storage.find_one = record_thread
+
+    async def acquire() -> int:
+        await limiter.acquire_async("GET")
+        await limiter.acquire_async("GET")
+        return threading.get_ident()
+
+    # Act
+    loop_thread = asyncio.run(acquire())
+
+    # Assert
+    assert threads
+    assert loop_thread not in threads
+
+
+def test_backoff_empties_bucket_and_counts_retry() -> None:
+    """Test that a backoff honours Retry-After, and makes the next acquire wait."""
+    # Arrange
+    limiter = TokenBucketLimiter(limits={"GET": (3, 1.0)})
+
+    # Act
+    with patch("bunq_ynab_connect.helpers.token_bucket_limiter.sleep") as sleep:
+        limiter.backoff("GET", attempt=0, retry_after=2.0)
+        wait = limiter._take("GET")  # noqa: SLF001
+
+    # Assert
+    sleep.assert_called_once_with(2.0)
+    assert wait > 0.9  # noqa: PLR2004
+    assert limiter.stats() == {"retries": 1, "throttled_seconds": 2.0}
+
+
+@pytest.mark.parametrize(("max_calls", "period"), [(3, 3), (5, 3), (2, 3), (1, 30)])
+def test_per_window_stays_within_api_limit(max_calls: int, period: float) -> None:
+    """Test that no window of period seconds has more than max_calls acquisitions."""
+    # Arrange
+    limiter = TokenBucketLimiter(
+        limits={"GET": TokenBucketLimiter.per_window(max_calls, period)}
+    )
+    clock = [1000.0]
+
+    def sleep(seconds: float) -> None:
+        # Like a real clock, advance at least a millisecond
+        clock[0] += max(seconds, 0.001)
+
+    # Act
+    moments = []
+    with (
+        patch("bunq_ynab_connect.helpers.token_bucket_limiter.time", lambda: clock[0]),
+        patch("bunq_ynab_connect.helpers.token_bucket_limiter.sleep", sleep),
+    ):
+        for _ in range(4 * max_calls):
+            limiter.acquire("GET")
+            moments.append(clock[0])
+
+    # Assert
+    in_window = [
+        sum(start <= moment <= start + period for moment in moments)
+        for start in moments
+    ]
+    assert max(in_window) == max_calls
+    assert moments[-1] - moments[0] < 4 * period
@@ -0,0 +1,178 @@
+from logging import LoggerAdapter
+from unittest.mock import Mock
+
+import pytest
+from kink import di
+from ynab import SaveTransactionsResponseData
+
+from bunq_ynab_connect.clients.ynab_client import YnabClient
+from bunq_ynab_connect.data.bunq_account_to_ynab_account_mapper import (
+    BunqAccountToYnabAccountMapper,
+)
+from bunq_ynab_connect.data.metadata import Metadata
+from bunq_ynab_connect.data.storage.memory_storage import MemoryStorage
+from bunq_ynab_connect.models.ynab_account import YnabAccount
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_queue import PaymentQueue
+from bunq_ynab_connect.sync_bunq_to_ynab.payment_syncer import PaymentSyncer
+
+
+@pytest.fixture
+def storage(monkeypatch) -> MemoryStorage:  # noqa: ANN001
+    """Return a MemoryStorage with queued payments of three accounts."""
+    monkeypatch.setenv("START_SYNC_DATE", "2024-01-01 00:00:00")
+    storage = MemoryStorage(metadata=Metadata(), logger=di[LoggerAdapter])
+    storage.insert(
+        "bunq_payments",
+        [
+            _payment(1, account_id=10),
+            _payment(2, account_id=10),
+            _payment(3, account_id=20),
+            _payment(4, account_id=30),
+        ],
+    )
+    storage.insert(
+        PaymentQueue.TABLE_NAME,
+        [{"payment_id": i, "synced_at": None} for i in range(1, 5)],
+    )
+    return storage
+
+
+def _payment(payment_id: int, account_id: int) -> dict:
+    return {
+        "id": payment_id,
+        "alias": {},
+        "amount": {"value": "-1.50"},
+        "attachment": None,
+        "balance_after_mutation": None,
+        "counterparty_alias": {"display_name": "Shop"},
+        "created": "2024-06-01 12:00:00.000000",
+        "description": f"Payment {payment_id}",
+        "monetary_account_id": account_id,
+        "request_reference_split_the_bill": None,
+        "sub_type": None,
+        "type": None,
+        "updated": None,
+    }
+
+
+def _account(budget_id: str) -> YnabAccount:
+    fields = dict.fromkeys(YnabAccount.model_fields)
+    fields.update(id=f"account-{budget_id}", budget_id=budget_id)
+    return YnabAccount(**fields)
+
+
+def _syncer(storage: MemoryStorage, client: YnabClient) -> PaymentSyncer:
+    """Return a syncer of which accounts 10 and 20 are mapped, without MLServer."""
+    mapper = Mock(spec=BunqAccountToYnabAccountMapper)
+    mapper.map.return_value = {10: _account("budget-a"), 20: _account("budget-b")}
+    syncer = PaymentSyncer(
+        logger=di[LoggerAdapter],
+        storage=storage,
+        client=client,
+        mapper=mapper,
+        queue=PaymentQueue(logger=di[LoggerAdapter], storage=storage),
+        mlserver_model_url="http://mlserver/{budget_id}",
+    )
+    syncer.decide_category = Mock(return_value=None)
+    return syncer
+
+
+def _accept_all(transactions: list, budget_id: str) -> SaveTransactionsResponseData:  # noqa: ARG001
+    return Mock(
+        transactions=[Mock(import_id=t.import_id) for t in transactions],
+        duplicate_import_ids=[],
+    )
+
+
+def test_sync_batched_creates_one_request_per_budget(storage: MemoryStorage) -> None:
+    """Test that the payments of a budget are created with a single request."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.create_transactions.side_effect = _accept_all
+    syncer = _syncer(storage, client)
+
+    # Act
+    syncer.sync_batched()
+
+    # Assert
+    calls = {c.args[1]: c.args[0] for c in client.create_transactions.call_args_list}
+    assert sorted(calls) == ["budget-a", "budget-b"]
+    assert [t.import_id for t in calls["budget-a"]] == ["BUNQ:1", "BUNQ:2"]
+    assert [t.amount for t in calls["budget-b"]] == [-1500]
+    assert not syncer.queue
+
+
+def test_sync_batched_posts_in_chunks(storage: MemoryStorage) -> None:
+    """Test that the transactions of a budget are split into chunks of BATCH_SIZE."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.create_transactions.side_effect = _accept_all
+    syncer = _syncer(storage, client)
+    syncer.BATCH_SIZE = 1
+
+    # Act
+    syncer.sync_batched()
+
+    # Assert
+    assert client.create_transactions.call_count == 3  # noqa: PLR2004
+    assert not syncer.queue
+
+
+def test_sync_batched_only_marks_accepted_payments(storage: MemoryStorage) -> None:
+    """Test that payments which YNAB did not create stay in the queue."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+    client.create_transactions.side_effect = lambda _, budget_id: Mock(
+        transactions=[Mock(import_id="BUNQ:1")] if budget_id == "budget-a" else [],
+        duplicate_import_ids=["BUNQ:3"],
+    )
+    syncer = _syncer(storage, client)
+
+    # Act
+    syncer.sync_batched()
+
+    # Assert
+    assert syncer.queue.is_yet_synced(1)
+    assert not syncer.queue.is_yet_synced(2)
+    assert syncer.queue.is_yet_synced(3)
+    # Payment 4 has no YNAB account, and is skipped like in sync
+    assert syncer.queue.is_yet_synced(4)
+    assert syncer.queue.get_payment_ids() == [2]
+
+
+def test_sync_batched_keeps_payments_of_failed_request(storage: MemoryStorage) -> None:
+    """Test that a failed request leaves its payments queued, and syncs the others."""
+    # Arrange
+    client = Mock(spec=YnabClient)
+
+    def create(transactions: list, budget_id: str) -> SaveTransactionsResponseData:
+        if budget_id == "budget-a":
+            msg = "Could not add transactions"
+            raise OSError(msg)
+        return _accept_all(transactions, budget_id)
+
+    client.create_transactions.side_effect = create
+    syncer = _syncer(storage, client)
+
+    # Act
+    syncer.sync_batched()
+
+    # Assert
+    assert syncer.queue.get_payment_ids() == [1, 2]
+    assert syncer.queue.is_yet_synced(3)
+
+
+def test_sync_batched_keeps_missing_payments_queued(storage: MemoryStorage) -> None:
+    """Test that a queued payment that is not stored yet stays in the queue."""
+    # Arrange
+    storage.insert(PaymentQueue.TABLE_NAME, [{"payment_id": 5, "synced_at": None}])
+    client = Mock(spec=YnabClient)
+    client.create_transactions.side_effect = _accept_all
+    syncer = _syncer(storage, client)
+
+    # Act
+    syncer.sync_batched()
+
+    # Assert
+    assert not syncer.queue.is_yet_synced(5)
+    assert syncer.queue.get_payment_ids() == [5]